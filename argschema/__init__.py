@@ -1,12 +1,55 @@
-'''argschema: flexible definition, validation and setting of parameters'''
-from .fields import InputFile, InputDir, OutputFile, OptionList # noQA:F401
-from .schemas import ArgSchema # noQA:F401
-from .argschema_parser import ArgSchemaParser # noQA:F401
-from .deprecated import JsonModule, ModuleParameters # noQA:F401
+'''argschema: flexible definition, validation and setting of parameters
+
+The public names below (and the submodules) are imported on first access,
+so that light-weight submodules such as :mod:`argschema.client` can be used
+without importing marshmallow and numpy.
+'''
+import importlib
 
 __version__ = "3.0.1"
 
+# public names and the submodules they are defined in
+_LAZY_ATTRIBUTES = {
+    'InputFile': 'fields',
+    'InputDir': 'fields',
+    'OutputFile': 'fields',
+    'OptionList': 'fields',
+    'ArgSchema': 'schemas',
+    'ArgSchemaParser': 'argschema_parser',
+    'JsonModule': 'deprecated',
+    'ModuleParameters': 'deprecated',
+    'warmup': 'prefork',
+}
+
+# the names exported by `from argschema import *`, which imports them
+__all__ = ['ArgSchema', 'ArgSchemaParser', 'InputDir', 'InputFile',
+           'JsonModule', 'ModuleParameters', 'OptionList', 'OutputFile',
+           'argschema_parser', 'deprecated', 'fields', 'main', 'schemas',
+           'utils', 'warmup']
+
+
+def __getattr__(name):
+    if name in _LAZY_ATTRIBUTES:
+        module = importlib.import_module('.' + _LAZY_ATTRIBUTES[name], __name__)
+        value = getattr(module, name)
+        globals()[name] = value
+        return value
+    if not name.startswith('_'):
+        try:
+            return importlib.import_module('.' + name, __name__)
+        except ModuleNotFoundError as e:
+            if e.name != __name__ + '.' + name:
+                raise
+    raise AttributeError("module {!r} has no attribute {!r}".format(
+        __name__, name))
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
+
+
 def main():  # pragma: no cover
+    from .argschema_parser import ArgSchemaParser
     jm = ArgSchemaParser()
     print(jm.args)
 
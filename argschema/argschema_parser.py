@@ -1,14 +1,72 @@
 '''Module that contains the base class ArgSchemaParser which should be
 subclassed when using this library
+
+Besides default_schema and default_output_schema, subclasses can override these
+class attributes of ArgSchemaParser:
+
+parallel_load
+    True, or a dictionary of keyword arguments for :func:`parallel.parallel_load`
+    (e.g. min_length, max_workers), to validate long Nested(many=True) lists in a
+    pool of processes.
+max_validation_errors
+    number of errors to stop validating after (1 to fail on the first error); long
+    lists are then validated first, in growing chunks (see :mod:`argschema.errors`).
+summarize_validation_errors
+    True to report errors by field path (list indices replaced by '*') with their
+    counts rather than one by one.  Neither this nor max_validation_errors applies
+    with parallel_load.
+args_as_records
+    True to hold the loaded arguments (self.args) in frozen, slotted record objects
+    rather than dictionaries (see :mod:`argschema.records`).
+lazy_load
+    True to validate only the top level of the arguments up front.  self.args is
+    then a :class:`lazy.LazyArgs` mapping, which deserializes and validates each
+    Nested subtree on first access (its validate_all method validates everything).
+    It takes precedence over args_as_records, and does not apply with parallel_load.
+filesystem_timeout
+    number of seconds each check of a path can take, to keep paths on a hung mount
+    (e.g. a stale NFS mount) from blocking validation.  Once a check on a mount has
+    timed out, the following checks on it fail immediately (see
+    :class:`filesystems.TimeoutFileSystem`).  This covers the input_json files, the
+    result cache and the subtrees loaded on access with lazy_load too.
+result_cache
+    a :class:`result_cache.ResultCache`, a cache directory, or True for the default
+    user cache directory, to cache validated arguments on disk, keyed on the schema,
+    the merged arguments and the state of the paths referenced by path fields.
+env_prefix
+    a prefix, e.g. 'MYMOD', to read parameters from environment variables:
+    MYMOD__section__field sets the field section.field, cast as on the command line
+    (lists are given as a single literal).  Environment values override the input
+    json and are overridden by the command line.  They are read from os.environ, or
+    from the environ attribute if it is not None.
+
+An input containing a "$sweep" key describes a sweep over the values of some fields
+(see :mod:`argschema.sweeps`): self.args then holds the arguments of its first point,
+and ArgSchemaParser.iter_sweep generates the arguments of all of them.  Several
+--input_json files can be given on the command line, and are merged in order, with
+later files overriding earlier ones; an input json can also include other files via
+an "$include" key (see :mod:`argschema.layers`).  ArgSchemaParser.share_args exports
+large NumpyArray arguments to shared memory for worker processes.
 '''
-import json
+import os
 import logging
 import copy
+import weakref
+import contextlib
+import functools
 from . import schemas
 from . import utils
-from . import fields
+from . import formats
+from . import plans
+from . import sweeps
+from . import checksums
+from . import filesystems
 import marshmallow as mm
 
+# the optional subsystems (hashing, layers, lazy, parallel, records and
+# result_cache) are imported where they are used, to keep the cold start of
+# modules that do not use them short
+
 
 def contains_non_default_schemas(schema, schema_list=[]):
     """returns True if this schema contains a schema which was not an instance of DefaultSchema
@@ -66,24 +124,21 @@ def is_recursive_schema(schema, schema_list=[]):
     return False
 
 
-def fill_defaults(schema, args):
-    """DEPRECATED, function to fill in default values from schema into args
+def find_defaults(schema):
+    """function to find the paths and values of all default values in a schema
     bug: goes into an infinite loop when there is a recursively defined schema
 
     Parameters
     ----------
     schema : marshmallow.Schema
         schema to get defaults from
-    args :
-
 
     Returns
     -------
-    dict
-        dictionary with missing default values filled in
+    list
+        list of (path, default) tuples, where path is a list of nested keys
 
     """
-
     defaults = []
 
     # find all of the schema entries with default values
@@ -95,6 +150,31 @@ def fill_defaults(schema, args):
                 schemata.append((v.schema, path + [k]))
             elif v.default != mm.missing:
                 defaults.append((path + [k], v.default))
+    return defaults
+
+
+def fill_defaults(schema, args, defaults=None):
+    """DEPRECATED, function to fill in default values from schema into args
+    bug: goes into an infinite loop when there is a recursively defined schema
+
+    Parameters
+    ----------
+    schema : marshmallow.Schema
+        schema to get defaults from
+    args :
+
+    defaults : list or None
+        precomputed defaults as returned by :func:`find_defaults`
+        (Default value = None)
+
+    Returns
+    -------
+    dict
+        dictionary with missing default values filled in
+
+    """
+    if defaults is None:
+        defaults = find_defaults(schema)
 
     # put the default entries into the args dictionary
     args = copy.deepcopy(args)
@@ -115,6 +195,11 @@ class ArgSchemaParser(object):
     To subclass this and make a new schema be default, simply override the default_schema and default_output_schema
     attributes of this class.
 
+    The optional behaviours switched on by other class attributes (parallel, lazy or
+    cached loading, error budgets, records, filesystem timeouts and environment
+    variables), and sweeps and layered inputs, are described in
+    :mod:`argschema.argschema_parser`.
+
     Parameters
     ----------
     input_data : dict or None
@@ -137,6 +222,15 @@ class ArgSchemaParser(object):
     """
     default_schema = schemas.ArgSchema
     default_output_schema = None
+    result_cache = None
+    parallel_load = None
+    args_as_records = False
+    env_prefix = None
+    environ = None
+    max_validation_errors = None
+    summarize_validation_errors = False
+    lazy_load = False
+    filesystem_timeout = None
 
     def __init__(self,
                  input_data=None,  # dictionary input as option instead of --input_json
@@ -155,30 +249,115 @@ class ArgSchemaParser(object):
         self.logger.debug('input_data is {}'.format(input_data))
 
         # convert schema to argparse object
-        p = utils.schema_argparser(self.schema)
+        plan = plans.get_schema_plan(self.schema)
+        p = plan.argparser()
         argsobj = p.parse_args(args)
-        argsdict = utils.args_to_dict(argsobj, self.schema)
+        input_layers = getattr(argsobj, 'input_json', None)
+        argsdict = plan.args_to_dict(argsobj)
         self.logger.debug('argsdict is {}'.format(argsdict))
 
-        if argsobj.input_json is not None:
-            fields.files.validate_input_path(argsobj.input_json)
-            with open(argsobj.input_json, 'r') as j:
-                jsonargs = json.load(j)
+        if input_layers is not None:
+            from . import layers
+            # input files are always read from the local filesystem
+            filesystem = filesystems.LocalFileSystem()
+            if self.filesystem_timeout is not None:
+                filesystem = filesystems.TimeoutFileSystem(
+                    filesystem, self.filesystem_timeout)
+            jsonargs = layers.load_input_layers(input_layers, filesystem)
         else:
             jsonargs = input_data if input_data else {}
 
-        # merge the command line dictionary into the input json
+        # merge the environment and then the command line into the input json
+        if self.env_prefix is not None:
+            environ = os.environ if self.environ is None else self.environ
+            envargs = plan.env_to_dict(environ, self.env_prefix)
+            self.logger.debug('envargs is {}'.format(envargs))
+            jsonargs = utils.smart_merge(jsonargs, envargs)
         args = utils.smart_merge(jsonargs, argsdict)
         self.logger.debug('args after merge {}'.format(args))
 
         # validate with load!
-        result = self.load_schema_with_defaults(self.schema, args)
+        cache = None
+        if self.result_cache is not None:
+            from . import result_cache
+            cache = result_cache.as_result_cache(self.result_cache)
+
+        def loader(schema, d):
+            # the result cache checks the paths too, so it gets the timeout
+            with filesystems.timeout_checks(self.filesystem_timeout):
+                if cache is None:
+                    return self.load_schema_with_defaults(schema, d)
+                return cache.load(schema, d, self.load_schema_with_defaults)
+
+        args, sweep = sweeps.split_sweep(args)
+        if sweep is None:
+            self.sweep = None
+            result = loader(self.schema, args)
+        else:
+            # self.args holds the first point of the sweep
+            self.sweep = sweeps.Sweep(self.schema, args, sweep, loader)
+            result = self.sweep.load_point(
+                next(sweeps.iter_sweep_points(sweep)))
+
+        if self.args_as_records:
+            from . import lazy
+            from . import records
+            if not isinstance(result, lazy.LazyArgs):
+                result = records.to_record(self.schema, result)
 
         self.args = result
         self.output_schema_type = output_schema_type
         self.logger = self.initialize_logger(
             logger_name, self.args.get('log_level'))
 
+    def iter_sweep(self):
+        """generate the validated arguments of every point of the sweep given in
+        the input (see :mod:`argschema.sweeps`), or only self.args if there is none.
+        Points are validated as they are generated, and the non-varying part of the
+        input was validated once when this parser was created.
+
+        Yields
+        ------
+        dict
+            validated arguments of one point of the sweep
+
+        Raises
+        ------
+        marshmallow.ValidationError
+            when a point of the sweep does not pass validation
+        """
+        if self.sweep is None:
+            yield self.args
+            return
+        from . import records
+        for result in self.sweep:
+            if self.args_as_records:
+                result = records.to_record(self.schema, result)
+            yield result
+
+    def share_args(self, min_size=0):
+        """export the numpy arrays of self.args to shared memory blocks, so that
+        worker processes attach to them rather than receiving pickled copies
+        (see :mod:`argschema.shared`, Python 3.8+).  The blocks are released
+        when this parser is garbage collected (or the process exits).
+
+        Parameters
+        ----------
+        min_size : int
+            arrays smaller than this number of bytes are pickled with the handle
+            instead (Default value = 0)
+
+        Returns
+        -------
+        shared.SharedArgs
+            picklable handle to pass to the workers, whose attach method
+            returns the arguments
+        """
+        from . import shared
+        handle, blocks = shared.share_args(self.args, min_size)
+        weakref.finalize(self, shared.release_blocks, blocks)
+        return handle
+
     def get_output_json(self, d):
         """method for getting the output_json pushed through validation
         if validation exists
@@ -197,6 +376,9 @@ class ArgSchemaParser(object):
         marshmallow.ValidationError
             If any of the output dictionary doesn't meet the output schema
         """
+        from . import records
+        if isinstance(d, records.Record):
+            d = d.to_dict()
         if self.output_schema_type is not None:
             schema = self.output_schema_type()
             errors = schema.validate(d)
@@ -212,7 +394,9 @@ class ArgSchemaParser(object):
 
     def output(self, d, output_path=None, **json_dump_options):
         """method for outputing dictionary to the output_json file path after
-        validating it through the output_schema_type
+        validating it through the output_schema_type.  The file format is chosen by
+        the extension of the path (see :mod:`argschema.formats`), e.g. .json.gz, .json.zst
+        or .msgpack
 
         Parameters
         ----------
@@ -221,7 +405,7 @@ class ArgSchemaParser(object):
         output_path: str
             path to save to output file, optional (with default to self.mod['output_json'] location)
         **json_dump_options :
-            will be passed through to json.dump
+            will be passed through to json.dump (ignored for msgpack)
 
         Raises
         ------
@@ -232,8 +416,36 @@ class ArgSchemaParser(object):
             output_path = self.args['output_json']
 
         output_json = self.get_output_json(d)
-        with open(output_path, 'w') as fp:
-            json.dump(output_json, fp, **json_dump_options)
+        formats.write_output(output_json, output_path, **json_dump_options)
+
+    def fingerprint(self, path_mode=None, exclude=('input_json', 'log_level'),
+                    algorithm='sha256'):
+        """compute a canonical hash of the validated arguments (self.args),
+        which doesn't depend on the order of keys and hashes numpy arrays
+        by their buffer
+
+        Parameters
+        ----------
+        path_mode : str or None
+            None to hash only the path strings of InputFile and InputDir fields,
+            'mtime' to also hash their size and modification time, or
+            'content' to also hash their content (Default value = None)
+        exclude : iterable of str
+            top level arguments which do not affect the result of the module
+            (Default value = ('input_json', 'log_level'))
+        algorithm : str
+            name of a :mod:`hashlib` algorithm (Default value = 'sha256')
+
+        Returns
+        -------
+        str
+            hex digest of the arguments
+        """
+        from . import hashing
+        return hashing.args_fingerprint(self.schema, self.args,
+                                        path_mode=path_mode,
+                                        exclude=exclude,
+                                        algorithm=algorithm)
 
     def load_schema_with_defaults(self, schema, args):
         """method for deserializing the arguments dictionary (args)
@@ -258,8 +470,9 @@ class ArgSchemaParser(object):
             because these won't work with loading defaults.
 
         """
-        is_recursive = is_recursive_schema(schema)
-        is_non_default = contains_non_default_schemas(schema)
+        plan = plans.get_schema_plan(schema)
+        is_recursive = plan.is_recursive
+        is_non_default = plan.is_non_default
         if (not is_recursive) and is_non_default:
             # throw a warning
             self.logger.warning("""DEPRECATED:You are using a Schema which contains
@@ -267,13 +480,34 @@ class ArgSchemaParser(object):
             default values will not work correctly in this case,
             this use is deprecated, and future versions will not fill in default
             values when you use non-DefaultSchema subclasses""")
-            args = fill_defaults(schema, args)
+            args = fill_defaults(schema, args, plan.defaults)
         if is_recursive and is_non_default:
             raise mm.ValidationError(
                 'Recursive schemas need to subclass argschema.DefaultSchema else defaults will not work')
 
-        # load the dictionary via the schema
-        result = utils.load(schema, args)
+        with contextlib.ExitStack() as stack:
+            stack.enter_context(filesystems.timeout_checks(
+                self.filesystem_timeout))
+            # hash the files whose checksums are verified in parallel up front
+            checksums.prefetch_checksums(schema, args)
+            # load the dictionary via the schema, with all the paths checked in a batch
+            stack.enter_context(filesystems.batch_checks(
+                filesystems.schema_paths(schema, args)))
+            if self.parallel_load:
+                from . import parallel
+                options = {} if self.parallel_load is True else self.parallel_load
+                result = parallel.parallel_load(schema, args, **options)
+            elif self.lazy_load:
+                from . import lazy
+                result = lazy.lazy_load(schema, args, functools.partial(
+                    utils.load, max_errors=self.max_validation_errors,
+                    summarize=self.summarize_validation_errors),
+                    context=functools.partial(filesystems.timeout_checks,
+                                              self.filesystem_timeout))
+            else:
+                result = utils.load(schema, args,
+                                    max_errors=self.max_validation_errors,
+                                    summarize=self.summarize_validation_errors)
 
         return result
 
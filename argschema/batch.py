@@ -0,0 +1,232 @@
+'''module for running an ArgSchemaParser subclass over a JSON Lines file of
+parameter sets.  Parameter sets are read as a stream and validated in this
+process (where the schema plan stays warm), and the work function is run on
+the validated arguments in a pool of processes, with a bounded number of
+items in flight.
+
+command line usage::
+
+    python -m argschema.batch mypackage.mymodule:MyParser mypackage.mymodule:run \\
+        params.jsonl --output results.jsonl
+
+where ``run(args)`` takes the validated arguments of one parameter set and
+returns the dictionary to output.
+'''
+import os
+import sys
+import gzip
+import json
+import logging
+import argparse
+import collections
+import concurrent.futures
+import marshmallow as mm
+from . import utils
+from .argschema_parser import ArgSchemaParser
+
+logger = logging.getLogger(__name__)
+
+# work functions resolved from "module:function" paths, per worker process
+_FUNCTIONS = {}
+
+
+def iter_parameter_sets(path):
+    """read the parameter sets of a JSON Lines file one at a time
+
+    Parameters
+    ----------
+    path : str
+        path to the file ('-' for stdin), which can be gzip compressed
+        (.gz extension); blank lines are skipped
+
+    Yields
+    ------
+    dict
+        one parameter set per line
+    """
+    if path == '-':
+        fp = sys.stdin
+    elif path.endswith('.gz'):
+        fp = gzip.open(path, 'rt')
+    else:
+        fp = open(path, 'r')
+    try:
+        for line in fp:
+            if line.strip():
+                yield json.loads(line)
+    finally:
+        if fp is not sys.stdin:
+            fp.close()
+
+
+def call_work_function(func, args):
+    """call a work function, given as a callable or a "module:function" path
+    which is imported (once per process)
+
+    Parameters
+    ----------
+    func : callable or str
+        work function or path to it
+    args : dict
+        validated arguments
+
+    Returns
+    -------
+    object
+        the result of func(args)
+    """
+    if isinstance(func, str):
+        path = func
+        func = _FUNCTIONS.get(path)
+        if func is None:
+            func = _FUNCTIONS[path] = utils.import_object(path)
+    return func(args)
+
+
+def _item_output_path(mod, index, output_pattern):
+    if output_pattern is not None:
+        return output_pattern.format(index=index, args=mod.args)
+    return None
+
+
+def run_batch(parser_class, func, input_path, output_path=None,
+              output_pattern=None, max_workers=None, max_in_flight=None):
+    """run a module over all the parameter sets of a JSON Lines file
+
+    Each parameter set is validated with parser_class (as its input_data,
+    without reading the command line) and func(mod.args) is run in a pool of
+    processes.  Results are output via the parser's output method (and so
+    its output schema), either to a path per item or as one line per item
+    of a combined JSON Lines file, in the order of the input.
+
+    Parameters
+    ----------
+    parser_class : type
+        ArgSchemaParser subclass to validate the parameter sets with
+    func : callable or str
+        work function taking the validated arguments and returning the
+        dictionary to output, or its "module:function" path.  It must be
+        importable by the worker processes.
+    input_path : str
+        path to the JSON Lines file of parameter sets
+    output_path : str or None
+        path of a combined JSON Lines output, with lines of
+        {"index": i, "output": ...} or {"index": i, "errors": ...}.
+        If None, each result is output to its own path (Default value = None)
+    output_pattern : str or None
+        pattern of the per item output paths, formatted with the index and
+        the validated arguments as args (e.g. "out/{index}.json" or
+        "out/{args[name]}.json"); if None, each
+        item's output_json argument is used (Default value = None)
+    max_workers : int or None
+        number of worker processes, if None use the number of processors,
+        if 0 run the work function in this process (Default value = None)
+    max_in_flight : int or None
+        maximum number of validated items waiting for or being processed,
+        if None four per worker (Default value = None)
+
+    Returns
+    -------
+    dict
+        counts of the items that 'succeeded' and 'failed'
+    """
+    workers = (os.cpu_count() or 1) if max_workers is None else max_workers
+    if max_in_flight is None:
+        max_in_flight = 4 * max(workers, 1)
+    counts = {'succeeded': 0, 'failed': 0}
+    combined = open(output_path, 'w') if output_path is not None else None
+    pool = (concurrent.futures.ProcessPoolExecutor(workers)
+            if workers > 0 else None)
+
+    def record(index, output=None, errors=None):
+        # serialize before counting, as an output that cannot be serialized
+        # makes the item fail
+        text = None
+        if combined is not None:
+            if errors is None:
+                text = json.dumps({'index': index, 'output': output})
+            else:
+                text = json.dumps({'index': index, 'errors': errors},
+                                  default=str)
+        if errors is None:
+            counts['succeeded'] += 1
+        else:
+            counts['failed'] += 1
+            logger.error('parameter set {} failed: {}'.format(index, errors))
+        if text is not None:
+            combined.write(text + '\n')
+
+    def finish(index, mod, future):
+        try:
+            result = future.result()
+            if combined is not None:
+                record(index, output=mod.get_output_json(result))
+            else:
+                mod.output(result, _item_output_path(mod, index, output_pattern))
+                record(index)
+        except mm.ValidationError as e:
+            record(index, errors=e.messages)
+        except Exception as e:
+            record(index, errors='{}: {}'.format(type(e).__name__, e))
+
+    in_flight = collections.deque()
+    try:
+        for index, params in enumerate(iter_parameter_sets(input_path)):
+            mod = None
+            future = concurrent.futures.Future()
+            try:
+                mod = parser_class(input_data=params, args=[])
+                if pool is None:
+                    future.set_result(call_work_function(func, mod.args))
+                else:
+                    future = pool.submit(call_work_function, func, mod.args)
+            except Exception as e:
+                # reported by finish, in order with the other items
+                future.set_exception(e)
+            in_flight.append((index, mod, future))
+            # wait for the oldest item, so outputs stay in input order
+            while len(in_flight) >= max_in_flight:
+                finish(*in_flight.popleft())
+        while in_flight:
+            finish(*in_flight.popleft())
+    finally:
+        for index, mod, future in in_flight:
+            future.cancel()
+        if pool is not None:
+            pool.shutdown()
+        if combined is not None:
+            combined.close()
+    return counts
+
+
+def main(argv=None):  # pragma: no cover
+    parser = argparse.ArgumentParser(
+        description='run an argschema module over a JSON Lines file of '
+                    'parameter sets')
+    parser.add_argument('parser_class',
+                        help='module:Class of the ArgSchemaParser subclass')
+    parser.add_argument('func', help='module:function of the work function')
+    parser.add_argument('input', help='JSON Lines file of parameter sets')
+    parser.add_argument('--output', default=None,
+                        help='combined JSON Lines output file')
+    parser.add_argument('--output_pattern', default=None,
+                        help='per item output paths, e.g. out/{index}.json '
+                             'or out/{args[name]}.json')
+    parser.add_argument('--max_workers', type=int, default=None)
+    parser.add_argument('--max_in_flight', type=int, default=None)
+    opts = parser.parse_args(argv)
+    sys.path.insert(0, os.getcwd())
+    parser_class = utils.import_object(opts.parser_class)
+    if not (isinstance(parser_class, type) and
+            issubclass(parser_class, ArgSchemaParser)):
+        parser.error('{} is not an ArgSchemaParser subclass'.format(
+            opts.parser_class))
+    counts = run_batch(parser_class, opts.func, opts.input, opts.output,
+                       opts.output_pattern, opts.max_workers,
+                       opts.max_in_flight)
+    sys.stderr.write('{succeeded} succeeded, {failed} failed\n'.format(**counts))
+    return 1 if counts['failed'] else 0
+
+
+if __name__ == '__main__':  # pragma: no cover
+    sys.exit(main())
@@ -0,0 +1,404 @@
+'''module for verifying the checksums of input files, used by
+:class:`argschema.fields.InputFile` fields with a checksum option.
+
+Files are hashed in chunks of a memory map, and several files at once in a
+pool of threads (hashlib releases the GIL while hashing).  Checksums are
+cached per process, keyed on the path, size and modification time of the
+file, and can also be cached on disk (so unchanged files are not hashed
+again by later runs) by setting the ARGSCHEMA_CHECKSUM_CACHE environment
+variable to 1 (for the default user cache directory) or to a directory.
+'''
+import os
+import mmap
+import sqlite3
+import hashlib
+import logging
+import threading
+import weakref
+import concurrent.futures
+import marshmallow as mm
+
+CHECKSUM_CACHE_ENV = 'ARGSCHEMA_CHECKSUM_CACHE'
+
+# size of the chunks fed to the hash function
+CHUNK_SIZE = 8 << 20
+
+# algorithms provided by the optional xxhash package
+XXHASH_ALGORITHMS = ('xxh32', 'xxh64', 'xxh3_64', 'xxh3_128', 'xxh128')
+
+# in-process cache of checksums, keyed by (absolute path, algorithm)
+_CHECKSUMS = {}
+_CHECKSUMS_LOCK = threading.Lock()
+
+# whether schema classes (with only, exclude) declare checksums anywhere
+_DECLARES_CHECKSUMS = weakref.WeakKeyDictionary()
+
+logger = logging.getLogger(__name__)
+
+
+def new_hash(algorithm):
+    """create a hash object
+
+    Parameters
+    ----------
+    algorithm : str
+        name of a :mod:`hashlib` algorithm (e.g. 'md5', 'sha256'), or of an
+        xxhash algorithm ('xxhash' is short for 'xxh64'), which needs the
+        xxhash package
+
+    Returns
+    -------
+    object
+        hash object with update and hexdigest methods
+
+    Raises
+    ------
+    ValueError
+        if the algorithm is unknown
+    """
+    if algorithm == 'xxhash':
+        algorithm = 'xxh64'
+    if algorithm in XXHASH_ALGORITHMS:
+        try:
+            import xxhash
+        except ImportError:
+            raise ImportError('xxhash checksums need the xxhash package '
+                              '(pip install argschema[CHECKSUMS])')
+        return getattr(xxhash, algorithm)()
+    return hashlib.new(algorithm)
+
+
+def file_checksum(path, algorithm='sha256', chunk_size=CHUNK_SIZE):
+    """compute the checksum of the contents of a file
+
+    Parameters
+    ----------
+    path : str
+        path to the file
+    algorithm : str
+        hash algorithm, see :func:`new_hash` (Default value = 'sha256')
+    chunk_size : int
+        number of bytes hashed at a time (Default value = CHUNK_SIZE)
+
+    Returns
+    -------
+    str
+        hex digest of the file
+    """
+    h = new_hash(algorithm)
+    with open(path, 'rb') as fp:
+        try:
+            mapped = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+        except (ValueError, OSError):
+            # empty files and files that cannot be mapped
+            for chunk in iter(lambda: fp.read(chunk_size), b''):
+                h.update(chunk)
+            return h.hexdigest()
+        with mapped:
+            view = memoryview(mapped)
+            try:
+                for offset in range(0, len(view), chunk_size):
+                    h.update(view[offset:offset + chunk_size])
+            finally:
+                view.release()
+    return h.hexdigest()
+
+
+def checksum_cache_path():
+    """get the path of the on-disk checksum cache configured by the
+    ARGSCHEMA_CHECKSUM_CACHE environment variable
+
+    Returns
+    -------
+    str or None
+        None if the on-disk cache is disabled (variable unset, empty or 0),
+        else the path of the cache database in the default user cache
+        directory (if set to 1) or in the directory it is set to
+    """
+    value = os.environ.get(CHECKSUM_CACHE_ENV, '')
+    if value in ('', '0'):
+        return None
+    if value == '1':
+        from .plans import default_cache_dir
+        value = default_cache_dir('checksums')
+    return os.path.join(value, 'checksums.sqlite')
+
+
+def _connect(db_path):
+    os.makedirs(os.path.dirname(db_path), exist_ok=True)
+    db = sqlite3.connect(db_path, timeout=30)
+    db.execute('CREATE TABLE IF NOT EXISTS checksums (path TEXT, algorithm TEXT, '
+               'size INTEGER, mtime_ns INTEGER, digest TEXT, '
+               'PRIMARY KEY (path, algorithm))')
+    return db
+
+
+def _read_disk_cache(db_path, key, state):
+    try:
+        db = _connect(db_path)
+        try:
+            row = db.execute('SELECT size, mtime_ns, digest FROM checksums '
+                             'WHERE path=? AND algorithm=?', key).fetchone()
+        finally:
+            db.close()
+    except sqlite3.Error as e:
+        logger.debug('could not read checksum cache {}: {}'.format(db_path, e))
+        return None
+    if row is not None and tuple(row[:2]) == state:
+        return row[2]
+    return None
+
+
+def _write_disk_cache(db_path, key, state, digest):
+    try:
+        db = _connect(db_path)
+        try:
+            with db:
+                db.execute('INSERT OR REPLACE INTO checksums VALUES (?,?,?,?,?)',
+                           key + state + (digest,))
+        finally:
+            db.close()
+    except (sqlite3.Error, OSError) as e:
+        # caching is an optimization, so never fail validation because of it
+        logger.debug('could not write checksum cache {}: {}'.format(db_path, e))
+
+
+def cached_file_checksum(path, algorithm='sha256'):
+    """compute the checksum of a file, or get it from the in-process or
+    on-disk cache if the size and modification time of the file are unchanged
+
+    Parameters
+    ----------
+    path : str
+        path to the file
+    algorithm : str
+        hash algorithm, see :func:`new_hash` (Default value = 'sha256')
+
+    Returns
+    -------
+    str
+        hex digest of the file
+    """
+    st = os.stat(path)
+    state = (st.st_size, st.st_mtime_ns)
+    key = (os.path.abspath(path), algorithm)
+    with _CHECKSUMS_LOCK:
+        cached = _CHECKSUMS.get(key)
+    if cached is not None and cached[0] == state:
+        return cached[1]
+    db_path = checksum_cache_path()
+    digest = None
+    if db_path is not None:
+        digest = _read_disk_cache(db_path, key, state)
+    if digest is None:
+        digest = file_checksum(path, algorithm)
+        if db_path is not None:
+            _write_disk_cache(db_path, key, state, digest)
+    with _CHECKSUMS_LOCK:
+        _CHECKSUMS[key] = (state, digest)
+    return digest
+
+
+def clear_checksum_cache():
+    """clear the in-process checksum cache (the on-disk cache is left untouched)"""
+    with _CHECKSUMS_LOCK:
+        _CHECKSUMS.clear()
+
+
+def file_checksums(files, max_workers=None):
+    """compute the checksums of several files in a pool of threads,
+    through :func:`cached_file_checksum`
+
+    Parameters
+    ----------
+    files : iterable
+        (path, algorithm) pairs
+    max_workers : int or None
+        number of threads, if None use up to the number of processors
+        (Default value = None)
+
+    Returns
+    -------
+    dict
+        hex digests keyed by (path, algorithm), files that cannot be read
+        are left out
+    """
+    files = list(dict.fromkeys(files))
+    if not files:
+        return {}
+    workers = max_workers or min(len(files), os.cpu_count() or 1)
+    results = {}
+    with concurrent.futures.ThreadPoolExecutor(workers) as pool:
+        futures = {pool.submit(cached_file_checksum, path, algorithm):
+                   (path, algorithm) for path, algorithm in files}
+        for future, key in futures.items():
+            try:
+                results[key] = future.result()
+            except (OSError, ValueError, ImportError):
+                # validation of the field reports these
+                pass
+    return results
+
+
+def sidecar_path(path, algorithm, sidecar):
+    """get the path of the sidecar checksum file of a file
+
+    Parameters
+    ----------
+    path : str
+        path to the file
+    algorithm : str
+        hash algorithm
+    sidecar : bool or str
+        True for path + '.' + algorithm (e.g. data.bin.sha256), or the
+        suffix to append to path (e.g. '.md5')
+
+    Returns
+    -------
+    str
+        path to the sidecar file
+    """
+    if sidecar is True:
+        return path + '.' + algorithm
+    return path + sidecar
+
+
+def read_sidecar(path):
+    """read the checksum from a sidecar file, either a bare hex digest or
+    the output of md5sum/sha256sum ("<digest>  <filename>")
+
+    Parameters
+    ----------
+    path : str
+        path to the sidecar file
+
+    Returns
+    -------
+    str
+        hex digest (lower case)
+
+    Raises
+    ------
+    marshmallow.ValidationError
+        if the sidecar file cannot be read or is empty
+    """
+    try:
+        with open(path, 'r') as fp:
+            words = fp.read().split()
+    except OSError:
+        raise mm.ValidationError(
+            '{} is not a readable checksum file'.format(path))
+    if not words:
+        raise mm.ValidationError('{} is an empty checksum file'.format(path))
+    return words[0].lower()
+
+
+def expected_checksum(path, checksum=None, sidecar=False, algorithm='sha256'):
+    """get the checksum a file is expected to have
+
+    Parameters
+    ----------
+    path : str
+        path to the file
+    checksum : str or None
+        declared hex digest (Default value = None)
+    sidecar : bool or str
+        read the digest from a sidecar file, see :func:`sidecar_path`
+        (Default value = False)
+    algorithm : str
+        hash algorithm (Default value = 'sha256')
+
+    Returns
+    -------
+    str or None
+        expected hex digest, None if none is declared
+    """
+    if checksum is not None:
+        return checksum.lower()
+    if sidecar:
+        return read_sidecar(sidecar_path(path, algorithm, sidecar))
+    return None
+
+
+def verify_checksum(path, expected, algorithm='sha256'):
+    """check that a file has the expected checksum
+
+    Parameters
+    ----------
+    path : str
+        path to the file
+    expected : str
+        expected hex digest
+    algorithm : str
+        hash algorithm (Default value = 'sha256')
+
+    Raises
+    ------
+    marshmallow.ValidationError
+        if the checksum of the file differs from the expected one
+    """
+    digest = cached_file_checksum(path, algorithm)
+    if digest != expected.lower():
+        raise mm.ValidationError(
+            '{} has {} checksum {}, expected {}'.format(
+                path, algorithm, digest, expected))
+
+
+def _declares_checksums(schema, seen=()):
+    from . import fields
+    key = (tuple(sorted(schema.only)) if schema.only else None,
+           tuple(sorted(schema.exclude)))
+    known = _DECLARES_CHECKSUMS.setdefault(type(schema), {})
+    if key in known:
+        return known[key]
+    if type(schema) in seen:
+        return False
+    found = False
+    for field in schema.fields.values():
+        while isinstance(field, mm.fields.List):
+            field = field.inner
+        if isinstance(field, fields.InputFile) and field.verifies_checksum:
+            found = True
+        elif isinstance(field, mm.fields.Nested):
+            found = _declares_checksums(field.schema, seen + (type(schema),))
+        if found:
+            break
+    known[key] = found
+    return found
+
+
+def prefetch_checksums(schema, d, max_workers=None):
+    """compute the checksums of all the files that InputFile fields of a
+    schema will verify, in a pool of threads, so that validating the fields
+    finds them in the cache
+
+    Parameters
+    ----------
+    schema : marshmallow.Schema
+        schema that will load d
+    d : dict
+        dictionary to be loaded
+    max_workers : int or None
+        number of threads, if None use up to the number of processors
+        (Default value = None)
+    """
+    if not _declares_checksums(schema):
+        return
+    from . import utils
+    from . import fields
+    from . import filesystems
+    files = []
+    for path, field, value in utils.iter_field_values(schema, d):
+        if (isinstance(field, fields.InputFile) and field.verifies_checksum and
+                isinstance(value, str)):
+            files.append((value, field.checksum_algorithm))
+    if len(files) < 2:
+        return
+    # check the files through the filesystem adapter, which leaves out the
+    # ones on unresponsive mounts (the fields then report them)
+    infos = filesystems.get_filesystem().stat_many(
+        set(path for path, algorithm in files))
+    files = [(path, algorithm) for path, algorithm in files
+             if infos.get(path, filesystems.MISSING).is_file]
+    if len(files) > 1:
+        file_checksums(files, max_workers)
@@ -0,0 +1,338 @@
+'''static command line specs, which let a module serve ``--help`` and shell
+completion without importing numpy, marshmallow or the module's schema.
+
+:func:`export_cli_spec` writes the arguments of a schema (names, help,
+types, required flags and choices) to a json file.  The rest of this module
+only uses the standard library, so a script can answer ``--help`` and
+completion requests from that file before doing its expensive imports.
+A spec is stale (and is not used) once the source file of the schema, or of
+a schema it depends on, has been modified since it was exported::
+
+    from argschema.cli_spec import maybe_serve_help
+    maybe_serve_help('my_module.cli.json')
+
+    from my_package.schemas import MySchema  # only imported for real runs
+
+command line usage::
+
+    python -m argschema.cli_spec export my_package.schemas:MySchema my_module.cli.json
+    python -m argschema.cli_spec bash my_module.cli.json my_module.py >> ~/.bashrc
+'''
+import os
+import sys
+import json
+import argparse
+import tempfile
+
+# version of the spec file contents
+CLI_SPEC_FORMAT = 2
+
+
+class StaleSpecError(ValueError):
+    """raised when a spec no longer matches the schema it was exported from"""
+    pass
+
+
+def _field_at(schema, parts):
+    import marshmallow as mm
+    field = None
+    for part in parts:
+        field = schema.fields.get(part) if schema is not None else None
+        schema = field.schema if isinstance(field, mm.fields.Nested) else None
+    return field
+
+
+def _choices(field):
+    import marshmallow as mm
+    for validator in getattr(field, 'validators', []):
+        if isinstance(validator, mm.validate.OneOf):
+            return [str(c) for c in validator.choices]
+    return None
+
+
+def build_cli_spec(schema):
+    """build the static command line spec of a schema
+
+    Parameters
+    ----------
+    schema : marshmallow.Schema
+        schema to describe
+
+    Returns
+    -------
+    dict
+        json serializable spec, with the fingerprint and the source files of
+        the schema, the argument groups of the command line parser and for
+        every argument its name, help, field type, whether it is required and
+        its valid choices (or None)
+    """
+    from . import plans
+    plan = plans.get_schema_plan(schema)
+    groups = []
+    for group in plan.arguments:
+        args = []
+        for name, kwargs in group['args'].items():
+            parts = name[2:].split('.')
+            field = _field_at(schema, parts)
+            cast = plan.cast_table.get(name[2:])
+            args.append({
+                'name': name,
+                'help': kwargs.get('help', ''),
+                'type': cast[2] if cast is not None else None,
+                'required': bool(getattr(field, 'required', False)),
+                'choices': _choices(field),
+                'nargs': kwargs.get('nargs'),
+                'action': kwargs.get('action'),
+            })
+        groups.append({'title': group['title'],
+                       'description': group['description'],
+                       'args': args})
+    return {'format': CLI_SPEC_FORMAT,
+            'fingerprint': plans.schema_fingerprint(schema),
+            'sources': plans.source_states(schema),
+            'groups': groups}
+
+
+def export_cli_spec(schema, path):
+    """write the static command line spec of a schema to a json file
+
+    Parameters
+    ----------
+    schema : marshmallow.Schema
+        schema to describe
+    path : str
+        path of the json file to write (replaced atomically)
+
+    Returns
+    -------
+    dict
+        the spec written
+    """
+    spec = build_cli_spec(schema)
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as fp:
+            json.dump(spec, fp, indent=2)
+        os.replace(tmp, path)
+    except Exception:
+        os.remove(tmp)
+        raise
+    return spec
+
+
+def _modified_source(spec):
+    # the first source file of the spec which changed since it was exported
+    for module, path, mtime_ns, size in spec['sources']:
+        if path is None or mtime_ns is None:
+            continue
+        try:
+            st = os.stat(path)
+        except OSError:
+            return path
+        if (st.st_mtime_ns, st.st_size) != (mtime_ns, size):
+            return path
+    return None
+
+
+def load_cli_spec(path, schema=None):
+    """read a command line spec written by :func:`export_cli_spec`, checking
+    that it is not stale: its fingerprint is compared with the one of schema
+    if given, otherwise the state of the schema's source files is compared
+    with the one recorded in the spec (which does not import the schema)
+
+    Parameters
+    ----------
+    path : str
+        path of the spec file
+    schema : marshmallow.Schema or None
+        schema the spec was exported from (Default value = None)
+
+    Returns
+    -------
+    dict
+        the spec
+
+    Raises
+    ------
+    ValueError
+        if the file was written with an incompatible spec format
+    StaleSpecError
+        if the spec does not match the schema or its source files
+    """
+    with open(path, 'r') as fp:
+        spec = json.load(fp)
+    if spec.get('format') != CLI_SPEC_FORMAT:
+        raise ValueError('{} has cli spec format {}, expected {}'.format(
+            path, spec.get('format'), CLI_SPEC_FORMAT))
+    if schema is not None:
+        from . import plans
+        if spec['fingerprint'] != plans.schema_fingerprint(schema):
+            raise StaleSpecError('{} does not match the schema {}'.format(
+                path, type(schema).__name__))
+    else:
+        modified = _modified_source(spec)
+        if modified is not None:
+            raise StaleSpecError('{} is stale, {} changed since it was '
+                                 'exported'.format(path, modified))
+    return spec
+
+
+def spec_argparser(spec, prog=None):
+    """build an argparse parser from a spec, which gives the same help as
+    the parser ArgSchemaParser builds from the schema
+
+    Parameters
+    ----------
+    spec : dict
+        spec as returned by :func:`load_cli_spec`
+    prog : str or None
+        program name, if None argparse uses sys.argv[0] (Default value = None)
+
+    Returns
+    -------
+    argparse.ArgumentParser
+        parser with the arguments of the spec
+    """
+    parser = argparse.ArgumentParser(prog=prog)
+    for group in spec['groups']:
+        arg_group = parser.add_argument_group(group['title'],
+                                              group['description'])
+        for arg in group['args']:
+            kwargs = {'help': arg['help'], 'type': str}
+            if arg['nargs'] is not None:
+                kwargs['nargs'] = arg['nargs']
+            if arg['action'] is not None:
+                kwargs['action'] = arg['action']
+            arg_group.add_argument(arg['name'], **kwargs)
+    return parser
+
+
+def complete(spec, words):
+    """get the completion candidates for a partial command line
+
+    Parameters
+    ----------
+    spec : dict
+        spec as returned by :func:`load_cli_spec`
+    words : list of str
+        words of the command line after the program name, the last one
+        being the (possibly empty) word being completed
+
+    Returns
+    -------
+    list of str
+        candidates for the last word; empty if the argument takes a free
+        value (so the shell can fall back to its default completion)
+    """
+    words = list(words) or ['']
+    current = words[-1]
+    args = {arg['name']: arg for group in spec['groups']
+            for arg in group['args']}
+    previous = args.get(words[-2]) if len(words) > 1 else None
+    if previous is not None and previous['nargs'] is None:
+        return [c for c in previous['choices'] or [] if c.startswith(current)]
+    if current.startswith('-') or previous is None:
+        used = set(words[:-1])
+        return [name for name in args if name.startswith(current) and
+                (name not in used or args[name]['action'] == 'append')]
+    return []
+
+
+def bash_completion_script(spec_path, prog):
+    """generate a bash script registering completion of a program from a spec
+
+    Parameters
+    ----------
+    spec_path : str
+        path of the spec file
+    prog : str
+        name of the program (script) to complete
+
+    Returns
+    -------
+    str
+        bash script to source
+    """
+    func = '_argschema_' + ''.join(c if c.isalnum() else '_'
+                                   for c in os.path.basename(prog))
+    return (
+        '{func}() {{\n'
+        '    local IFS=$\'\\n\'\n'
+        '    COMPREPLY=($("{python}" -m argschema.cli_spec complete '
+        '"{spec}" -- "${{COMP_WORDS[@]:1:COMP_CWORD}}"))\n'
+        '}}\n'
+        'complete -o default -F {func} {prog}\n').format(
+            func=func, python=sys.executable,
+            spec=os.path.abspath(spec_path), prog=os.path.basename(prog))
+
+
+def maybe_serve_help(spec_path, argv=None):
+    """print help (for -h/--help) from a spec file and exit, before a module
+    does its expensive imports.  Does nothing if the spec file is missing or
+    stale, in which case the module's parser prints the help.
+
+    Parameters
+    ----------
+    spec_path : str
+        path of the spec file
+    argv : list or None
+        command line arguments, if None sys.argv[1:] (Default value = None)
+    """
+    argv = sys.argv[1:] if argv is None else argv
+    if not ('-h' in argv or '--help' in argv):
+        return
+    try:
+        spec = load_cli_spec(spec_path)
+    except (OSError, ValueError):
+        return
+    spec_argparser(spec).print_help()
+    sys.exit(0)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='export and use static argschema command line specs')
+    sub = parser.add_subparsers(dest='command')
+    sub.required = True
+    export = sub.add_parser('export', help='write the spec of a schema')
+    export.add_argument('schema', help='module:Class of the ArgSchema')
+    export.add_argument('spec', help='path of the spec file to write')
+    help_ = sub.add_parser('help', help='print the help of a spec')
+    help_.add_argument('spec')
+    help_.add_argument('--prog', default=None)
+    comp = sub.add_parser('complete', help='print completion candidates')
+    comp.add_argument('spec')
+    comp.add_argument('words', nargs=argparse.REMAINDER)
+    bash = sub.add_parser('bash', help='print a bash completion script')
+    bash.add_argument('spec')
+    bash.add_argument('prog')
+    opts = parser.parse_args(argv)
+
+    if opts.command == 'export':
+        sys.path.insert(0, os.getcwd())
+        from .utils import import_object
+        from .argschema_parser import ArgSchemaParser
+        schema = import_object(opts.schema)
+        if isinstance(schema, type) and issubclass(schema, ArgSchemaParser):
+            schema = schema.default_schema
+        export_cli_spec(schema() if isinstance(schema, type) else schema,
+                        opts.spec)
+    elif opts.command == 'help':
+        spec_argparser(load_cli_spec(opts.spec), prog=opts.prog).print_help()
+    elif opts.command == 'complete':
+        words = opts.words[1:] if opts.words[:1] == ['--'] else opts.words
+        try:
+            spec = load_cli_spec(opts.spec)
+        except StaleSpecError:
+            # no candidates, so the shell falls back to its default completion
+            return 1
+        for candidate in complete(spec, words):
+            sys.stdout.write(candidate + '\n')
+    else:
+        sys.stdout.write(bash_completion_script(opts.spec, opts.prog))
+    return 0
+
+
+if __name__ == '__main__':  # pragma: no cover
+    sys.exit(main())
@@ -0,0 +1,139 @@
+'''thin client for a resident validation server (see :mod:`argschema.server`).
+This module only uses the standard library, so importing it does not import
+marshmallow, numpy or the modules defining the schemas.
+
+command line usage::
+
+    python -m argschema.client --socket /tmp/argschema.sock \\
+        --schema mypackage.mymodule:MySchema -- --input_json input.json --a 5
+
+prints the validated arguments as json, or the validation errors to stderr
+(with exit status 1)
+'''
+import os
+import sys
+import json
+import socket
+import argparse
+
+# environment variable holding the default socket path
+SOCKET_ENV = 'ARGSCHEMA_SOCKET'
+
+
+class ServerValidationError(Exception):
+    """raised when the server rejects the arguments, with the errors
+    reported by the server as its args[0]"""
+    pass
+
+
+def request(socket_path, message, timeout=None):
+    """send a request to a validation server and return its response
+
+    Parameters
+    ----------
+    socket_path : str
+        path of the server's unix domain socket
+    message : dict
+        json serializable request
+    timeout : float or None
+        socket timeout in seconds (Default value = None)
+
+    Returns
+    -------
+    dict
+        the server's response
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(socket_path)
+        sock.sendall(json.dumps(message).encode('utf-8') + b'\n')
+        with sock.makefile('rb') as fp:
+            line = fp.readline()
+    if not line:
+        raise ConnectionError('{} closed the connection without a '
+                              'response'.format(socket_path))
+    return json.loads(line.decode('utf-8'))
+
+
+def _absolute_input_json(args):
+    # --input_json paths are relative to the client, so resolve them here
+    args = list(args)
+    for i, arg in enumerate(args):
+        if arg == '--input_json' and i + 1 < len(args):
+            args[i + 1] = os.path.abspath(args[i + 1])
+        elif arg.startswith('--input_json='):
+            args[i] = '--input_json=' + os.path.abspath(arg.split('=', 1)[1])
+    return args
+
+
+def validate(socket_path, schema, input_data=None, args=None, timeout=None):
+    """validate arguments against a schema held by a validation server.
+    Paths and environment parameters are resolved in the working directory
+    and environment of this process, which are sent with the request.
+
+    Parameters
+    ----------
+    socket_path : str
+        path of the server's unix domain socket
+    schema : str
+        "module:Class" path of the ArgSchema (or ArgSchemaParser subclass)
+    input_data : dict or None
+        dictionary of parameters, as for ArgSchemaParser (Default value = None)
+    args : list or None
+        command line arguments, as for ArgSchemaParser (Default value = None)
+    timeout : float or None
+        socket timeout in seconds (Default value = None)
+
+    Returns
+    -------
+    dict
+        the validated arguments, serialized to json types
+
+    Raises
+    ------
+    ServerValidationError
+        if the arguments do not pass validation
+    """
+    response = request(socket_path, {
+        'schema': schema,
+        'input_data': input_data,
+        'args': _absolute_input_json(args or []),
+        'cwd': os.getcwd(),
+        'env': dict(os.environ),
+    }, timeout=timeout)
+    if not response.get('ok'):
+        raise ServerValidationError(response.get('errors'))
+    return response['args']
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='validate arguments with a resident argschema server')
+    parser.add_argument('--socket', default=os.environ.get(SOCKET_ENV),
+                        help='path of the server socket (default ${})'.format(
+                            SOCKET_ENV))
+    parser.add_argument('--schema', required=True,
+                        help='module:Class of the schema to validate with')
+    parser.add_argument('--timeout', type=float, default=None,
+                        help='socket timeout in seconds')
+    parser.add_argument('args', nargs=argparse.REMAINDER,
+                        help='arguments for the module (after --)')
+    opts = parser.parse_args(argv)
+    if opts.socket is None:
+        parser.error('--socket or ${} is required'.format(SOCKET_ENV))
+    args = opts.args[1:] if opts.args[:1] == ['--'] else opts.args
+    try:
+        result = validate(opts.socket, opts.schema, args=args,
+                          timeout=opts.timeout)
+    except ServerValidationError as e:
+        errors = e.args[0]
+        if not isinstance(errors, str):
+            errors = json.dumps(errors, indent=2) + '\n'
+        sys.stderr.write(errors)
+        return 1
+    sys.stdout.write(json.dumps(result) + '\n')
+    return 0
+
+
+if __name__ == '__main__':  # pragma: no cover
+    sys.exit(main())
@@ -0,0 +1,314 @@
+'''module for validating with an error budget (stopping after a number of
+errors, e.g. at the first one) and for summarizing the validation errors of
+large inputs by field path'''
+import marshmallow as mm
+from . import utils
+from . import fields
+from .parallel import placeholder_schema
+
+# number of elements of a long list validated in the first chunk, which
+# doubles for every following chunk up to MAX_CHUNK
+FIRST_CHUNK = 16
+MAX_CHUNK = 4096
+
+
+def count_errors(messages):
+    """count the error messages in a (nested) marshmallow error structure
+
+    Parameters
+    ----------
+    messages : dict, list or str
+        error messages, as in marshmallow.ValidationError.messages
+
+    Returns
+    -------
+    int
+        number of error messages
+    """
+    if isinstance(messages, dict):
+        return sum(count_errors(v) for v in messages.values())
+    if isinstance(messages, (list, tuple)):
+        return sum(count_errors(v) for v in messages)
+    return 1
+
+
+def truncate_errors(messages, max_errors):
+    """keep only the first error messages of a (nested) error structure
+
+    Parameters
+    ----------
+    messages : dict, list or str
+        error messages
+    max_errors : int
+        number of messages to keep
+
+    Returns
+    -------
+    dict, list or str
+        the first max_errors messages, in the same structure
+    """
+    budget = [max_errors]
+
+    def truncate(m):
+        if isinstance(m, dict):
+            kept = {}
+            for key, value in m.items():
+                if budget[0] <= 0:
+                    break
+                kept[key] = truncate(value)
+            return kept
+        if isinstance(m, (list, tuple)):
+            kept = []
+            for value in m:
+                if budget[0] <= 0:
+                    break
+                kept.append(truncate(value))
+            return kept
+        budget[0] -= 1
+        return m
+    return truncate(messages)
+
+
+def _flatten(messages, path, out):
+    if isinstance(messages, dict):
+        for key, value in messages.items():
+            _flatten(value, path + ['*' if isinstance(key, int) else str(key)],
+                     out)
+    elif isinstance(messages, (list, tuple)):
+        for value in messages:
+            _flatten(value, path, out)
+    else:
+        counts = out.setdefault('.'.join(path) or '_schema', {})
+        counts[messages] = counts.get(messages, 0) + 1
+
+
+def summarize_errors(messages):
+    """summarize error messages by field path, with list indices replaced by
+    '*', so that e.g. the errors of all the elements of a long list are
+    reported once with their count
+
+    Parameters
+    ----------
+    messages : dict, list or str
+        error messages
+
+    Returns
+    -------
+    dict
+        lists of distinct messages keyed by field path pattern (e.g.
+        'items.*.x'), each followed by the number of times it occurred
+        if more than once
+    """
+    out = {}
+    _flatten(messages, [], out)
+    return {path: [m if n == 1 else '{} ({} times)'.format(m, n)
+                   for m, n in counts.items()]
+            for path, counts in out.items()}
+
+
+def find_large_lists(schema, d, min_length, path=None):
+    """find the Nested(many=True) and List fields holding long lists in a
+    dictionary, descending into (not many) Nested fields.  Lists of schemas
+    with schema level hooks (see :func:`utils.has_schema_hooks`), or nested
+    in them, are left out, since the hooks need the full lists.
+
+    Parameters
+    ----------
+    schema : marshmallow.Schema
+        schema describing d
+    d : dict
+        dictionary of values to be loaded
+    min_length : int
+        minimum length of list to return
+    path : list or None
+        list of (data key, attribute) pairs traversed so far (used for recursion)
+        (Default value = None)
+
+    Returns
+    -------
+    list
+        list of (path, field) where path is a list of (data key, attribute)
+        pairs leading to the field
+    """
+    path = [] if path is None else path
+    found = []
+    if not isinstance(d, dict) or utils.has_schema_hooks(schema):
+        return found
+    for name, field in schema.fields.items():
+        key = field.data_key or name
+        if key not in d:
+            continue
+        value = d[key]
+        field_path = path + [(key, field.attribute or name)]
+        if isinstance(field, (fields.ColumnarNested, fields.NumpyArray)):
+            continue
+        if isinstance(field, mm.fields.Nested) and not field.many:
+            found.extend(find_large_lists(field.schema, value, min_length,
+                                          field_path))
+        elif (isinstance(field, (mm.fields.Nested, mm.fields.List)) and
+                isinstance(value, list) and len(value) >= min_length):
+            found.append((field_path, field))
+    return found
+
+
+def _load_elements(field, chunk, schema):
+    # load a chunk of a list, returning (values, errors keyed by index)
+    if schema is not None:
+        try:
+            return utils.load(schema, chunk), {}
+        except mm.ValidationError as e:
+            messages = e.messages
+            if not isinstance(messages, dict):
+                messages = {'_schema': messages}
+            return None, messages
+    values = []
+    errors = {}
+    for i, value in enumerate(chunk):
+        try:
+            values.append(field.inner.deserialize(value))
+        except mm.ValidationError as e:
+            errors[i] = e.messages
+    return values, errors
+
+
+def load_list(field, values, max_errors=None):
+    """load a long list of a Nested(many=True) or List field in growing
+    chunks, stopping as soon as max_errors errors were found (lists of
+    :class:`fields.List` fields which can be vectorized are first loaded
+    with numpy all at once)
+
+    Parameters
+    ----------
+    field : marshmallow.fields.Nested or marshmallow.fields.List
+        field of the list
+    values : list
+        list to load
+    max_errors : int or None
+        number of errors to stop after, None to load the whole list
+        (Default value = None)
+
+    Returns
+    -------
+    tuple
+        (loaded list or None if there were errors, errors keyed by index)
+    """
+    if isinstance(field, fields.List) and field.vectorizable:
+        array = field._vectorized(values)
+        if array is not None:
+            return field.finish(array), {}
+    schema = None
+    if isinstance(field, mm.fields.Nested):
+        nested = field.schema
+        schema = type(nested)(many=True, only=nested.only,
+                              exclude=nested.exclude,
+                              unknown=field.unknown or nested.unknown)
+    loaded = []
+    errors = {}
+    total = 0
+    size = FIRST_CHUNK
+    offset = 0
+    while offset < len(values):
+        chunk_values, chunk_errors = _load_elements(
+            field, values[offset:offset + size], schema)
+        if chunk_errors:
+            for k, v in chunk_errors.items():
+                errors[k + offset if isinstance(k, int) else k] = v
+            total += count_errors(chunk_errors)
+            if max_errors is not None and total >= max_errors:
+                break
+        elif not errors:
+            loaded.extend(chunk_values)
+        offset += size
+        size = min(2 * size, MAX_CHUNK)
+    if errors:
+        return None, errors
+    if isinstance(field, fields.List):
+        loaded = field.finish(loaded)
+    return loaded, errors
+
+
+def _merge_errors(a, b):
+    for key, value in b.items():
+        if isinstance(a.get(key), dict) and isinstance(value, dict):
+            _merge_errors(a[key], value)
+        elif isinstance(a.get(key), list) and isinstance(value, list):
+            a[key] = a[key] + value
+        else:
+            a[key] = value
+
+
+def budgeted_load(schema, d, max_errors=None, min_length=1000, loader=None):
+    """load a dictionary with a schema, validating long lists first and in
+    growing chunks, so that validation stops soon after max_errors errors
+    instead of after a full traversal of a broken input
+
+    Parameters
+    ----------
+    schema : marshmallow.Schema
+        schema to load with
+    d : dict
+        dictionary to load
+    max_errors : int or None
+        number of errors to stop after (1 to fail on the first error),
+        None to collect all errors (Default value = None)
+    min_length : int
+        lists shorter than this are loaded with the rest of the dictionary
+        (Default value = 1000)
+    loader : callable or None
+        function loader(schema, d) used to load the rest of the dictionary,
+        if None use schema.load (Default value = None)
+
+    Returns
+    -------
+    dict
+        deserialized and validated dictionary
+
+    Raises
+    ------
+    marshmallow.ValidationError
+        with (at most max_errors of) the errors of the dictionary
+    """
+    loader = (lambda s, data: s.load(data)) if loader is None else loader
+    large = find_large_lists(schema, d, min_length)
+    errors = {}
+    total = 0
+    loaded_lists = []
+    for path, field in large:
+        keys = [key for key, attribute in path]
+        remaining = None if max_errors is None else max_errors - total
+        values, list_errors = load_list(field, utils.get_path(d, keys),
+                                        remaining)
+        if not list_errors:
+            try:
+                field._validate(values)
+            except mm.ValidationError as e:
+                list_errors = e.messages
+        if list_errors:
+            utils.set_errors(errors, keys, list_errors)
+            total += count_errors(list_errors)
+            if max_errors is not None and total >= max_errors:
+                raise mm.ValidationError(truncate_errors(errors, max_errors))
+        loaded_lists.append(values)
+        d = utils.replace_path(d, keys, [])
+
+    result = None
+    try:
+        result = loader(placeholder_schema(schema, large), d)
+    except mm.ValidationError as e:
+        rest = e.messages if isinstance(e.messages, dict) else {
+            '_schema': e.messages}
+        for path, field in large:
+            # these came from validating the empty placeholder lists
+            utils.pop_errors(rest, [key for key, attribute in path])
+        _merge_errors(errors, rest)
+
+    if errors:
+        if max_errors is not None:
+            errors = truncate_errors(errors, max_errors)
+        raise mm.ValidationError(errors)
+    for (path, field), values in zip(large, loaded_lists):
+        target = result
+        for key, attribute in path[:-1]:
+            target = target[attribute]
+        target[path[-1][1]] = values
+    return result
@@ -6,9 +6,13 @@ from .numpyarrays import NumpyArray # noQA:F401
 from .deprecated import OptionList # noQA:F401
 from .loglevel import LogLevel # noQA:F401
 from .slice import Slice # noQA:F401
+from .columnar import ColumnarNested # noQA:F401
+from .globs import InputGlob # noQA:F401
+from .lists import List # noQA:F401
 
 __all__ = __mmall__ + ['OutputFile', 'InputDir', 'InputFile', 'OutputDir',
-                       'NumpyArray', 'OptionList', 'LogLevel', 'Slice']
+                       'NumpyArray', 'OptionList', 'LogLevel', 'Slice',
+                       'ColumnarNested', 'InputGlob']
 
 # Python 2 subpackage (not module) * imports break if items in __all__
 # are unicode.
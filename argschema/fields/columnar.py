@@ -0,0 +1,161 @@
+'''marshmallow fields for loading lists of records into columns of numpy arrays'''
+import numpy as np
+import marshmallow as mm
+
+# numpy dtypes of the columns of field types, other fields give object columns
+COLUMN_DTYPE_MAP = [(mm.fields.Boolean, np.bool_),
+                    (mm.fields.Integer, np.int64),
+                    (mm.fields.Float, np.float64),
+                    (mm.fields.String, np.str_)]
+
+
+def column_dtype(field):
+    """get the numpy dtype of a column of values of a field
+
+    Parameters
+    ----------
+    field : marshmallow.fields.Field
+        field of the element schema
+
+    Returns
+    -------
+    type
+        numpy scalar type for the column (np.object_ if no better one is known)
+    """
+    for field_type, dtype in COLUMN_DTYPE_MAP:
+        if isinstance(field, field_type):
+            return dtype
+    return np.object_
+
+
+def _object_column(values):
+    # assign element by element so sequences are not broadcast into 2d
+    column = np.empty(len(values), dtype=object)
+    for i, value in enumerate(values):
+        column[i] = value
+    return column
+
+
+def _make_column(values, dtype):
+    if dtype is np.object_:
+        return _object_column(values)
+    try:
+        if dtype is not np.float64 and any(v is None for v in values):
+            raise TypeError('only float columns can hold missing values')
+        return np.array(values, dtype=dtype)
+    except (TypeError, ValueError, OverflowError):
+        # e.g. missing values or ints too large for int64
+        return _object_column(values)
+
+
+def records_from_columns(value):
+    """convert columnar data (a dictionary of 1d numpy arrays or a numpy
+    structured array) into a list of dictionaries, other values are
+    returned unchanged
+
+    Parameters
+    ----------
+    value : object
+        possibly columnar data
+
+    Returns
+    -------
+    object
+        list of dictionaries if value was columnar, else value
+    """
+    if isinstance(value, np.ndarray) and value.dtype.names is not None:
+        columns = {name: value[name].tolist() for name in value.dtype.names}
+    elif (isinstance(value, dict) and value and
+            all(isinstance(v, np.ndarray) and v.ndim == 1
+                for v in value.values())):
+        columns = {name: v.tolist() for name, v in value.items()}
+    else:
+        return value
+    names = list(columns.keys())
+    return [dict(zip(names, row)) for row in zip(*columns.values())]
+
+
+class ColumnarNested(mm.fields.Nested):
+    """ColumnarNested is a :class:`marshmallow.fields.Nested` subclass (always
+    many=True) which validates a list of records with the nested schema and
+    returns them as columns: a dictionary of 1d numpy arrays keyed by field,
+    or a numpy structured array.  This uses far less memory than a list of
+    dictionaries for long lists of small records.
+
+    Column dtypes are derived from the fields of the nested schema (Boolean,
+    Integer, Float and String fields give bool, int64, float64 and unicode
+    columns), other fields give object columns.  Missing values are NaN in float
+    columns, and give object columns (holding None) for other types.
+
+    When serializing (and validating output), it accepts columnar data as well as a
+    list of dictionaries.  Validators of this field are run on the columnar result.
+
+    Parameters
+    ----------
+    nested : marshmallow.Schema
+        schema of the records, as for :class:`marshmallow.fields.Nested`
+    structured : bool
+        return a numpy structured array rather than a dictionary of arrays
+        (Default=False)
+    chunksize : int
+        number of records validated and converted at a time, which bounds the
+        number of record dictionaries in memory at once (Default=10000)
+    kwargs :
+        the same as any :class:`~marshmallow.fields.Nested` receives
+    """
+
+    def __init__(self, nested, structured=False, chunksize=10000, **kwargs):
+        self.structured = structured
+        self.chunksize = chunksize
+        kwargs['many'] = True
+        super(ColumnarNested, self).__init__(nested, **kwargs)
+
+    def _columns(self):
+        return [(field.attribute or name, column_dtype(field))
+                for name, field in self.schema.fields.items()
+                if not field.dump_only]
+
+    def _deserialize(self, value, attr, data, partial=None, **kwargs):
+        value = records_from_columns(value)
+        if not isinstance(value, (list, tuple)):
+            # let marshmallow raise its usual error
+            return super(ColumnarNested, self)._deserialize(
+                value, attr, data, partial=partial, **kwargs)
+
+        columns = self._columns()
+        chunks = {name: [] for name, dtype in columns}
+        errors = {}
+        for offset in range(0, len(value), self.chunksize):
+            chunk = value[offset:offset + self.chunksize]
+            try:
+                records = super(ColumnarNested, self)._deserialize(
+                    chunk, attr, data, partial=partial, **kwargs)
+            except mm.ValidationError as e:
+                errors.update({k + offset if isinstance(k, int) else k: v
+                               for k, v in e.messages.items()})
+                continue
+            if errors:
+                continue
+            for name, dtype in columns:
+                chunks[name].append(_make_column(
+                    [record.get(name) for record in records], dtype))
+        if errors:
+            raise mm.ValidationError(errors)
+
+        result = {}
+        for name, dtype in columns:
+            if chunks[name]:
+                result[name] = np.concatenate(chunks[name])
+            else:
+                result[name] = np.array([], dtype=dtype)
+        if self.structured:
+            structured = np.empty(len(value), dtype=[
+                (name, result[name].dtype) for name, dtype in columns])
+            for name, dtype in columns:
+                structured[name] = result[name]
+            return structured
+        return result
+
+    def _serialize(self, nested_obj, attr, obj, **kwargs):
+        return super(ColumnarNested, self)._serialize(
+            records_from_columns(nested_obj), attr, obj, **kwargs)
@@ -0,0 +1,210 @@
+'''building and caching indexes of the contents of input directories,
+used by :class:`argschema.fields.InputDir` fields with index=True'''
+import os
+import errno
+import threading
+import collections
+import concurrent.futures
+from .. import filesystems
+
+# size and modification time of an indexed file
+FileInfo = collections.namedtuple('FileInfo', ['size', 'mtime_ns'])
+
+# in-process cache of indexes, keyed by (absolute path, extensions, recursive)
+_INDEX_CACHE = {}
+_INDEX_LOCK = threading.Lock()
+
+
+class DirectoryIndex(str):
+    """the path of an indexed directory (a str, so it can be used as the path
+    itself), with the index of its contents
+
+    Attributes
+    ----------
+    files : dict
+        :class:`FileInfo` of every indexed file, keyed by its path relative
+        to the directory, in sorted order
+    directories : dict
+        modification times (ns) of the directory and of the sub-directories
+        walked, keyed by path relative to the directory ('' for itself)
+    """
+
+    def __new__(cls, path, files=None, directories=None):
+        obj = super(DirectoryIndex, cls).__new__(cls, path)
+        obj.files = {} if files is None else files
+        obj.directories = {} if directories is None else directories
+        return obj
+
+    def __reduce__(self):
+        return (DirectoryIndex, (str(self), self.files, self.directories))
+
+    def paths(self):
+        """get the full paths of the indexed files
+
+        Returns
+        -------
+        list of str
+            paths of the indexed files (joined to the directory path)
+        """
+        return [os.path.join(self, name) for name in self.files]
+
+
+def _scan(directory, extensions, fs):
+    # list one directory, returning its files (with stat) and sub-directories
+    names = []
+    subdirs = []
+    for entry in fs.scandir(directory):
+        if entry.is_dir:
+            if not entry.is_symlink:
+                subdirs.append(entry.name)
+        elif entry.is_file:
+            if (extensions is None or
+                    os.path.splitext(entry.name)[1].lower() in extensions):
+                names.append(entry.name)
+    paths = [os.path.join(directory, name) for name in names]
+    infos = fs.stat_many(paths)
+    files = []
+    for name, path in zip(names, paths):
+        info = infos.get(path)
+        if info is None:
+            # left out of the batch (e.g. on an unresponsive mount)
+            info = fs.stat(path)
+        if info.exists:
+            # files removed while walking are left out
+            files.append((name, FileInfo(info.size, info.mtime_ns)))
+    return files, subdirs
+
+
+def _normalize_extensions(extensions):
+    if extensions is None:
+        return None
+    return tuple(sorted(e.lower() if e.startswith('.') else '.' + e.lower()
+                        for e in extensions))
+
+
+def walk_directory(path, extensions=None, recursive=True, max_workers=None,
+                   filesystem=None):
+    """index the files in a directory, listing sub-directories in a pool of
+    threads through a filesystem adapter
+
+    Parameters
+    ----------
+    path : str
+        path to the directory
+    extensions : list of str or None
+        only index files with these extensions (e.g. ['.tif', 'png'],
+        case insensitive), if None index all files (Default value = None)
+    recursive : bool
+        whether to index the sub-directories too (Default value = True)
+    max_workers : int or None
+        number of threads, if None use the default of
+        :class:`concurrent.futures.ThreadPoolExecutor` (Default value = None)
+    filesystem : filesystems.FileSystem or None
+        adapter to list and check with, if None the current one (captured in
+        this thread, so the pool threads use it too) (Default value = None)
+
+    Returns
+    -------
+    DirectoryIndex
+        index of the directory
+
+    Raises
+    ------
+    OSError
+        if the directory cannot be listed
+    """
+    fs = filesystems.get_filesystem() if filesystem is None else filesystem
+    extensions = _normalize_extensions(extensions)
+    info = fs.stat(path)
+    if not info.exists:
+        raise FileNotFoundError(errno.ENOENT, os.strerror(errno.ENOENT), path)
+    files = {}
+    directories = {'': info.mtime_ns}
+    with concurrent.futures.ThreadPoolExecutor(max_workers) as pool:
+        pending = {pool.submit(_scan, path, extensions, fs): ''}
+        while pending:
+            done, _ = concurrent.futures.wait(
+                pending, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                rel = pending.pop(future)
+                try:
+                    dir_files, subdirs = future.result()
+                except OSError:
+                    if rel == '':
+                        raise
+                    continue
+                for name, info in dir_files:
+                    files[os.path.join(rel, name)] = info
+                if not recursive:
+                    continue
+                subs = [os.path.join(rel, name) for name in subdirs]
+                infos = fs.stat_many([os.path.join(path, sub) for sub in subs])
+                for sub in subs:
+                    full = os.path.join(path, sub)
+                    info = infos.get(full)
+                    if info is None:
+                        info = fs.stat(full)
+                    if not info.exists:
+                        continue
+                    directories[sub] = info.mtime_ns
+                    pending[pool.submit(_scan, full, extensions, fs)] = sub
+    return DirectoryIndex(path, dict(sorted(files.items())),
+                          dict(sorted(directories.items())))
+
+
+def _unchanged(path, directories, fs):
+    # directories without a known mtime are never considered unchanged
+    if any(mtime is None for mtime in directories.values()):
+        return False
+    paths = [os.path.join(path, rel) for rel in directories]
+    infos = fs.stat_many(paths)
+    for full, mtime in zip(paths, directories.values()):
+        info = infos.get(full)
+        if info is None:
+            info = fs.stat(full)
+        if not info.exists or info.mtime_ns != mtime:
+            return False
+    return True
+
+
+def directory_index(path, extensions=None, recursive=True, max_workers=None,
+                    filesystem=None):
+    """get the index of a directory through a per-process cache, which is
+    reused while the modification times of the directory and of all its
+    indexed sub-directories are unchanged (i.e. no files were added, removed
+    or renamed; changes to the contents of files are not detected)
+
+    Parameters
+    ----------
+    path : str
+        path to the directory
+    extensions : list of str or None
+        only index files with these extensions (Default value = None)
+    recursive : bool
+        whether to index the sub-directories too (Default value = True)
+    max_workers : int or None
+        number of threads used to walk the directory (Default value = None)
+    filesystem : filesystems.FileSystem or None
+        adapter to list and check with, if None the current one
+        (Default value = None)
+
+    Returns
+    -------
+    DirectoryIndex
+        index of the directory, with the path as given
+    """
+    fs = filesystems.get_filesystem() if filesystem is None else filesystem
+    key = (os.path.abspath(path), _normalize_extensions(extensions), recursive)
+    with _INDEX_LOCK:
+        cached = _INDEX_CACHE.get(key)
+    if cached is None or not _unchanged(key[0], cached.directories, fs):
+        cached = walk_directory(key[0], extensions, recursive, max_workers, fs)
+        with _INDEX_LOCK:
+            _INDEX_CACHE[key] = cached
+    return DirectoryIndex(path, cached.files, cached.directories)
+
+
+def clear_index_cache():
+    """clear the in-process cache of directory indexes"""
+    with _INDEX_LOCK:
+        _INDEX_CACHE.clear()
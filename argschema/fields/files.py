@@ -1,40 +1,26 @@
 '''marshmallow fields related to validating input and output file paths'''
 import os
 import marshmallow as mm
-import tempfile
 import errno
 import sys
-import uuid
-import stat
-import warnings
+from .. import checksums
+from .. import filesystems
+from . import dirindex
 
 
-class WindowsNamedTemporaryFile():
-    def __init__(self, dir=None, mode=None):
-        self.filename = os.path.join(dir, str(uuid.uuid4()))
-        self.mode = mode
-
-    def __enter__(self):
-        self.open_file = open(self.filename, self.mode)
-        return self.open_file
-    
-    def __exit__(self, *args):
-        self.open_file.close()
-        os.remove(self.filename)
-
+# kept here for backwards compatibility, the path checks are done by the
+# filesystem adapters of argschema.filesystems
+from ..filesystems import (WindowsNamedTemporaryFile,  # noQA:F401
+                           NamedTemporaryFile)  # noQA:F401
 
-if sys.platform == "win32":
-    NamedTemporaryFile = WindowsNamedTemporaryFile
-else:
-    NamedTemporaryFile = tempfile.NamedTemporaryFile
 
-
-def validate_outpath(path):
+def validate_outpath(path, filesystem=None):
+    filesystem = filesystems.get_filesystem() if filesystem is None else filesystem
     try:
-        with NamedTemporaryFile(mode='w', dir=path) as tfile:
-            tfile.write('0')
-            tfile.close()
-
+        filesystem.probe_write(path)
+    except mm.ValidationError:
+        # e.g. a check that timed out
+        raise
     except Exception as e:
         if isinstance(e, OSError):
             if e.errno == errno.ENOENT:
@@ -45,17 +31,17 @@ def validate_outpath(path):
                     "%s does not appear you can write to path" % path)
             else:
                 raise mm.ValidationError(
-                    "Unknown OSError: {}".format(e.message))
+                    "Unknown OSError: {}".format(e))
         else:
             raise mm.ValidationError(
-                "Unknown Exception: {}".format(e.message))
+                "Unknown Exception: {}".format(e))
 
 
 class OutputFile(mm.fields.Str):
     """OutputFile :class:`marshmallow.fields.Str` subclass which is a path to a
        file location that can be written to by the current user
        (presently tested by opening a temporary file to that
-       location)
+       location, with the filesystem adapter of :mod:`argschema.filesystems`)
 
     Parameters
     ----------
@@ -118,11 +104,10 @@ class OutputDir(mm.fields.Str):
         super(OutputDir, self).__init__(*args, **kwargs)
 
     def _validate(self, value):
-        if not os.path.isdir(value):
+        info = filesystems.path_info(value)
+        if not info.is_dir:
             try:
-                os.makedirs(value)
-                if self.mode is not None:
-                    os.chmod(value, self.mode)
+                filesystems.get_filesystem().makedirs(value, self.mode)
             except OSError as e:
                 if e.errno == errno.EEXIST:
                     pass
@@ -131,59 +116,141 @@ class OutputDir(mm.fields.Str):
                         "{} is not a directory and you cannot create it".format(
                             value)
                     )
+            filesystems.invalidate(value)
+            info = filesystems.path_info(value)
         if self.mode is not None:
-            try:
-                assert((os.stat(value).st_mode & 0o777) == self.mode)
-            except AssertionError:
+            if not info.exists:
                 raise mm.ValidationError(
-                    "{} does not have the mode  ({}) that was specified ".format(
-                        value, self.mode)
+                    "cannot get os.stat of {}".format(value)
                 )
-            except os.error:
+            if info.mode != self.mode:
                 raise mm.ValidationError(
-                    "cannot get os.stat of {}".format(value)
+                    "{} does not have the mode  ({}) that was specified ".format(
+                        value, self.mode)
                 )
         # use outputfile to test that a file in this location is a valid path
         validate_outpath(value)
 
 
-def validate_input_path(value):
-    if not os.path.isfile(value):
-        raise mm.ValidationError("%s is not a file" % value)
+def validate_input_path(value, filesystem=None):
+    if filesystem is None:
+        info = filesystems.path_info(value)
     else:
-        try:
-            with open(value) as f:  
-                pass
-        except Exception as value:
-            raise mm.ValidationError("%s is not readable" % value)   
+        info = filesystem.stat(value)
+    if not info.is_file:
+        raise mm.ValidationError("%s is not a file" % value)
+    elif not info.readable:
+        raise mm.ValidationError("%s is not readable" % value)
 
 class InputDir(mm.fields.Str):
     """InputDir is  :class:`marshmallow.fields.Str` subclass which is a path to a
        a directory that exists and that the user can access
-       (presently checked with os.access)
+       (checked with the filesystem adapter of :mod:`argschema.filesystems`)
+
+       With index=True, validation also indexes the files in the directory
+       (walking sub-directories in a pool of threads) and loads as a
+       :class:`~argschema.fields.dirindex.DirectoryIndex`, which is the path
+       (a str) with the size and modification time of every file in its files
+       attribute.  Indexes are cached for the life of the process while no
+       files are added to or removed from the directory.
+
+       Parameters
+       ==========
+       index: bool
+          index the contents of the directory (default False)
+       extensions: list of str
+          only index files with these extensions (default None, all files)
+       recursive: bool
+          index sub-directories too (default True)
+       max_workers: int
+          number of threads used to walk the directory (default None)
+       **kwargs:
+         same as passed to marshmallow.fields.Str
     """
 
-    def _validate(self, value):
-        if not os.path.isdir(value):
-            raise mm.ValidationError("%s is not a directory")
+    def __init__(self, index=False, extensions=None, recursive=True,
+                 max_workers=None, **kwargs):
+        self.index = index
+        self.extensions = extensions
+        self.recursive = recursive
+        self.max_workers = max_workers
+        super(InputDir, self).__init__(**kwargs)
+
+    def build_index(self, value):
+        """get the (cached) index of a directory
 
-        if sys.platform == "win32":
+        Parameters
+        ----------
+        value : str
+            path to the directory
+
+        Returns
+        -------
+        DirectoryIndex
+            index of the directory
+        """
+        return dirindex.directory_index(value, self.extensions, self.recursive,
+                                        self.max_workers)
+
+    def _deserialize(self, value, attr, data, **kwargs):
+        value = super(InputDir, self)._deserialize(value, attr, data, **kwargs)
+        if self.index:
+            self._validate(value)
             try:
-                x = list(os.scandir(value))
-            except PermissionError:
-                raise mm.ValidationError(
-                    "%s is not a readable directory" % value)
-        else:
-            if not os.access(value, os.R_OK):
+                value = self.build_index(value)
+            except OSError as e:
                 raise mm.ValidationError(
-                    "%s is not a readable directory" % value)
+                    "{} could not be indexed: {}".format(value, e))
+        return value
+
+    def _validate(self, value):
+        info = filesystems.path_info(value)
+        if not info.is_dir:
+            raise mm.ValidationError("%s is not a directory" % value)
+        if not info.readable:
+            raise mm.ValidationError(
+                "%s is not a readable directory" % value)
 
 
 class InputFile(mm.fields.Str):
     """InputDile is a :class:`marshmallow.fields.Str` subclass which is a path to a
        file location which can be read by the user
-       (presently passes os.path.isfile and os.access = R_OK)
+       (checked with the filesystem adapter of :mod:`argschema.filesystems`)
+
+       Optionally, validation also verifies the checksum of the contents of the
+       file, against a declared checksum or one read from a sidecar file
+       (see :mod:`argschema.checksums`).
+
+       Parameters
+       ==========
+       checksum: str
+          expected hex digest of the file
+       checksum_sidecar: bool or str
+          read the expected digest from a sidecar file: True for the path
+          with the algorithm appended (e.g. data.bin.sha256), or a suffix to
+          append to the path (e.g. '.md5')
+       checksum_algorithm: str
+          hash algorithm, a :mod:`hashlib` algorithm name or 'xxhash'
+          (default 'sha256')
+       **kwargs:
+         same as passed to marshmallow.fields.Str
     """
 
+    def __init__(self, checksum=None, checksum_sidecar=False,
+                 checksum_algorithm='sha256', **kwargs):
+        self.checksum = checksum
+        self.checksum_sidecar = checksum_sidecar
+        self.checksum_algorithm = checksum_algorithm
+        super(InputFile, self).__init__(**kwargs)
+
+    @property
+    def verifies_checksum(self):
+        return self.checksum is not None or bool(self.checksum_sidecar)
+
     def _validate(self, value):
         validate_input_path(value)
+        if self.verifies_checksum:
+            expected = checksums.expected_checksum(
+                value, self.checksum, self.checksum_sidecar,
+                self.checksum_algorithm)
+            checksums.verify_checksum(value, expected, self.checksum_algorithm)
@@ -0,0 +1,264 @@
+'''marshmallow fields for validating glob patterns of input files'''
+import os
+import re
+import fnmatch
+import errno
+import threading
+import marshmallow as mm
+from .. import filesystems
+
+# in-process cache of directory listings, keyed by absolute path, with values
+# of (directory mtime in ns, sorted list of (name, is_dir, is_file, is_symlink))
+_LISTING_CACHE = {}
+_LISTING_LOCK = threading.Lock()
+
+_MAGIC = re.compile('[*?[]')
+
+
+def list_directory(directory, filesystem=None):
+    """list a directory through a filesystem adapter, with a per-process
+    cache which is invalidated when the modification time of the directory
+    changes (listings are not cached if the adapter gives no mtime)
+
+    Parameters
+    ----------
+    directory : str
+        path to the directory
+    filesystem : filesystems.FileSystem or None
+        adapter to list with, if None the current one
+        (Default value = None)
+
+    Returns
+    -------
+    list
+        sorted list of (name, is_dir, is_file, is_symlink) of its entries
+
+    Raises
+    ------
+    OSError
+        if the directory cannot be listed
+    """
+    fs = filesystems.get_filesystem() if filesystem is None else filesystem
+    key = os.path.abspath(directory)
+    info = fs.stat(key)
+    if not info.exists:
+        raise FileNotFoundError(errno.ENOENT, os.strerror(errno.ENOENT), key)
+    if not info.is_dir:
+        raise NotADirectoryError(errno.ENOTDIR, os.strerror(errno.ENOTDIR),
+                                 key)
+    mtime = info.mtime_ns
+    if mtime is not None:
+        with _LISTING_LOCK:
+            cached = _LISTING_CACHE.get(key)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+    entries = sorted(tuple(entry) for entry in fs.scandir(key))
+    if mtime is not None:
+        with _LISTING_LOCK:
+            _LISTING_CACHE[key] = (mtime, entries)
+    return entries
+
+
+def clear_listing_cache():
+    """clear the in-process cache of directory listings"""
+    with _LISTING_LOCK:
+        _LISTING_CACHE.clear()
+
+
+def _split_pattern(pattern):
+    # split into the literal base directory and the components to match
+    drive, rest = os.path.splitdrive(pattern)
+    parts = re.split(r'[\\/]' if os.sep == '\\' else '/', rest)
+    base = drive + (os.sep if rest[:1] in ('/', os.sep) else '')
+    parts = [p for p in parts if p]
+    i = 0
+    while i < len(parts) - 1 and not _MAGIC.search(parts[i]):
+        i += 1
+    return os.path.join(base, *parts[:i]) if (base or i) else '', parts[i:]
+
+
+def _hidden(name, part):
+    return name.startswith('.') and not part.startswith('.')
+
+
+def _match(directory, parts, recursive, matches, visited, fs):
+    listing = list_directory(directory or os.curdir, fs)
+    visited.add(directory or os.curdir)
+    part, rest = parts[0], parts[1:]
+    if recursive and part == '**':
+        if rest:
+            # ** matches zero or more directories
+            _match(directory, rest, recursive, matches, visited, fs)
+        for name, is_dir, is_file, is_symlink in listing:
+            if name.startswith('.'):
+                continue
+            path = os.path.join(directory, name)
+            if is_dir and not is_symlink:
+                _match(path, parts, recursive, matches, visited, fs)
+            elif is_file and not rest:
+                matches.append(path)
+        return
+    if not _MAGIC.search(part):
+        listing = [entry for entry in listing if entry[0] == part]
+    for name, is_dir, is_file, is_symlink in listing:
+        if _hidden(name, part) or not fnmatch.fnmatch(name, part):
+            continue
+        path = os.path.join(directory, name)
+        if rest:
+            if is_dir:
+                _match(path, rest, recursive, matches, visited, fs)
+        elif is_file:
+            matches.append(path)
+
+
+def glob_files(pattern, recursive=True, filesystem=None):
+    """find the files matching a glob pattern, using cached directory listings
+
+    Parameters
+    ----------
+    pattern : str
+        glob pattern, as for :func:`glob.glob` (e.g. 'data/*/raw_*.tif')
+    recursive : bool
+        whether '**' matches any number of directories (Default value = True)
+    filesystem : filesystems.FileSystem or None
+        adapter to list directories with, if None the current one
+        (Default value = None)
+
+    Returns
+    -------
+    tuple
+        (sorted list of matching files, set of the directories listed)
+    """
+    base, parts = _split_pattern(pattern)
+    matches = []
+    visited = set()
+    if not parts:
+        return matches, visited
+    fs = filesystems.get_filesystem() if filesystem is None else filesystem
+    try:
+        _match(base, parts, recursive, matches, visited, fs)
+    except (FileNotFoundError, NotADirectoryError):
+        pass
+    return sorted(set(matches)), visited
+
+
+def unreadable_files(files, filesystem=None):
+    """find the files the user cannot read, checking them in one batch
+    through a filesystem adapter
+
+    Parameters
+    ----------
+    files : list of str
+        paths to files
+    filesystem : filesystems.FileSystem or None
+        adapter to check with, if None the current one (Default value = None)
+
+    Returns
+    -------
+    list
+        the files that cannot be read
+    """
+    fs = filesystems.get_filesystem() if filesystem is None else filesystem
+    infos = fs.stat_many(files)
+    unreadable = []
+    for path in files:
+        info = infos.get(path)
+        if info is None:
+            # left out of the batch (e.g. on an unresponsive mount)
+            info = fs.stat(path)
+        if not info.readable:
+            unreadable.append(path)
+    return unreadable
+
+
+class InputGlob(mm.fields.Field):
+    """InputGlob is a :class:`marshmallow.fields.Field` which takes a glob pattern
+    (or a list of them) and loads as the sorted list of the readable files matching it.
+    Directories are enumerated through the filesystem adapter of
+    :mod:`argschema.filesystems`, and their listings are cached for the life of the
+    process (until the directory is modified).
+
+    Parameters
+    ----------
+    pattern : str or None
+        if given, values are directories and this pattern is matched inside them
+        (e.g. '*.tif'), otherwise values are patterns themselves (Default=None)
+    min_matches : int
+        minimum number of matching files (Default=1)
+    max_matches : int or None
+        maximum number of matching files (Default=None)
+    recursive : bool
+        whether '**' matches any number of directories (Default=True)
+    kwargs :
+        the same as any :class:`~marshmallow.fields.Field` receives
+    """
+    default_error_messages = {
+        'invalid': 'Not a valid glob pattern or list of patterns.',
+    }
+
+    def __init__(self, pattern=None, min_matches=1, max_matches=None,
+                 recursive=True, **kwargs):
+        self.pattern = pattern
+        self.min_matches = min_matches
+        self.max_matches = max_matches
+        self.recursive = recursive
+        super(InputGlob, self).__init__(**kwargs)
+
+    def patterns(self, value):
+        """get the glob patterns a value stands for
+
+        Parameters
+        ----------
+        value : str or list of str
+            pattern(s), or directories if this field has a pattern
+
+        Returns
+        -------
+        list of str
+            glob patterns
+        """
+        values = [value] if isinstance(value, str) else value
+        if (not isinstance(values, (list, tuple)) or
+                not all(isinstance(v, str) for v in values)):
+            raise self.make_error('invalid')
+        if self.pattern is not None:
+            values = [os.path.join(v, self.pattern) for v in values]
+        return list(values)
+
+    def expand(self, value):
+        """find the files matching a value
+
+        Parameters
+        ----------
+        value : str or list of str
+            pattern(s), or directories if this field has a pattern
+
+        Returns
+        -------
+        tuple
+            (sorted list of matching files, set of the directories listed)
+        """
+        matches = set()
+        visited = set()
+        fs = filesystems.get_filesystem()
+        for pattern in self.patterns(value):
+            files, dirs = glob_files(pattern, self.recursive, fs)
+            matches.update(files)
+            visited.update(dirs)
+        return sorted(matches), visited
+
+    def _deserialize(self, value, attr, data, **kwargs):
+        files, visited = self.expand(value)
+        if len(files) < self.min_matches:
+            raise mm.ValidationError('{} matches {} files, expected at least '
+                                     '{}'.format(value, len(files),
+                                                 self.min_matches))
+        if self.max_matches is not None and len(files) > self.max_matches:
+            raise mm.ValidationError('{} matches {} files, expected at most '
+                                     '{}'.format(value, len(files),
+                                                 self.max_matches))
+        unreadable = unreadable_files(files)
+        if unreadable:
+            raise mm.ValidationError('{} matches unreadable files: {}'.format(
+                value, ', '.join(unreadable[:10])))
+        return files
@@ -0,0 +1,99 @@
+'''marshmallow List field with a vectorized path for long numeric lists'''
+import numpy as np
+import marshmallow as mm
+
+# lists shorter than this are always loaded element by element
+VECTORIZE_MIN_LENGTH = 64
+
+_DTYPES = {mm.fields.Float: np.float64, mm.fields.Integer: np.int64}
+_ELEMENT_TYPES = {mm.fields.Float: {int, float}, mm.fields.Integer: {int}}
+
+
+class List(mm.fields.List):
+    """List is a :class:`marshmallow.fields.List` which loads long lists of a
+    plain Float or Integer inner field (with at most Range validators) with
+    numpy, converting and validating all the elements at once.  The elements
+    must be python ints (or floats for Float); anything else, or any element
+    failing validation, falls back to marshmallow's element by element
+    loading, so the values and error messages are the same as marshmallow's.
+
+    Parameters
+    ----------
+    cls_or_instance : marshmallow.fields.Field or type
+        field of the elements
+    as_array : bool
+        load as a numpy array (float64 or int64 for the vectorized inner
+        fields) rather than a list (Default=False)
+    kwargs :
+        the same as any :class:`~marshmallow.fields.List` receives
+    """
+
+    def __init__(self, cls_or_instance, as_array=False, **kwargs):
+        self.as_array = as_array
+        super(List, self).__init__(cls_or_instance, **kwargs)
+
+    @property
+    def vectorizable(self):
+        """bool: whether lists of the inner field can be loaded with numpy"""
+        return (type(self.inner) in _DTYPES and
+                all(type(v) is mm.validate.Range for v in self.inner.validators))
+
+    def _vectorized(self, value):
+        # load with numpy, returning None when marshmallow has to do it
+        inner = self.inner
+        if set(map(type, value)) - _ELEMENT_TYPES[type(inner)]:
+            return None
+        try:
+            array = np.asarray(value, dtype=_DTYPES[type(inner)])
+        except (OverflowError, ValueError, TypeError):
+            return None
+        if (isinstance(inner, mm.fields.Float) and not inner.allow_nan and
+                not np.isfinite(array).all()):
+            return None
+        for validator in inner.validators:
+            if validator.min is not None:
+                low = (array >= validator.min if validator.min_inclusive
+                       else array > validator.min)
+                if not low.all():
+                    return None
+            if validator.max is not None:
+                high = (array <= validator.max if validator.max_inclusive
+                        else array < validator.max)
+                if not high.all():
+                    return None
+        return array
+
+    def finish(self, values):
+        """convert loaded values to the type this field loads as
+
+        Parameters
+        ----------
+        values : list or numpy.ndarray
+            loaded elements
+
+        Returns
+        -------
+        list or numpy.ndarray
+            numpy array if as_array, else list
+        """
+        if self.as_array:
+            if isinstance(values, np.ndarray):
+                return values
+            return np.asarray(values, dtype=_DTYPES.get(type(self.inner)))
+        if isinstance(values, np.ndarray):
+            return values.tolist()
+        return values
+
+    def _deserialize(self, value, attr, data, **kwargs):
+        if (isinstance(value, list) and len(value) >= VECTORIZE_MIN_LENGTH and
+                self.vectorizable):
+            array = self._vectorized(value)
+            if array is not None:
+                return self.finish(array)
+        return self.finish(super(List, self)._deserialize(
+            value, attr, data, **kwargs))
+
+    def _serialize(self, value, attr, obj, **kwargs):
+        if isinstance(value, np.ndarray):
+            value = value.tolist()
+        return super(List, self)._serialize(value, attr, obj, **kwargs)
@@ -0,0 +1,815 @@
+'''module of filesystem adapters used by the path fields (InputFile, InputDir,
+OutputFile and OutputDir) to check paths, so that paths can be validated on
+storage other than the local filesystem, and checked in batches
+
+The adapter used is the one set with :func:`set_filesystem` (or temporarily
+with :func:`use_filesystem`), :class:`LocalFileSystem` by default.  Before
+loading, ArgSchemaParser checks all the paths of the input in one batch with
+:func:`batch_checks` (the local adapter stats them in a pool of threads), and
+the fields then find the results in the batch cache.
+
+To keep a hung (e.g. stale NFS) mount from blocking validation forever, wrap
+the adapter in a :class:`TimeoutFileSystem`, which runs every check in a
+worker thread with a timeout, and fails fast once a mount has timed out.
+
+InputGlob and directory indexes list directories through the adapter too,
+while checksums always read the local filesystem.
+'''
+import os
+import sys
+import stat
+import time
+import errno
+import queue
+import tempfile
+import threading
+import contextlib
+import collections
+import concurrent.futures
+import weakref
+import marshmallow as mm
+
+# result of checking a path: whether it exists, is a (regular) file, is a
+# directory, can be read (a file opened or a directory listed) and written,
+# its permission bits, size and modification time in ns (or None if unknown)
+PathInfo = collections.namedtuple(
+    'PathInfo', ['exists', 'is_file', 'is_dir', 'readable', 'writable', 'mode',
+                 'size', 'mtime_ns'], defaults=(None, None))
+
+MISSING = PathInfo(False, False, False, False, False, None)
+
+# entry of a directory listing (symbolic links to directories are is_dir too)
+DirEntry = collections.namedtuple(
+    'DirEntry', ['name', 'is_dir', 'is_file', 'is_symlink'])
+
+# number of threads used by LocalFileSystem.stat_many
+DEFAULT_MAX_WORKERS = 8
+
+# number of paths TimeoutFileSystem.stat_many checks within one timeout
+DEFAULT_BATCH_SIZE = 32
+
+
+class FileSystem(object):
+    """interface of the filesystem adapters used by the path fields.
+    Subclasses implement stat, scandir, makedirs and probe_write, and can
+    override stat_many to check many paths at once"""
+
+    def stat(self, path):
+        """check a path
+
+        Parameters
+        ----------
+        path : str
+            path to check
+
+        Returns
+        -------
+        PathInfo
+            the result, MISSING if the path does not exist
+        """
+        raise NotImplementedError
+
+    def stat_many(self, paths):
+        """check several paths
+
+        Parameters
+        ----------
+        paths : iterable of str
+            paths to check
+
+        Returns
+        -------
+        dict
+            :class:`PathInfo` keyed by path
+        """
+        return {path: self.stat(path) for path in paths}
+
+    def scandir(self, path):
+        """list a directory
+
+        Parameters
+        ----------
+        path : str
+            path to the directory
+
+        Returns
+        -------
+        list
+            :class:`DirEntry` of the entries of the directory
+
+        Raises
+        ------
+        OSError
+            if the directory cannot be listed
+        """
+        raise NotImplementedError
+
+    def makedirs(self, path, mode=None):
+        """create a directory and its missing parents
+
+        Parameters
+        ----------
+        path : str
+            path to the directory
+        mode : int or None
+            permission bits of the directory (Default value = None)
+
+        Raises
+        ------
+        OSError
+            if the directory cannot be created (errno EEXIST if it exists)
+        """
+        raise NotImplementedError
+
+    def probe_write(self, directory):
+        """check that a file can be created in a directory by creating (and
+        removing) a temporary file
+
+        Parameters
+        ----------
+        directory : str
+            path to the directory
+
+        Raises
+        ------
+        OSError
+            if the file cannot be created (errno ENOENT if the directory does
+            not exist, EACCES if it cannot be written to)
+        """
+        raise NotImplementedError
+
+
+class WindowsNamedTemporaryFile():
+    def __init__(self, dir=None, mode=None):
+        import uuid
+        self.filename = os.path.join(dir, str(uuid.uuid4()))
+        self.mode = mode
+
+    def __enter__(self):
+        self.open_file = open(self.filename, self.mode)
+        return self.open_file
+
+    def __exit__(self, *args):
+        self.open_file.close()
+        os.remove(self.filename)
+
+
+if sys.platform == "win32":
+    NamedTemporaryFile = WindowsNamedTemporaryFile
+else:
+    NamedTemporaryFile = tempfile.NamedTemporaryFile
+
+
+class LocalFileSystem(FileSystem):
+    """adapter for the local filesystem, with os.stat and os.access
+
+    Parameters
+    ----------
+    max_workers : int
+        number of threads used to check many paths (Default value = 8)
+    """
+
+    def __init__(self, max_workers=DEFAULT_MAX_WORKERS):
+        self.max_workers = max_workers
+
+    def stat(self, path):
+        try:
+            st = os.stat(path)
+        except (OSError, ValueError):
+            return MISSING
+        is_file = stat.S_ISREG(st.st_mode)
+        is_dir = stat.S_ISDIR(st.st_mode)
+        readable = False
+        if is_file:
+            try:
+                with open(path, 'rb'):
+                    readable = True
+            except OSError:
+                pass
+        elif is_dir:
+            if sys.platform == "win32":
+                try:
+                    with os.scandir(path) as it:
+                        next(it, None)
+                    readable = True
+                except OSError:
+                    pass
+            else:
+                readable = os.access(path, os.R_OK)
+        return PathInfo(True, is_file, is_dir, readable,
+                        os.access(path, os.W_OK), st.st_mode & 0o777,
+                        st.st_size, st.st_mtime_ns)
+
+    def stat_many(self, paths):
+        paths = list(paths)
+        if len(paths) < 2 or not self.max_workers or self.max_workers < 2:
+            return super(LocalFileSystem, self).stat_many(paths)
+        with concurrent.futures.ThreadPoolExecutor(
+                min(self.max_workers, len(paths))) as pool:
+            return dict(zip(paths, pool.map(self.stat, paths)))
+
+    def scandir(self, path):
+        entries = []
+        with os.scandir(path) as it:
+            for entry in it:
+                # the entry types come from scandir, without a stat per entry
+                try:
+                    entries.append(DirEntry(entry.name, entry.is_dir(),
+                                            entry.is_file(),
+                                            entry.is_symlink()))
+                except OSError:  # pragma: no cover
+                    entries.append(DirEntry(entry.name, False, False, False))
+        return entries
+
+    def makedirs(self, path, mode=None):
+        os.makedirs(path)
+        if mode is not None:
+            os.chmod(path, mode)
+
+    def probe_write(self, directory):
+        with NamedTemporaryFile(mode='w', dir=directory) as tfile:
+            tfile.write('0')
+            tfile.close()
+
+
+class MemoryFileSystem(FileSystem):
+    """adapter for an in-memory filesystem, e.g. for tests
+
+    Parameters
+    ----------
+    files : iterable of str or None
+        paths of the files (their parent directories exist too)
+        (Default value = None)
+    directories : iterable of str or None
+        paths of the directories (Default value = None)
+    unreadable : iterable of str or None
+        paths that cannot be read (Default value = None)
+    unwritable : iterable of str or None
+        paths (directories) that cannot be written to (Default value = None)
+    """
+
+    def __init__(self, files=None, directories=None, unreadable=None,
+                 unwritable=None):
+        self._lock = threading.Lock()
+        self.files = set()
+        self.directories = set([os.sep])
+        self.modes = {}
+        self.unreadable = set(self._key(p) for p in unreadable or [])
+        self.unwritable = set(self._key(p) for p in unwritable or [])
+        for path in directories or []:
+            self._add_directory(self._key(path))
+        for path in files or []:
+            self.add_file(path)
+
+    @staticmethod
+    def _key(path):
+        return os.path.normpath(os.path.join(os.sep, path))
+
+    def _add_directory(self, key):
+        while key not in self.directories:
+            self.directories.add(key)
+            key = os.path.dirname(key)
+
+    def add_file(self, path):
+        """add a file (and its parent directories)
+
+        Parameters
+        ----------
+        path : str
+            path to the file
+        """
+        key = self._key(path)
+        with self._lock:
+            self._add_directory(os.path.dirname(key))
+            self.files.add(key)
+
+    def stat(self, path):
+        key = self._key(path)
+        with self._lock:
+            is_file = key in self.files
+            is_dir = key in self.directories
+            if not (is_file or is_dir):
+                return MISSING
+            return PathInfo(True, is_file, is_dir, key not in self.unreadable,
+                            key not in self.unwritable,
+                            self.modes.get(key, 0o644 if is_file else 0o755),
+                            0 if is_file else None)
+
+    def scandir(self, path):
+        key = self._key(path)
+        with self._lock:
+            if key in self.files:
+                raise OSError(errno.ENOTDIR, os.strerror(errno.ENOTDIR), path)
+            if key not in self.directories:
+                raise OSError(errno.ENOENT, os.strerror(errno.ENOENT), path)
+            if key in self.unreadable:
+                raise OSError(errno.EACCES, os.strerror(errno.EACCES), path)
+            return [DirEntry(os.path.basename(p), p in self.directories,
+                             p in self.files, False)
+                    for p in self.files | self.directories
+                    if p != key and os.path.dirname(p) == key]
+
+    def makedirs(self, path, mode=None):
+        key = self._key(path)
+        with self._lock:
+            if key in self.directories or key in self.files:
+                raise OSError(errno.EEXIST, os.strerror(errno.EEXIST), path)
+            parent = os.path.dirname(key)
+            while parent not in self.directories:
+                if parent in self.files:
+                    raise OSError(errno.ENOTDIR, os.strerror(errno.ENOTDIR),
+                                  path)
+                parent = os.path.dirname(parent)
+            if parent in self.unwritable:
+                raise OSError(errno.EACCES, os.strerror(errno.EACCES), path)
+            self._add_directory(key)
+            if mode is not None:
+                self.modes[key] = mode
+
+    def probe_write(self, directory):
+        key = self._key(directory)
+        with self._lock:
+            if key not in self.directories:
+                raise OSError(errno.ENOENT, os.strerror(errno.ENOENT),
+                              directory)
+            if key in self.unwritable:
+                raise OSError(errno.EACCES, os.strerror(errno.EACCES),
+                              directory)
+
+
+# mount table used to find the mount of a path, and when it was read
+_MOUNTS = []
+_MOUNTS_LOCK = threading.Lock()
+MOUNTS_FILE = '/proc/self/mounts'
+MOUNTS_MAX_AGE = 60.0
+
+
+def _mount_points():
+    with _MOUNTS_LOCK:
+        if _MOUNTS and time.monotonic() - _MOUNTS[0] < MOUNTS_MAX_AGE:
+            return _MOUNTS[1]
+        mounts = []
+        try:
+            # reading the table does not touch the mounts themselves
+            with open(MOUNTS_FILE) as fp:
+                for line in fp:
+                    parts = line.split()
+                    if len(parts) > 1:
+                        mounts.append(parts[1].replace('\\040', ' '))
+        except OSError:
+            pass
+        mounts.sort(key=len, reverse=True)
+        _MOUNTS[:] = [time.monotonic(), mounts]
+        return mounts
+
+
+def mount_point(path):
+    """find the mount point of a path from the mount table, without accessing
+    the path (which could hang), or if there is no mount table its top level
+    directory
+
+    Parameters
+    ----------
+    path : str
+        path
+
+    Returns
+    -------
+    str
+        mount point of the path
+    """
+    path = os.path.abspath(path)
+    for mount in _mount_points():
+        if path == mount or path.startswith(mount.rstrip(os.sep) + os.sep):
+            return mount
+    drive, rest = os.path.splitdrive(path)
+    parts = [p for p in rest.split(os.sep) if p]
+    return drive + os.sep + (parts[0] if parts else '')
+
+
+class CircuitBreaker(object):
+    """per-mount circuit breaker: after failure_threshold consecutive timeouts
+    on a mount, checks on it fail immediately until reset_after seconds have
+    passed, after which one check is let through to probe it again
+
+    Parameters
+    ----------
+    failure_threshold : int
+        number of consecutive timeouts which open the circuit (Default value = 1)
+    reset_after : float
+        seconds before an open circuit lets a check through (Default value = 60)
+    """
+
+    def __init__(self, failure_threshold=1, reset_after=60.0):
+        self.failure_threshold = failure_threshold
+        self.reset_after = reset_after
+        self._lock = threading.Lock()
+        self._failures = {}
+        self._opened = {}
+
+    def allow(self, mount):
+        """check whether a check on a mount can go ahead
+
+        Parameters
+        ----------
+        mount : str
+            mount point
+
+        Returns
+        -------
+        bool
+            False if the circuit of the mount is open
+        """
+        with self._lock:
+            opened = self._opened.get(mount)
+            if opened is None:
+                return True
+            if time.monotonic() - opened >= self.reset_after:
+                # half open: let this check through, and re-open until it ends
+                self._opened[mount] = time.monotonic()
+                return True
+            return False
+
+    def record(self, mount, ok):
+        """record the outcome of a check on a mount
+
+        Parameters
+        ----------
+        mount : str
+            mount point
+        ok : bool
+            whether the check completed in time
+        """
+        with self._lock:
+            if ok:
+                self._failures.pop(mount, None)
+                self._opened.pop(mount, None)
+                return
+            failures = self._failures.get(mount, 0) + 1
+            self._failures[mount] = failures
+            if failures >= self.failure_threshold:
+                self._opened[mount] = time.monotonic()
+
+    def reset(self):
+        """close all the circuits"""
+        with self._lock:
+            self._failures.clear()
+            self._opened.clear()
+
+
+# circuit breaker shared by the TimeoutFileSystems of this process
+BREAKER = CircuitBreaker()
+
+
+class _CheckPool(object):
+    # daemon threads running the checks of TimeoutFileSystems, reused from
+    # one check to the next.  A thread stuck in a hung check is abandoned
+    # (it is never idle again), and since it is a daemon thread it does not
+    # keep the process from exiting, unlike the threads of concurrent.futures
+
+    def __init__(self):
+        self._tasks = queue.Queue()
+        self._lock = threading.Lock()
+        self._idle = 0
+
+    def _work(self):
+        while True:
+            func, args, result, done = self._tasks.get()
+            try:
+                result['value'] = func(*args)
+            except BaseException as e:
+                result['error'] = e
+            done.set()
+            with self._lock:
+                self._idle += 1
+
+    def submit(self, func, args):
+        result = {}
+        done = threading.Event()
+        with self._lock:
+            # every task put is matched by an idle thread or a new one
+            spawn = not self._idle
+            if not spawn:
+                self._idle -= 1
+        if spawn:
+            threading.Thread(target=self._work, daemon=True,
+                             name='argschema-filesystem-check').start()
+        self._tasks.put((func, args, result, done))
+        return result, done
+
+
+_POOL = _CheckPool()
+
+
+def _run_with_timeout(func, args, timeout):
+    # run func in a pool thread, which is abandoned if it does not finish
+    result, done = _POOL.submit(func, args)
+    if not done.wait(timeout):
+        return False, None
+    if 'error' in result:
+        raise result['error']
+    return True, result.get('value')
+
+
+class TimeoutFileSystem(FileSystem):
+    """adapter running the checks of another adapter in worker threads with a
+    timeout, raising a ValidationError when a check times out or when the
+    mount of the path is known to be unresponsive (see :class:`CircuitBreaker`)
+
+    Parameters
+    ----------
+    filesystem : FileSystem or None
+        adapter to wrap, if None a :class:`LocalFileSystem`
+        (Default value = None)
+    timeout : float
+        seconds each check can take (Default value = 10)
+    breaker : CircuitBreaker or None
+        circuit breaker, if None the one shared by the process (BREAKER)
+        (Default value = None)
+    batch_size : int
+        number of paths checked together by stat_many within the timeout of
+        one check; the paths of a batch which times out are checked one by
+        one (Default value = 32)
+    """
+
+    def __init__(self, filesystem=None, timeout=10.0, breaker=None,
+                 batch_size=DEFAULT_BATCH_SIZE):
+        self.filesystem = LocalFileSystem() if filesystem is None else filesystem
+        self.timeout = timeout
+        self.breaker = BREAKER if breaker is None else breaker
+        self.batch_size = batch_size
+
+    def run(self, func, path, *args):
+        """run a function checking a path with the timeout of this adapter
+
+        Parameters
+        ----------
+        func : callable
+            function func(path, *args)
+        path : str
+            path checked by func, whose mount point must be responsive
+        args :
+            other arguments of func
+
+        Returns
+        -------
+        object
+            the result of func
+
+        Raises
+        ------
+        marshmallow.ValidationError
+            if func times out or the mount point is not responding
+        """
+        mount = mount_point(path)
+        if not self.breaker.allow(mount):
+            raise mm.ValidationError(
+                "cannot check {}: the filesystem mounted at {} is not "
+                "responding".format(path, mount))
+        ok, value = _run_with_timeout(func, (path,) + args, self.timeout)
+        self.breaker.record(mount, ok)
+        if not ok:
+            raise mm.ValidationError(
+                "checking {} timed out after {}s: the filesystem mounted at {} "
+                "is not responding".format(path, self.timeout, mount))
+        return value
+
+    def _call(self, name, path, *args):
+        return self.run(getattr(self.filesystem, name), path, *args)
+
+    def stat(self, path):
+        return self._call('stat', path)
+
+    def stat_many(self, paths):
+        by_mount = {}
+        for path in paths:
+            by_mount.setdefault(mount_point(path), []).append(path)
+        infos = {}
+        # paths left out (on unresponsive mounts) are checked one by one by
+        # the fields, which then report the error
+        for mount, mount_paths in by_mount.items():
+            for i in range(0, len(mount_paths), self.batch_size):
+                if not self.breaker.allow(mount):
+                    break
+                batch = mount_paths[i:i + self.batch_size]
+                ok, value = _run_with_timeout(self.filesystem.stat_many,
+                                              (batch,), self.timeout)
+                if ok:
+                    self.breaker.record(mount, True)
+                    infos.update(value)
+                    continue
+                # a slow batch does not mean the mount is hung, so it does
+                # not count against it: check its paths one by one instead
+                for path in batch:
+                    try:
+                        infos[path] = self.stat(path)
+                    except mm.ValidationError:
+                        break
+        return infos
+
+    def scandir(self, path):
+        return self._call('scandir', path)
+
+    def makedirs(self, path, mode=None):
+        return self._call('makedirs', path, mode)
+
+    def probe_write(self, directory):
+        return self._call('probe_write', directory)
+
+
+_DEFAULT = [LocalFileSystem()]
+# adapters set by use_filesystem in this thread, which take precedence
+_OVERRIDE = threading.local()
+
+
+def get_filesystem():
+    """get the filesystem adapter used by the path fields (in this thread)
+
+    Returns
+    -------
+    FileSystem
+        the adapter
+    """
+    stack = getattr(_OVERRIDE, 'stack', None)
+    if stack:
+        return stack[-1]
+    return _DEFAULT[0]
+
+
+def set_filesystem(filesystem):
+    """set the filesystem adapter used by the path fields (in all threads)
+
+    Parameters
+    ----------
+    filesystem : FileSystem or None
+        the adapter, None for a :class:`LocalFileSystem`
+
+    Returns
+    -------
+    FileSystem
+        the adapter used until now
+    """
+    previous = _DEFAULT[0]
+    _DEFAULT[0] = LocalFileSystem() if filesystem is None else filesystem
+    return previous
+
+
+@contextlib.contextmanager
+def use_filesystem(filesystem):
+    """context manager using a filesystem adapter for the path fields
+    validated in this thread
+
+    Parameters
+    ----------
+    filesystem : FileSystem
+        the adapter
+    """
+    stack = getattr(_OVERRIDE, 'stack', None)
+    if stack is None:
+        stack = _OVERRIDE.stack = []
+    stack.append(filesystem)
+    try:
+        yield filesystem
+    finally:
+        stack.pop()
+
+
+@contextlib.contextmanager
+def timeout_checks(timeout):
+    """context manager wrapping the filesystem adapter of this thread in a
+    :class:`TimeoutFileSystem`, unless timeout is None or the adapter
+    already is one
+
+    Parameters
+    ----------
+    timeout : float or None
+        seconds each check can take
+    """
+    filesystem = get_filesystem()
+    if timeout is None or isinstance(filesystem, TimeoutFileSystem):
+        yield filesystem
+    else:
+        with use_filesystem(TimeoutFileSystem(filesystem, timeout)) as timed:
+            yield timed
+
+
+# results of the batch being validated by this thread, keyed by path
+_BATCH = threading.local()
+
+
+def path_info(path):
+    """check a path with the filesystem adapter, or get the result from the
+    batch of checks being validated
+
+    Parameters
+    ----------
+    path : str
+        path to check
+
+    Returns
+    -------
+    PathInfo
+        the result
+    """
+    cache = getattr(_BATCH, 'cache', None)
+    if cache is not None:
+        info = cache.get(path)
+        if info is not None:
+            return info
+    return get_filesystem().stat(path)
+
+
+def invalidate(path):
+    """forget the batched result of a path, e.g. after creating it
+
+    Parameters
+    ----------
+    path : str
+        path whose state changed
+    """
+    cache = getattr(_BATCH, 'cache', None)
+    if cache is not None:
+        cache.pop(path, None)
+
+
+@contextlib.contextmanager
+def batch_checks(paths):
+    """context manager checking paths in one batch, with
+    FileSystem.stat_many, whose results :func:`path_info` then returns
+    within the context (in this thread).  Paths already checked by an
+    enclosing batch are not checked again
+
+    Parameters
+    ----------
+    paths : iterable of str
+        paths to check
+    """
+    outer = getattr(_BATCH, 'cache', None)
+    cache = dict(outer) if outer is not None else {}
+    todo = [path for path in set(paths) if path not in cache]
+    if todo:
+        cache.update(get_filesystem().stat_many(todo))
+    _BATCH.cache = cache
+    try:
+        yield cache
+    finally:
+        _BATCH.cache = outer
+
+
+_DECLARES_PATHS = weakref.WeakKeyDictionary()
+
+
+def _declares_paths(schema, seen=()):
+    from . import fields
+    key = (tuple(sorted(schema.only)) if schema.only else None,
+           tuple(sorted(schema.exclude)))
+    known = _DECLARES_PATHS.setdefault(type(schema), {})
+    if key in known:
+        return known[key]
+    if type(schema) in seen:
+        return False
+    found = False
+    for field in schema.fields.values():
+        while isinstance(field, mm.fields.List):
+            field = field.inner
+        if isinstance(field, (fields.InputFile, fields.InputDir,
+                              fields.OutputFile, fields.OutputDir)):
+            found = True
+        elif isinstance(field, mm.fields.Nested):
+            found = _declares_paths(field.schema, seen + (type(schema),))
+        if found:
+            break
+    known[key] = found
+    return found
+
+
+def schema_paths(schema, d):
+    """find the paths the path fields of a schema will check when loading
+    a dictionary
+
+    Parameters
+    ----------
+    schema : marshmallow.Schema
+        schema that will load d
+    d : dict
+        dictionary to be loaded
+
+    Returns
+    -------
+    list of str
+        the paths (for output files, their directories)
+    """
+    if not _declares_paths(schema):
+        return []
+    from . import utils
+    from . import fields
+    paths = []
+    for path, field, value in utils.iter_field_values(schema, d):
+        if not isinstance(value, str):
+            continue
+        if isinstance(field, fields.OutputFile):
+            paths.append(os.path.dirname(value))
+        elif isinstance(field, (fields.InputFile, fields.InputDir,
+                                fields.OutputDir)):
+            paths.append(value)
+    return paths
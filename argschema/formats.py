@@ -0,0 +1,193 @@
+'''module for reading and writing input and output files in formats other than
+plain json text: gzip or zstandard compressed json, and msgpack (optionally
+compressed) with numpy arrays stored as raw buffers.  The format is detected
+from the file extension, and for compression also from the file contents.
+
+msgpack and zstandard support require the optional msgpack and zstandard
+packages (pip install argschema[FORMATS])
+'''
+import io
+import json
+import gzip
+import numpy as np
+
+# msgpack extension type code used for numpy arrays
+NUMPY_EXT_TYPE = 1
+
+# compression level used when writing gzip files
+GZIP_LEVEL = 6
+
+# compression level used when writing zstandard files
+ZSTD_LEVEL = 3
+
+GZIP_MAGIC = b'\x1f\x8b'
+ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'
+
+MSGPACK_EXTENSIONS = ('.msgpack', '.mpk')
+
+# extensions of delimited text files of numbers (optionally gzipped), read by
+# read_value with numpy.loadtxt, with their delimiter (None for whitespace)
+TEXT_DELIMITERS = {'.txt': None, '.dat': None, '.csv': ',', '.tsv': '\t'}
+
+
+def detect_format(path):
+    """detect the format of a file from its extension
+
+    Parameters
+    ----------
+    path : str
+        path to the file
+
+    Returns
+    -------
+    tuple
+        (serialization, compression) where serialization is 'json' or 'msgpack'
+        and compression is None, 'gzip' or 'zstd'
+    """
+    name = path.lower()
+    compression = None
+    if name.endswith('.gz'):
+        compression = 'gzip'
+        name = name[:-3]
+    elif name.endswith('.zst'):
+        compression = 'zstd'
+        name = name[:-4]
+    serialization = 'msgpack' if name.endswith(MSGPACK_EXTENSIONS) else 'json'
+    return serialization, compression
+
+
+def _import_msgpack():
+    try:
+        import msgpack
+    except ImportError:
+        raise ImportError("reading and writing msgpack files requires the "
+                          "msgpack package (pip install msgpack)")
+    return msgpack
+
+
+def _import_zstd():
+    try:
+        import zstandard
+    except ImportError:
+        raise ImportError("reading and writing .zst files requires the "
+                          "zstandard package (pip install zstandard)")
+    return zstandard
+
+
+def _msgpack_default(obj):
+    if isinstance(obj, np.ndarray):
+        if obj.dtype.hasobject:
+            return obj.tolist()
+        msgpack = _import_msgpack()
+        payload = msgpack.packb([obj.dtype.str, list(obj.shape),
+                                 np.ascontiguousarray(obj).tobytes()])
+        return msgpack.ExtType(NUMPY_EXT_TYPE, payload)
+    if isinstance(obj, np.generic):
+        return obj.item()
+    raise TypeError('Object of type {} is not msgpack serializable'.format(
+        type(obj).__name__))
+
+
+def _msgpack_ext_hook(code, data):
+    msgpack = _import_msgpack()
+    if code == NUMPY_EXT_TYPE:
+        dtype, shape, buf = msgpack.unpackb(data)
+        return np.frombuffer(buf, dtype=np.dtype(dtype)).reshape(shape)
+    return msgpack.ExtType(code, data)
+
+
+def _decompress(data):
+    if data.startswith(GZIP_MAGIC):
+        return gzip.decompress(data)
+    if data.startswith(ZSTD_MAGIC):
+        zstandard = _import_zstd()
+        return zstandard.ZstdDecompressor().decompressobj().decompress(data)
+    return data
+
+
+def read_input(path):
+    """read the contents of an input file in any of the supported formats,
+    compression is detected from the contents rather than the extension
+
+    Parameters
+    ----------
+    path : str
+        path to the file
+
+    Returns
+    -------
+    object
+        deserialized contents, numpy arrays in msgpack files are returned
+        as (read-only) numpy arrays
+    """
+    serialization = detect_format(path)[0]
+    with open(path, 'rb') as fp:
+        data = fp.read()
+    data = _decompress(data)
+    if serialization == 'msgpack':
+        msgpack = _import_msgpack()
+        return msgpack.unpackb(data, ext_hook=_msgpack_ext_hook,
+                               strict_map_key=False)
+    return json.loads(data.decode('utf-8'))
+
+
+def read_value(path):
+    """read a single value, e.g. a list or an array given on the command line
+    as @path, from a .npy file, a delimited text file of numbers (.txt, .dat,
+    .csv or .tsv, optionally .gz) or any of the formats of :func:`read_input`
+
+    Parameters
+    ----------
+    path : str
+        path to the file
+
+    Returns
+    -------
+    object
+        contents of the file, numpy.ndarray for .npy and text files
+    """
+    name = path.lower()
+    if name.endswith('.npy'):
+        return np.load(path, allow_pickle=False)
+    if name.endswith('.gz'):
+        name = name[:-3]
+    for extension, delimiter in TEXT_DELIMITERS.items():
+        if name.endswith(extension):
+            return np.loadtxt(path, delimiter=delimiter, ndmin=1)
+    return read_input(path)
+
+
+def write_output(data, path, **json_dump_options):
+    """write data to an output file in the format given by its extension
+
+    Parameters
+    ----------
+    data : object
+        data to write
+    path : str
+        path to the file
+    **json_dump_options :
+        will be passed through to json.dump for json files,
+        and are ignored for msgpack files
+    """
+    serialization, compression = detect_format(path)
+    if serialization == 'msgpack':
+        msgpack = _import_msgpack()
+        payload = msgpack.packb(data, default=_msgpack_default,
+                                use_bin_type=True)
+    elif compression is None:
+        with open(path, 'w') as fp:
+            json.dump(data, fp, **json_dump_options)
+        return
+    else:
+        text = io.StringIO()
+        json.dump(data, text, **json_dump_options)
+        payload = text.getvalue().encode('utf-8')
+
+    if compression == 'gzip':
+        payload = gzip.compress(payload, compresslevel=GZIP_LEVEL)
+    elif compression == 'zstd':
+        zstandard = _import_zstd()
+        payload = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(payload)
+    with open(path, 'wb') as fp:
+        fp.write(payload)
@@ -0,0 +1,179 @@
+'''module for computing canonical hashes of (nested) argument dictionaries,
+which do not depend on the order of keys'''
+import os
+import hashlib
+from collections.abc import Mapping
+import numpy as np
+from . import utils
+from . import fields
+
+# size of the blocks files are read in when hashing their content
+FILE_BLOCK_SIZE = 1 << 20
+
+
+def _update(h, obj):
+    if obj is None:
+        h.update(b'N')
+    elif obj is True or obj is False:
+        h.update(b'T' if obj else b'F')
+    elif isinstance(obj, int):
+        h.update(b'i' + str(obj).encode() + b';')
+    elif isinstance(obj, float):
+        h.update(b'f' + repr(obj).encode() + b';')
+    elif isinstance(obj, str):
+        data = obj.encode('utf-8')
+        h.update(b's' + str(len(data)).encode() + b':' + data)
+    elif isinstance(obj, bytes):
+        h.update(b'b' + str(len(obj)).encode() + b':' + obj)
+    elif isinstance(obj, Mapping):
+        # hash the items in an order which doesn't depend on insertion order
+        items = sorted(((canonical_hash(k), v) for k, v in obj.items()),
+                       key=lambda item: item[0])
+        h.update(b'd' + str(len(items)).encode() + b':')
+        for k, v in items:
+            h.update(k.encode())
+            _update(h, v)
+    elif isinstance(obj, (list, tuple)):
+        h.update(b'l' + str(len(obj)).encode() + b':')
+        for v in obj:
+            _update(h, v)
+    elif isinstance(obj, np.ndarray):
+        h.update(b'a' + obj.dtype.str.encode() + repr(obj.shape).encode())
+        if obj.dtype.hasobject:
+            _update(h, obj.tolist())
+        else:
+            # hash the raw buffer rather than converting element by element
+            h.update(memoryview(np.ascontiguousarray(obj)).cast('B'))
+    elif isinstance(obj, np.generic):
+        h.update(b'g' + obj.dtype.str.encode())
+        _update(h, obj.item())
+    elif isinstance(obj, slice):
+        h.update(b'S')
+        _update(h, (obj.start, obj.stop, obj.step))
+    elif isinstance(obj, (set, frozenset)):
+        h.update(b'e')
+        _update(h, sorted(canonical_hash(v) for v in obj))
+    else:
+        data = repr(obj).encode('utf-8')
+        h.update(b'r' + type(obj).__name__.encode() + b':' +
+                 str(len(data)).encode() + b':' + data)
+
+
+def canonical_hash(obj, algorithm='sha256'):
+    """compute a hash of a nested structure of dictionaries, lists and
+    scalars that is independent of the order of dictionary keys.
+    numpy arrays are hashed by their dtype, shape and buffer, slices and sets
+    by their contents, and objects of other types by their repr.
+
+    Parameters
+    ----------
+    obj : object
+        object to hash
+    algorithm : str
+        name of a :mod:`hashlib` algorithm (Default value = 'sha256')
+
+    Returns
+    -------
+    str
+        hex digest of the object
+    """
+    h = hashlib.new(algorithm)
+    _update(h, obj)
+    return h.hexdigest()
+
+
+def file_digest(path, algorithm='sha256'):
+    """compute a hash of the content of a file, or of a directory as the
+    relative paths and content of all the files in it
+
+    Parameters
+    ----------
+    path : str
+        path to a file or directory
+    algorithm : str
+        name of a :mod:`hashlib` algorithm (Default value = 'sha256')
+
+    Returns
+    -------
+    str
+        hex digest of the content
+    """
+    h = hashlib.new(algorithm)
+    if os.path.isdir(path):
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            for name in sorted(files):
+                filepath = os.path.join(root, name)
+                _update(h, os.path.relpath(filepath, path))
+                _update(h, file_digest(filepath, algorithm))
+        return h.hexdigest()
+    with open(path, 'rb') as fp:
+        for block in iter(lambda: fp.read(FILE_BLOCK_SIZE), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+def path_token(path, path_mode, algorithm='sha256'):
+    """summarize the state of an input path for a fingerprint
+
+    Parameters
+    ----------
+    path : str
+        path to a file or directory
+    path_mode : str
+        'mtime' to use the size and modification time of the path,
+        'content' to use a hash of the content of the path
+    algorithm : str
+        name of a :mod:`hashlib` algorithm (Default value = 'sha256')
+
+    Returns
+    -------
+    tuple
+        (absolute path, size and mtime or content hash),
+        the second element is None if the path does not exist
+    """
+    abspath = os.path.abspath(path)
+    if not os.path.exists(abspath):
+        return (abspath, None)
+    if path_mode == 'mtime':
+        st = os.stat(abspath)
+        return (abspath, (st.st_size, st.st_mtime_ns))
+    elif path_mode == 'content':
+        return (abspath, file_digest(abspath, algorithm))
+    raise ValueError("path_mode must be None, 'mtime' or 'content', "
+                     "not {}".format(path_mode))
+
+
+def args_fingerprint(schema, args, path_mode=None, exclude=(),
+                     algorithm='sha256'):
+    """compute a canonical fingerprint of validated arguments
+
+    Parameters
+    ----------
+    schema : marshmallow.Schema
+        schema the arguments were loaded with
+    args : dict
+        validated arguments
+    path_mode : str or None
+        if 'mtime' or 'content', also hash the state of the paths of
+        InputFile and InputDir fields (see :func:`path_token`),
+        if None only the path strings are hashed (Default value = None)
+    exclude : iterable of str
+        top level keys to leave out of the fingerprint (Default value = ())
+    algorithm : str
+        name of a :mod:`hashlib` algorithm (Default value = 'sha256')
+
+    Returns
+    -------
+    str
+        hex digest of the arguments
+    """
+    args = {k: v for k, v in args.items() if k not in exclude}
+    tokens = []
+    if path_mode is not None:
+        for path, field, value in utils.iter_field_values(
+                schema, args, loaded=True):
+            if (isinstance(field, (fields.InputFile, fields.InputDir)) and
+                    isinstance(value, str)):
+                tokens.append((path, path_token(value, path_mode, algorithm)))
+    return canonical_hash([args, tokens], algorithm)
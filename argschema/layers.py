@@ -0,0 +1,148 @@
+'''module for reading input json files as a stack of layers, where later
+layers override earlier ones and files can include other files via
+an "$include" key.  The most recently parsed files are cached, so shared
+base layers are only parsed once'''
+import os
+import copy
+import collections
+import marshmallow as mm
+from . import utils
+from . import formats
+from .fields import files
+
+INCLUDE_KEY = '$include'
+
+# maximum number of parsed layers kept in the cache
+LAYER_CACHE_SIZE = 64
+
+# immutable values, which can be shared with the cache without copying
+_ATOMS = (str, int, float, bool, type(None))
+
+# least recently used cache of parsed layers, keyed by absolute path
+_LAYER_CACHE = collections.OrderedDict()
+
+
+def read_layer(path):
+    """read an input file (in any format supported by :mod:`argschema.formats`),
+    reusing the parsed result of an earlier call if the file is still in the
+    cache and has not changed size or modification time since.
+    The result is shared between calls, so it must not be modified.
+
+    Parameters
+    ----------
+    path : str
+        path to the json file
+
+    Returns
+    -------
+    dict
+        parsed contents of the file
+    """
+    path = os.path.abspath(path)
+    st = os.stat(path)
+    stamp = (st.st_mtime_ns, st.st_size)
+    cached = _LAYER_CACHE.get(path)
+    if cached is not None and cached[0] == stamp:
+        _LAYER_CACHE.move_to_end(path)
+        return cached[1]
+    data = formats.read_input(path)
+    _LAYER_CACHE[path] = (stamp, data)
+    _LAYER_CACHE.move_to_end(path)
+    while len(_LAYER_CACHE) > LAYER_CACHE_SIZE:
+        _LAYER_CACHE.popitem(last=False)
+    return data
+
+
+def resolve_layer(path, filesystem=None, _stack=None):
+    """read a json file and merge in the files listed under its "$include"
+    key (a path or list of paths, relative to the including file), with the
+    file's own values overriding those of the files it includes.  Every file
+    is checked to be a readable file first, as InputFile does.
+
+    Parameters
+    ----------
+    path : str
+        path to the json file
+    filesystem : argschema.filesystems.FileSystem or None
+        adapter used to check the files, if None the current one of
+        :func:`argschema.filesystems.get_filesystem` (Default value = None)
+
+    Returns
+    -------
+    dict
+        the merged contents, which must not be modified as it may be shared
+        with the layer cache
+
+    Raises
+    ------
+    marshmallow.ValidationError
+        if a file is not a readable file, is not a json object or includes
+        itself
+    """
+    path = os.path.abspath(path)
+    _stack = [] if _stack is None else _stack
+    if path in _stack:
+        raise mm.ValidationError('{} includes itself via {}'.format(
+            path, ' -> '.join(_stack)))
+    files.validate_input_path(path, filesystem)
+    data = read_layer(path)
+    if not isinstance(data, dict):
+        raise mm.ValidationError('{} does not contain a json object'.format(
+            path))
+    includes = data.get(INCLUDE_KEY)
+    if includes is None:
+        return data
+    if not isinstance(includes, list):
+        includes = [includes]
+    merged = {}
+    for include in includes:
+        include = os.path.join(os.path.dirname(path), include)
+        utils.smart_merge(merged,
+                          resolve_layer(include, filesystem, _stack + [path]),
+                          overwrite_with_none=True)
+    utils.smart_merge(merged,
+                      {k: v for k, v in data.items() if k != INCLUDE_KEY},
+                      overwrite_with_none=True)
+    return merged
+
+
+def load_input_layers(paths, filesystem=None):
+    """read a stack of json files and merge them in order with
+    :func:`utils.smart_merge`, so that later files override earlier ones
+
+    Parameters
+    ----------
+    paths : list of str
+        paths to the json files
+    filesystem : argschema.filesystems.FileSystem or None
+        adapter used to check the files (see :func:`resolve_layer`)
+        (Default value = None)
+
+    Returns
+    -------
+    dict
+        merged contents of the files, which may be modified (nothing in it
+        is shared with the layer cache)
+    """
+    merged = {}
+    for path in paths:
+        utils.smart_merge(merged, resolve_layer(path, filesystem),
+                          overwrite_with_none=True)
+    return _copy_leaves(merged)
+
+
+def _copy_leaves(data):
+    # smart_merge builds new dictionaries but shares the other values
+    # (e.g. lists) with the layers it merges, so copy them before handing
+    # them out, as pre_load hooks may modify them in place
+    for key, value in data.items():
+        if isinstance(value, dict):
+            _copy_leaves(value)
+        elif not isinstance(value, _ATOMS):
+            data[key] = copy.deepcopy(value)
+    return data
+
+
+def clear_layer_cache():
+    """forget all the parsed layers"""
+    _LAYER_CACHE.clear()
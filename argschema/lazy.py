@@ -0,0 +1,258 @@
+'''module for loading arguments lazily: the top level of the input is
+validated up front, and each Nested subtree on first access'''
+import contextlib
+from collections.abc import Mapping
+import marshmallow as mm
+from . import utils
+
+
+def _nest_errors(path, messages):
+    for key in reversed(path):
+        messages = {key: messages}
+    return messages
+
+
+def _restore(schema_class, options, loaded, lazy, loader, path, context):
+    # unpickle a LazyArgs, keeping the fields not loaded yet lazy
+    args = LazyArgs.__new__(LazyArgs)
+    args._schema = schema_class(**options)
+    args._loader = utils.load if loader is None else loader
+    args._path = path
+    args._context = context
+    args._loaded = loaded
+    args._lazy = lazy
+    return args
+
+
+class LazyArgs(Mapping):
+    """read-only mapping of loaded arguments, whose Nested fields are
+    deserialized and validated when they are first accessed (and then cached).
+
+    The other fields are validated when the LazyArgs is created, along with
+    cheap checks of the Nested fields (required fields are present and values
+    are dictionaries, or lists for many=True).  Nested(many=False) fields
+    without validators of their own are themselves loaded lazily, one level
+    at a time.
+
+    Parameters
+    ----------
+    schema : marshmallow.Schema
+        schema of the arguments.  Schemas with schema level hooks (see
+        :func:`utils.has_schema_hooks`) need all of their fields at once, and
+        are loaded eagerly (use :func:`lazy_load`, which returns a dict for
+        them).
+    data : dict
+        input to load
+    loader : callable or None
+        function loader(schema, d) used to load the fields validated up
+        front (here and in the lazy Nested subtrees), if None use
+        :func:`utils.load` (Default value = None)
+    path : list or None
+        keys of this mapping in the root arguments, used to report errors
+        (Default value = None)
+    context : callable or None
+        function returning a context manager entered around the loads of the
+        Nested subtrees on access (e.g. to check paths with a timeout),
+        picklable to pickle this mapping (Default value = None)
+
+    Raises
+    ------
+    marshmallow.ValidationError
+        if the fields validated up front do not pass validation
+    """
+
+    def __init__(self, schema, data, loader=None, path=None, context=None):
+        self._schema = schema
+        self._loader = utils.load if loader is None else loader
+        self._path = [] if path is None else list(path)
+        self._context = context
+        self._lazy = {}
+        self._loaded = {}
+
+        if not isinstance(data, Mapping):
+            raise mm.ValidationError(_nest_errors(
+                self._path, {'_schema': ['Invalid input type.']}))
+        data = dict(data)
+        # apply defaults as DefaultSchema.make_object does for the full schema
+        for name, field in schema.fields.items():
+            if (name not in data and not field.load_only and
+                    getattr(field, 'default', mm.missing) is not mm.missing):
+                data[name] = field.default
+
+        errors = {}
+        lazy_names = []
+        for name, field in schema.fields.items():
+            if not isinstance(field, mm.fields.Nested) or field.dump_only:
+                continue
+            key = field.data_key or name
+            lazy_names.append(name)
+            if key not in data:
+                if field.required:
+                    errors[key] = field.make_error('required').messages
+                continue
+            value = data.pop(key)
+            expected = (list, tuple) if field.many else Mapping
+            if value is None:
+                if not field.allow_none:
+                    errors[key] = field.make_error('null').messages
+                    continue
+            elif not isinstance(value, expected):
+                errors[key] = field.make_error('type').messages
+                continue
+            self._lazy[field.attribute or name] = (key, name, value)
+
+        top = schema
+        if lazy_names:
+            top = type(schema)(only=schema.only,
+                               exclude=tuple(schema.exclude) + tuple(lazy_names),
+                               unknown=schema.unknown)
+        try:
+            self._loaded.update(self._loader(top, data))
+        except mm.ValidationError as e:
+            if isinstance(e.messages, dict):
+                errors.update(e.messages)
+            else:
+                errors['_schema'] = e.messages
+        if errors:
+            raise mm.ValidationError(_nest_errors(self._path, errors))
+
+    def _load(self, attribute):
+        key, name, value = self._lazy[attribute]
+        field = self._schema.fields[name]
+        path = self._path + [key]
+        with (contextlib.nullcontext() if self._context is None
+              else self._context()):
+            if (value is not None and not field.many and
+                    not field.validators and
+                    not utils.has_schema_hooks(field.schema)):
+                return LazyArgs(field.schema, value, loader=self._loader,
+                                path=path, context=self._context)
+            try:
+                return field.deserialize(value)
+            except mm.ValidationError as e:
+                raise mm.ValidationError(_nest_errors(path, e.messages))
+
+    def __getitem__(self, key):
+        if key in self._loaded:
+            return self._loaded[key]
+        if key in self._lazy:
+            value = self._load(key)
+            self._loaded[key] = value
+            del self._lazy[key]
+            return value
+        raise KeyError(key)
+
+    def __iter__(self):
+        for key in self._loaded:
+            yield key
+        for key in list(self._lazy):
+            if key not in self._loaded:
+                yield key
+
+    def __len__(self):
+        return len(set(self._loaded) | set(self._lazy))
+
+    def __repr__(self):
+        return 'LazyArgs({})'.format(', '.join(
+            '{}={}'.format(k, '<not loaded>' if k in self._lazy
+                           else repr(self._loaded[k])) for k in self))
+
+    def is_loaded(self, key):
+        """check whether a field has been loaded yet
+
+        Parameters
+        ----------
+        key : str
+            attribute of the field
+
+        Returns
+        -------
+        bool
+            False if the field is a Nested field that has not been accessed
+        """
+        return key not in self._lazy
+
+    def validate_all(self):
+        """load and validate every remaining Nested subtree
+
+        Returns
+        -------
+        LazyArgs
+            this mapping
+
+        Raises
+        ------
+        marshmallow.ValidationError
+            with the errors of all the subtrees that do not pass validation
+        """
+        errors = {}
+        for key in list(self):
+            try:
+                value = self[key]
+                if isinstance(value, LazyArgs):
+                    value.validate_all()
+            except mm.ValidationError as e:
+                utils.smart_merge(errors, e.messages)
+        if errors:
+            raise mm.ValidationError(errors)
+        return self
+
+    def to_dict(self):
+        """load everything and convert to (nested) dictionaries
+
+        Returns
+        -------
+        dict
+            the loaded arguments
+        """
+        self.validate_all()
+        return {k: v.to_dict() if isinstance(v, LazyArgs) else v
+                for k, v in self.items()}
+
+    def __eq__(self, other):
+        if not isinstance(other, Mapping):
+            return NotImplemented
+        return self.to_dict() == (other.to_dict() if isinstance(other, LazyArgs)
+                                  else dict(other))
+
+    __hash__ = None
+
+    def __reduce__(self):
+        # pickle the schema by class and options, and the input of the fields
+        # not loaded yet, so that the copy is still loaded lazily
+        schema = self._schema
+        options = {'only': schema.only, 'exclude': schema.exclude,
+                   'unknown': schema.unknown}
+        if schema.context:
+            options['context'] = schema.context
+        loader = None if self._loader is utils.load else self._loader
+        return (_restore, (type(schema), options, self._loaded, self._lazy,
+                           loader, self._path, self._context))
+
+
+def lazy_load(schema, data, loader=None, context=None):
+    """load arguments lazily with :class:`LazyArgs`, or eagerly with loader
+    if the schema has schema level hooks which need all of the fields
+
+    Parameters
+    ----------
+    schema : marshmallow.Schema
+        schema of the arguments
+    data : dict
+        input to load
+    loader : callable or None
+        function loader(schema, d), if None use :func:`utils.load`
+        (Default value = None)
+    context : callable or None
+        function returning a context manager entered around the loads on
+        access, see :class:`LazyArgs` (Default value = None)
+
+    Returns
+    -------
+    LazyArgs or dict
+        the loaded arguments
+    """
+    loader = utils.load if loader is None else loader
+    if utils.has_schema_hooks(schema):
+        return loader(schema, data)
+    return LazyArgs(schema, data, loader, context=context)
@@ -0,0 +1,91 @@
+'''module for skipping module runs whose outputs already exist for
+the same validated arguments'''
+import os
+import logging
+import functools
+from .hashing import canonical_hash
+
+logger = logging.getLogger(__name__)
+
+FINGERPRINT_SUFFIX = '.fingerprint'
+
+
+def read_fingerprint(output_path):
+    """read the fingerprint recorded next to an output file
+
+    Parameters
+    ----------
+    output_path : str
+        path of the output file
+
+    Returns
+    -------
+    str or None
+        the recorded fingerprint, or None if there is none
+    """
+    try:
+        with open(output_path + FINGERPRINT_SUFFIX, 'r') as fp:
+            return fp.read().strip()
+    except OSError:
+        return None
+
+
+def write_fingerprint(output_path, fingerprint):
+    """record a fingerprint next to an output file
+
+    Parameters
+    ----------
+    output_path : str
+        path of the output file
+    fingerprint : str
+        fingerprint to record
+    """
+    with open(output_path + FINGERPRINT_SUFFIX, 'w') as fp:
+        fp.write(fingerprint)
+
+
+def memoized_run(method=None, path_mode='mtime'):
+    """decorator for the method of an ArgSchemaParser subclass that runs the
+    module and writes its output to self.args['output_json'] (e.g. via
+    self.output).  The run is skipped, returning None, if the output already
+    exists and was written by the same method with the same fingerprint of
+    the validated arguments (see :meth:`ArgSchemaParser.fingerprint`).
+
+    can be used as @memoized_run or @memoized_run(path_mode='content')
+
+    Parameters
+    ----------
+    method : callable
+        method to decorate
+    path_mode : str or None
+        how to include input paths in the fingerprint (Default value = 'mtime')
+
+    Returns
+    -------
+    callable
+        decorated method
+    """
+    if method is None:
+        return functools.partial(memoized_run, path_mode=path_mode)
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        output_path = self.args.get('output_json')
+        if output_path is None:
+            return method(self, *args, **kwargs)
+        fingerprint = canonical_hash(
+            [method.__module__, method.__qualname__,
+             self.fingerprint(path_mode=path_mode)])
+        if (os.path.isfile(output_path) and
+                read_fingerprint(output_path) == fingerprint):
+            self.logger.info('skipping {}, {} is up to date'.format(
+                method.__qualname__, output_path))
+            return None
+        # forget the previous run first, in case this one fails part way
+        if os.path.isfile(output_path + FINGERPRINT_SUFFIX):
+            os.remove(output_path + FINGERPRINT_SUFFIX)
+        result = method(self, *args, **kwargs)
+        if os.path.isfile(output_path):
+            write_fingerprint(output_path, fingerprint)
+        return result
+    return wrapper
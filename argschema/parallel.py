@@ -0,0 +1,255 @@
+'''module for validating large Nested(many=True) lists in a pool of processes'''
+import os
+import copy
+import math
+import contextlib
+import concurrent.futures
+import marshmallow as mm
+from . import utils
+from . import fields
+from . import filesystems
+
+
+def find_large_many_fields(schema, d, min_length, path=None):
+    """find the Nested(many=True) fields holding long lists in a dictionary,
+    descending into (not many) Nested fields.  Lists of schemas with schema
+    level hooks (see :func:`utils.has_schema_hooks`), or nested in them, are
+    left out, since the hooks need the full lists.
+
+    Parameters
+    ----------
+    schema : marshmallow.Schema
+        schema describing d
+    d : dict
+        dictionary of values to be loaded
+    min_length : int
+        minimum length of list to return
+    path : list or None
+        list of (data key, attribute) pairs traversed so far (used for recursion)
+        (Default value = None)
+
+    Returns
+    -------
+    list
+        list of (path, field) where path is a list of (data key, attribute)
+        pairs leading to the field
+    """
+    path = [] if path is None else path
+    found = []
+    if not isinstance(d, dict) or utils.has_schema_hooks(schema):
+        return found
+    for name, field in schema.fields.items():
+        key = field.data_key or name
+        if key not in d or not isinstance(field, mm.fields.Nested):
+            continue
+        value = d[key]
+        field_path = path + [(key, field.attribute or name)]
+        if isinstance(field, fields.ColumnarNested):
+            # these load in chunks themselves, into columns
+            continue
+        elif field.many:
+            if isinstance(value, list) and len(value) >= min_length:
+                found.append((field_path, field))
+        else:
+            found.extend(find_large_many_fields(
+                field.schema, value, min_length, field_path))
+    return found
+
+
+def _placeholder_copy(schema, paths):
+    # copy of schema (and of the fields and nested schemas along the paths),
+    # with no validators on the fields at the end of the paths
+    schema = copy.copy(schema)
+    schema.fields = dict(schema.fields)
+    schema.load_fields = dict(schema.load_fields)
+    by_key = {}
+    for keys in paths:
+        by_key.setdefault(keys[0], []).append(keys[1:])
+    for name, field in list(schema.fields.items()):
+        rest = by_key.get(field.data_key or name)
+        if rest is None:
+            continue
+        nested = field.schema if any(rest) else None
+        field = copy.copy(field)
+        field.parent = schema
+        if [] in rest:
+            field.validators = []
+        if nested is not None:
+            field._schema = _placeholder_copy(nested, [r for r in rest if r])
+        schema.fields[name] = field
+        if name in schema.load_fields:
+            schema.load_fields[name] = field
+    return schema
+
+
+def placeholder_schema(schema, large):
+    """get a copy of a schema in which the fields of long lists have no
+    validators, to load a dictionary where they are replaced by empty
+    placeholder lists, since their validators are run on the full lists
+    separately.  The schema and its fields are not modified, as they may be
+    shared with other loads.
+
+    Parameters
+    ----------
+    schema : marshmallow.Schema
+        schema to copy
+    large : list
+        (path, field) of the long lists, as returned by
+        :func:`find_large_many_fields`
+
+    Returns
+    -------
+    marshmallow.Schema
+        the copy of the schema
+    """
+    return _placeholder_copy(
+        schema, [[key for key, attribute in path] for path, field in large])
+
+
+def load_chunk(schema_class, options, chunk, offset, timeout=None):
+    """load a chunk of a many=True list (run in a worker process)
+
+    Parameters
+    ----------
+    schema_class : type
+        the class of the Nested schema
+    options : dict
+        keyword arguments to construct the schema with (e.g. only, exclude,
+        context)
+    chunk : list
+        chunk of the list to load
+    offset : int
+        index of the first element of the chunk in the full list
+    timeout : float or None
+        timeout of the filesystem checks of path fields, as the
+        filesystem_timeout of ArgSchemaParser (Default value = None)
+
+    Returns
+    -------
+    tuple
+        (loaded list or None, dictionary of errors keyed by index in the full list)
+    """
+    schema = schema_class(many=True, **options)
+    try:
+        with contextlib.ExitStack() as stack:
+            stack.enter_context(filesystems.timeout_checks(timeout))
+            stack.enter_context(filesystems.batch_checks(
+                filesystems.schema_paths(schema, chunk)))
+            return utils.load(schema, chunk), {}
+    except mm.ValidationError as e:
+        messages = e.messages
+        if isinstance(messages, dict):
+            messages = {k + offset if isinstance(k, int) else k: v
+                        for k, v in messages.items()}
+        return None, messages
+
+
+def parallel_load(schema, d, min_length=10000, chunksize=None,
+                  max_workers=None, loader=None):
+    """load a dictionary with a schema, validating the elements of long
+    Nested(many=True) lists in chunks in a pool of processes.
+    The rest of the dictionary is loaded in this process, and the field
+    validators of the lists (e.g. Length) are run on the reassembled lists.
+
+    The Nested schemas must be importable by the worker processes
+    (i.e. defined at the top level of a module).  Lists under schemas with
+    schema level hooks, which need the full lists, are loaded in this process.
+    The workers get the context of the Nested schemas, and the timeout of
+    the current filesystem adapter if it is a
+    :class:`~argschema.filesystems.TimeoutFileSystem`; the paths of each
+    chunk are checked in a batch.
+
+    Parameters
+    ----------
+    schema : marshmallow.Schema
+        schema to load with
+    d : dict
+        dictionary to load
+    min_length : int
+        lists shorter than this are loaded in this process (Default value = 10000)
+    chunksize : int or None
+        number of elements per chunk, if None split each list into 4 chunks
+        per worker (Default value = None)
+    max_workers : int or None
+        number of worker processes, if None use the number of processors
+        (Default value = None)
+    loader : callable or None
+        function loader(schema, d) used to load the rest of the dictionary,
+        if None use :func:`utils.load` (Default value = None)
+
+    Returns
+    -------
+    dict
+        deserialized and validated dictionary
+
+    Raises
+    ------
+    marshmallow.ValidationError
+        if the dictionary does not conform to the schema, with list errors
+        keyed by the index in the full list
+    """
+    loader = utils.load if loader is None else loader
+    large = find_large_many_fields(schema, d, min_length)
+    if not large:
+        return loader(schema, d)
+
+    workers = max_workers or os.cpu_count() or 1
+    filesystem = filesystems.get_filesystem()
+    timeout = (filesystem.timeout
+               if isinstance(filesystem, filesystems.TimeoutFileSystem)
+               else None)
+    with concurrent.futures.ProcessPoolExecutor(workers) as pool:
+        futures = []
+        for path, field in large:
+            keys = [key for key, attribute in path]
+            values = utils.get_path(d, keys)
+            size = chunksize or max(1, int(math.ceil(
+                len(values) / float(4 * workers))))
+            nested = field.schema
+            options = {'only': nested.only, 'exclude': nested.exclude,
+                       'unknown': field.unknown or nested.unknown}
+            if nested.context:
+                options['context'] = nested.context
+            futures.append([
+                pool.submit(load_chunk, type(nested), options,
+                            values[i:i + size], i, timeout)
+                for i in range(0, len(values), size)])
+            d = utils.replace_path(d, keys, [])
+
+        # load everything else while the workers validate the lists
+        errors = {}
+        result = None
+        try:
+            result = loader(placeholder_schema(schema, large), d)
+        except mm.ValidationError as e:
+            errors = e.messages if isinstance(e.messages, dict) else {
+                '_schema': e.messages}
+
+        for (path, field), chunk_futures in zip(large, futures):
+            keys = [key for key, attribute in path]
+            # errors here came from validating the empty placeholder list
+            utils.pop_errors(errors, keys)
+            values = []
+            list_errors = {}
+            for future in chunk_futures:
+                loaded, chunk_errors = future.result()
+                if chunk_errors:
+                    list_errors.update(chunk_errors)
+                elif not list_errors:
+                    values.extend(loaded)
+            if not list_errors:
+                try:
+                    field._validate(values)
+                except mm.ValidationError as e:
+                    list_errors = e.messages
+            if list_errors:
+                utils.set_errors(errors, keys, list_errors)
+            elif result is not None:
+                target = result
+                for key, attribute in path[:-1]:
+                    target = target[attribute]
+                target[path[-1][1]] = values
+
+    if errors:
+        raise mm.ValidationError(errors)
+    return result
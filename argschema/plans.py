@@ -0,0 +1,550 @@
+'''module for compiling and caching the per-schema information that
+ArgSchemaParser needs on every run (argparse arguments, casting table,
+defaults and schema topology), both in-process and optionally on disk
+'''
+import os
+import re
+import sys
+import json
+import pickle
+import hashlib
+import logging
+import tempfile
+import warnings
+import weakref
+import marshmallow as mm
+from . import utils
+from . import argschema_parser
+
+PLAN_CACHE_ENV = 'ARGSCHEMA_PLAN_CACHE'
+
+# version of the SchemaPlan contents, part of the on-disk cache key
+PLAN_FORMAT = 5
+
+# in-process cache of plans, keyed by schema class and then by (only, exclude)
+_PLAN_CACHE = weakref.WeakKeyDictionary()
+# in-process cache of schema fingerprints, keyed the same way
+_FINGERPRINTS = weakref.WeakKeyDictionary()
+
+# (argschema version, marshmallow version), see library_versions
+_VERSIONS = None
+
+# memory addresses in default reprs, e.g. <object at 0x7f...>
+_ADDRESS = re.compile(r' at 0x[0-9a-fA-F]+')
+
+logger = logging.getLogger(__name__)
+
+
+def default_cache_dir(name):
+    """get the default user cache directory for an argschema cache,
+    following the XDG base directory specification ($XDG_CACHE_HOME or
+    ~/.cache) or %LOCALAPPDATA% on windows
+
+    Parameters
+    ----------
+    name : str
+        name of the sub-directory for this particular cache
+
+    Returns
+    -------
+    str
+        path to the cache directory (which may not exist yet)
+    """
+    if sys.platform == "win32":
+        base = os.environ.get('LOCALAPPDATA') or os.path.expanduser('~')
+    else:
+        base = (os.environ.get('XDG_CACHE_HOME') or
+                os.path.join(os.path.expanduser('~'), '.cache'))
+    return os.path.join(base, 'argschema', name)
+
+
+def plan_cache_dir():
+    """get the on-disk plan cache directory configured by the
+    ARGSCHEMA_PLAN_CACHE environment variable
+
+    Returns
+    -------
+    str or None
+        None if the on-disk cache is disabled (variable unset, empty or 0),
+        the default user cache directory if it is set to 1,
+        otherwise the value of the variable
+    """
+    value = os.environ.get(PLAN_CACHE_ENV, '')
+    if value in ('', '0'):
+        return None
+    if value == '1':
+        return default_cache_dir('plans')
+    return value
+
+
+def library_versions():
+    """get the versions of argschema and marshmallow, which are part of
+    every on-disk cache key
+
+    Returns
+    -------
+    tuple
+        (argschema version, marshmallow version)
+    """
+    global _VERSIONS
+    if _VERSIONS is None:
+        # looked up once per process, the metadata lookup is comparatively slow
+        from . import __version__
+        try:
+            from importlib.metadata import version
+            mm_version = version('marshmallow')
+        except Exception:  # pragma: no cover
+            mm_version = getattr(mm, '__version__', '')
+        _VERSIONS = (__version__, mm_version)
+    return _VERSIONS
+
+
+def _stable_repr(value):
+    # functions and classes by name, other objects by repr without addresses,
+    # so that the description is the same in every process
+    if callable(value) and hasattr(value, '__qualname__'):
+        return '{}.{}'.format(getattr(value, '__module__', None),
+                              value.__qualname__)
+    return _ADDRESS.sub('', repr(value))
+
+
+def _const_repr(const):
+    # repr of a constant of a code object which is the same in every process
+    if hasattr(const, 'co_code'):
+        return _code_digest(const)
+    if isinstance(const, (frozenset, set)):
+        return repr(sorted(_const_repr(c) for c in const))
+    if isinstance(const, tuple):
+        return repr(tuple(_const_repr(c) for c in const))
+    return _ADDRESS.sub('', repr(const))
+
+
+def _code_digest(code):
+    # hash of a code object and of the ones nested in it (e.g. of lambdas),
+    # which changes when the source of the function changes
+    h = hashlib.sha256(code.co_code)
+    h.update(repr([_const_repr(c) for c in code.co_consts]).encode('utf-8'))
+    h.update(repr(code.co_names).encode('utf-8'))
+    return h.hexdigest()
+
+
+def _describe_code(value):
+    # the code of a function, or of the methods of a class and of its bases
+    # outside of marshmallow and argschema (whose versions are in the
+    # description anyway), None for other objects
+    func = getattr(value, '__func__', value)
+    code = getattr(func, '__code__', None)
+    if code is not None:
+        return _code_digest(code)
+    if not isinstance(value, type):
+        return None
+    desc = []
+    for cls in value.__mro__:
+        module = getattr(cls, '__module__', None) or ''
+        if (cls is object or
+                module.split('.')[0] in ('marshmallow', 'argschema')):
+            continue
+        methods = [(k, _describe_code(v)) for k, v in vars(cls).items()
+                   if not isinstance(v, type)]
+        desc.append([cls.__qualname__,
+                     sorted(m for m in methods if m[1] is not None)])
+    return desc
+
+
+def _stable_option(value):
+    # schema options, with sets in a stable order
+    if isinstance(value, (set, frozenset)):
+        return sorted(_stable_repr(v) for v in value)
+    if isinstance(value, (list, tuple)):
+        return [_stable_repr(v) for v in value]
+    return _stable_repr(value)
+
+
+def _describe_field(field, seen):
+    desc = {
+        'type': type(field).__module__ + '.' + type(field).__qualname__,
+        'required': field.required,
+        'allow_none': field.allow_none,
+        'default': _stable_repr(field.default),
+        'data_key': field.data_key,
+        'metadata': [(k, _stable_repr(v))
+                     for k, v in sorted(field.metadata.items())],
+        'validators': [[_stable_repr(v),
+                        _describe_code(v) or _describe_code(type(v))]
+                       for v in field.validators],
+        'code': _describe_code(type(field)),
+        'state': [(k, _stable_repr(v)) for k, v in sorted(vars(field).items())
+                  if k in ('dtype', 'mode', 'many')],
+    }
+    if isinstance(field, mm.fields.Nested):
+        desc['schema'] = _describe_schema(field.schema, seen)
+    elif isinstance(field, mm.fields.List):
+        desc['inner'] = _describe_field(field.inner, seen)
+    return desc
+
+
+def _describe_schema(schema, seen):
+    name = type(schema).__module__ + '.' + type(schema).__qualname__
+    if type(schema) in seen:
+        # recursive reference, the definition is described above
+        return name
+    seen = seen + [type(schema)]
+    return {
+        'schema': name,
+        'doc': schema.__doc__,
+        'only': sorted(schema.only) if schema.only else None,
+        'exclude': sorted(schema.exclude),
+        'unknown': schema.unknown,
+        'meta': [(k, _stable_option(v))
+                 for k, v in sorted(vars(schema.opts).items())],
+        # _hooks is a defaultdict, to which loading adds empty lists
+        'hooks': [(tag, sorted(_stable_repr(hook) for hook in hooks))
+                  for tag, hooks in sorted(schema._hooks.items()) if hooks],
+        'code': _describe_code(type(schema)),
+        'fields': [(k, _describe_field(v, seen))
+                   for k, v in schema.declared_fields.items()],
+    }
+
+
+def _selection(schema):
+    # the (only, exclude) part of the cache keys
+    return (tuple(sorted(schema.only)) if schema.only else None,
+            tuple(sorted(schema.exclude)))
+
+
+def _casts():
+    return sorted((k.__qualname__, _stable_repr(v))
+                  for k, v in utils.FIELD_TYPE_MAP.items())
+
+
+def schema_fingerprint(schema):
+    """compute a hash of a schema definition which is stable across processes,
+    including the argschema and marshmallow versions and the command line
+    casting functions of `utils.FIELD_TYPE_MAP`.  The definition covers the
+    fields, the Meta options, the schema level hooks and the code of the
+    methods of the schema class, of custom field classes and of validators
+    (but not of the functions they call).  Other functions (e.g. callable
+    defaults) are identified by module and qualified name.
+
+    Parameters
+    ----------
+    schema : marshmallow.Schema
+        schema to fingerprint
+
+    Returns
+    -------
+    str
+        hex digest of the schema definition
+    """
+    key = _selection(schema)
+    fingerprints = _FINGERPRINTS.setdefault(type(schema), {})
+    fingerprint = fingerprints.get(key)
+    if fingerprint is None:
+        desc = [PLAN_FORMAT, library_versions(), _casts(),
+                _describe_schema(schema, [])]
+        fingerprint = hashlib.sha256(json.dumps(
+            desc, default=_stable_repr).encode('utf-8')).hexdigest()
+        fingerprints[key] = fingerprint
+    return fingerprint
+
+
+def _nested_class(field):
+    # the schema class of a Nested field, without instantiating it
+    nested = field.nested
+    if isinstance(nested, mm.Schema):
+        return type(nested)
+    if isinstance(nested, type):
+        return nested
+    if isinstance(nested, str) and nested != 'self':
+        try:
+            return mm.class_registry.get_class(nested, all=False)
+        except mm.exceptions.RegistryError:
+            return None
+    # 'self' or a callable, both of which the other classes cover
+    return None
+
+
+def _source_classes(schema_class):
+    # the schema class and every class its definition depends on: its bases
+    # and the schema classes of its (possibly inner) Nested fields
+    found = []
+    todo = [schema_class]
+    while todo:
+        cls = todo.pop()
+        if cls in found:
+            continue
+        found.append(cls)
+        todo.extend(c for c in cls.__mro__[1:] if c is not object)
+        for field in getattr(cls, '_declared_fields', {}).values():
+            while isinstance(field, mm.fields.List):
+                field = field.inner
+            if isinstance(field, mm.fields.Nested):
+                nested = _nested_class(field)
+                if nested is not None:
+                    todo.append(nested)
+    return found
+
+
+def _source_state(cls):
+    module = sys.modules.get(cls.__module__)
+    path = getattr(module, '__file__', None)
+    if path is None:
+        return [cls.__module__, None, None, None]
+    try:
+        st = os.stat(path)
+    except OSError:
+        return [cls.__module__, path, None, None]
+    return [cls.__module__, path, st.st_mtime_ns, st.st_size]
+
+
+def source_states(schema):
+    """get the state of the source files of a schema class and of the
+    classes it depends on (bases and the schemas of Nested fields), which
+    changes whenever the schema definition can have changed
+
+    Parameters
+    ----------
+    schema : marshmallow.Schema
+        schema to get the source files of
+
+    Returns
+    -------
+    list
+        sorted [module, path, mtime in ns, size] of the source files, with
+        None for what is unknown (e.g. for modules without a file)
+    """
+    states = {}
+    for cls in _source_classes(type(schema)):
+        state = _source_state(cls)
+        states[state[0]] = state
+    return [states[k] for k in sorted(states)]
+
+
+def plan_cache_key(schema):
+    """compute the key of a schema in the on-disk plan cache: the
+    :func:`schema_fingerprint` of its definition, and the modification times
+    of the source files of the schema class and of the classes it depends on
+    (bases and Nested schemas), as an extra invalidation signal
+
+    Parameters
+    ----------
+    schema : marshmallow.Schema
+        schema to compute the key of
+
+    Returns
+    -------
+    str
+        hex digest identifying the schema and the state of its sources
+    """
+    desc = [schema_fingerprint(schema), source_states(schema)]
+    return hashlib.sha256(
+        json.dumps(desc, default=_stable_repr).encode('utf-8')).hexdigest()
+
+
+class SchemaPlan(object):
+    """the compiled information about a schema needed to parse a command line
+    and load arguments with it
+
+    Parameters
+    ----------
+    arguments : list
+        argument groups as returned by :func:`utils.build_schema_arguments`,
+        with the root schema first
+    cast_table : dict
+        table of command line casts as returned by :func:`utils.get_cast_table`
+    defaults : list or None
+        defaults table as returned by :func:`argschema_parser.find_defaults`,
+        None unless the schema needs defaults filled in by fill_defaults
+    is_recursive : bool
+        whether the schema contains recursively defined schemas
+    is_non_default : bool
+        whether the schema contains schemas not subclassed from DefaultSchema
+    warnings : list
+        (category, message) of warnings raised while building the arguments,
+        which are re-raised every time the plan is used to build a parser
+    """
+
+    def __init__(self, arguments, cast_table, defaults,
+                 is_recursive, is_non_default, warnings=None):
+        self.arguments = arguments
+        self.cast_table = cast_table
+        self.defaults = defaults
+        self.is_recursive = is_recursive
+        self.is_non_default = is_non_default
+        self.warnings = warnings or []
+        self._argparser = None
+        self._env_tables = {}
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_argparser'] = None
+        state['_env_tables'] = {}
+        return state
+
+    @classmethod
+    def from_schema(cls, schema):
+        """build a plan by introspecting a schema
+
+        Parameters
+        ----------
+        schema : marshmallow.Schema
+            schema to build a plan for
+
+        Returns
+        -------
+        SchemaPlan
+            plan for this schema
+        """
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always')
+            arguments = utils.build_schema_arguments(
+                schema, description=schema.__doc__)
+        arguments = [arguments[-1]] + arguments[0:-1]
+        input_json = arguments[0]['args'].get('--input_json')
+        if input_json is not None:
+            # ArgSchemaParser merges several input json files in order
+            input_json['action'] = 'append'
+            input_json['help'] += (" (can be given multiple times, later "
+                                   "files override earlier ones)")
+        dests = [name[2:] for group in arguments for name in group['args']]
+        cast_table = utils.get_cast_table(schema, dests)
+
+        is_recursive = argschema_parser.is_recursive_schema(schema, [])
+        is_non_default = argschema_parser.contains_non_default_schemas(
+            schema, [])
+        defaults = None
+        if is_non_default and not is_recursive:
+            defaults = argschema_parser.find_defaults(schema)
+        return cls(arguments, cast_table, defaults, is_recursive,
+                   is_non_default,
+                   [(w.category, str(w.message)) for w in caught])
+
+    def argparser(self):
+        """get the argparse parser for this plan, which is built on first use
+
+        Returns
+        -------
+        argparse.ArgumentParser
+            parser for the command line arguments of this schema
+        """
+        for category, message in self.warnings:
+            warnings.warn(message, category, stacklevel=2)
+        if self._argparser is None:
+            self._argparser = utils.arguments_argparser(self.arguments)
+        # the program name is the one of this run, as argparse would set it
+        self._argparser.prog = os.path.basename(sys.argv[0])
+        return self._argparser
+
+    def args_to_dict(self, argsobj):
+        """convert the namespace returned by this plan's argparser into a
+        nested dictionary of cast values
+
+        Parameters
+        ----------
+        argsobj : argparse.Namespace
+            namespace returned by parsing the command line
+
+        Returns
+        -------
+        dict
+            nested dictionary of command line values
+        """
+        argsdict = dict(vars(argsobj))
+        if isinstance(argsdict.get('input_json'), list):
+            # the last input json layer is the one reported in the arguments
+            argsdict['input_json'] = argsdict['input_json'][-1]
+        return utils.cast_args_dict(argsdict, self.cast_table)
+
+    def env_to_dict(self, environ, prefix):
+        """convert the environment variables with a prefix into a nested
+        dictionary of cast values (see :func:`utils.environ_to_dict`)
+
+        Parameters
+        ----------
+        environ : Mapping
+            environment variables, e.g. os.environ
+        prefix : str
+            prefix of the environment variables
+
+        Returns
+        -------
+        dict
+            nested dictionary of environment values
+        """
+        env_table = self._env_tables.get(prefix)
+        if env_table is None:
+            env_table = utils.env_cast_table(self.cast_table, prefix)
+            self._env_tables[prefix] = env_table
+        return utils.environ_to_dict(environ, prefix, env_table,
+                                     self.cast_table)
+
+
+def _read_plan(path):
+    try:
+        with open(path, 'rb') as fp:
+            plan = pickle.load(fp)
+    except (OSError, EOFError, pickle.UnpicklingError,
+            AttributeError, ImportError, TypeError) as e:
+        if not isinstance(e, FileNotFoundError):
+            logger.debug('ignoring unreadable plan cache {}: {}'.format(path, e))
+        return None
+    return plan if isinstance(plan, SchemaPlan) else None
+
+
+def _write_plan(path, plan):
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as fp:
+                pickle.dump(plan, fp, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, path)
+        except Exception:
+            os.remove(tmp)
+            raise
+    except Exception as e:
+        # caching is an optimization, so never fail a parse because of it
+        logger.debug('could not write plan cache {}: {}'.format(path, e))
+
+
+def get_schema_plan(schema, cache_dir=None):
+    """get the compiled plan for a schema, building it if it is not in the
+    in-process cache or in the on-disk cache
+
+    Parameters
+    ----------
+    schema : marshmallow.Schema
+        schema to get the plan of
+    cache_dir : str or None
+        directory of the on-disk cache, if None use :func:`plan_cache_dir`
+        (Default value = None)
+
+    Returns
+    -------
+    SchemaPlan
+        plan for this schema
+    """
+    key = _selection(schema)
+    plans = _PLAN_CACHE.setdefault(type(schema), {})
+    plan = plans.get(key)
+    if plan is not None:
+        return plan
+
+    cache_dir = plan_cache_dir() if cache_dir is None else cache_dir
+    path = None
+    if cache_dir is not None:
+        path = os.path.join(cache_dir, plan_cache_key(schema) + '.pickle')
+        plan = _read_plan(path)
+    if plan is None:
+        plan = SchemaPlan.from_schema(schema)
+        if path is not None:
+            _write_plan(path, plan)
+    plans[key] = plan
+    return plan
+
+
+def clear_plan_cache():
+    """clear the in-process plan and fingerprint caches (the on-disk cache is
+    left untouched)"""
+    _PLAN_CACHE.clear()
+    _FINGERPRINTS.clear()
@@ -0,0 +1,97 @@
+'''module for compiling the per-schema state of argschema before forking a
+pool of workers, so that the workers share it rather than each building it'''
+import gc
+import marshmallow as mm
+from . import plans
+from . import records
+from . import checksums
+from .argschema_parser import ArgSchemaParser
+
+
+def _schemas(schema, seen=None):
+    # the schema and the schemas nested in it, once per schema class
+    seen = set() if seen is None else seen
+    if type(schema) in seen:
+        return
+    seen.add(type(schema))
+    yield schema
+    for field in schema.fields.values():
+        while isinstance(field, mm.fields.List):
+            field = field.inner
+        if isinstance(field, mm.fields.Nested):
+            for nested in _schemas(field.schema, seen):
+                yield nested
+
+
+def warm_schema(schema_class, env_prefix=None, as_records=False):
+    """build and cache the plan of a schema, with its argparse parser, and
+    the other per-schema state used when parsing with it
+
+    Parameters
+    ----------
+    schema_class : type
+        subclass of marshmallow.Schema, or of :class:`ArgSchemaParser` to
+        warm its default_schema with its env_prefix and args_as_records
+    env_prefix : str or None
+        also build the environment variable table for this prefix
+        (Default value = None)
+    as_records : bool
+        also generate the record classes of the schema and of the schemas
+        nested in it (Default value = False)
+
+    Returns
+    -------
+    plans.SchemaPlan
+        the plan of the schema
+    """
+    if issubclass(schema_class, ArgSchemaParser):
+        env_prefix = env_prefix or schema_class.env_prefix
+        as_records = as_records or schema_class.args_as_records
+        schema_class = schema_class.default_schema
+    schema = schema_class()
+    plan = plans.get_schema_plan(schema)
+    plan.argparser()
+    if env_prefix is not None:
+        plan.env_to_dict({}, env_prefix)
+    checksums._declares_checksums(schema)
+    if as_records:
+        for nested in _schemas(schema):
+            records.record_class(nested)
+    return plan
+
+
+def warmup(schema_classes, freeze=True, env_prefix=None, as_records=False):
+    """compile and cache the plans (argparse parser, cast and defaults tables,
+    schema topology) of schemas up front, e.g. before forking worker processes,
+    and then optionally move everything allocated so far into the permanent
+    generation of the garbage collector with gc.freeze, so that the forked
+    children share this state copy-on-write instead of touching (and copying)
+    its pages during collections
+
+    Parameters
+    ----------
+    schema_classes : type or list of type
+        subclasses of marshmallow.Schema or of :class:`ArgSchemaParser`
+    freeze : bool
+        whether to call gc.freeze (Python 3.7+) after collecting garbage
+        (Default value = True)
+    env_prefix : str or None
+        also build the environment variable tables for this prefix
+        (Default value = None)
+    as_records : bool
+        also generate the record classes of the schemas (Default value = False)
+
+    Returns
+    -------
+    dict
+        :class:`plans.SchemaPlan` of every schema class given
+    """
+    if isinstance(schema_classes, type):
+        schema_classes = [schema_classes]
+    warmed = {}
+    for schema_class in schema_classes:
+        warmed[schema_class] = warm_schema(schema_class, env_prefix, as_records)
+    if freeze and hasattr(gc, 'freeze'):
+        gc.collect()
+        gc.freeze()
+    return warmed
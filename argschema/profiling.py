@@ -0,0 +1,324 @@
+'''module for profiling the cost of validation per field, to find which
+field or validator makes loading slow
+
+While a :class:`Profiler` is active, the deserialize and _validate methods of
+every marshmallow field (including the fields of Nested schemas and the inner
+fields of lists) are timed, and the calls, cumulative time, validation time
+and (optionally) bytes allocated are accumulated per field path, e.g.
+'stage.images.*' for the elements of the list stage.images.  The methods are
+patched process-wide, but only the loads run in the thread that entered the
+profiler are timed (the other threads only pay for one extra check per call).
+
+:func:`argschema.utils.load` profiles every load when the ARGSCHEMA_PROFILE
+environment variable is set to a comma separated list of options:
+'table' (or '1') or 'json' for the format of the report, 'memory' to also
+count allocations with tracemalloc, and a file path to write the report to
+(instead of stderr).  From the command line,
+``python -m argschema.profiling mypackage.mymodule:MySchema input.json``
+loads an input with a schema and prints the report.
+'''
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+import tracemalloc
+import marshmallow as mm
+from . import utils
+from .utils import PROFILE_ENV
+
+_ACTIVE_LOCK = threading.Lock()
+_ACTIVE = []
+
+
+def _field_classes(cls, name):
+    # the field classes defining a method, i.e. the ones to patch
+    found = []
+    todo = [cls]
+    seen = set()
+    while todo:
+        c = todo.pop()
+        if c in seen:
+            continue
+        seen.add(c)
+        if name in c.__dict__:
+            found.append(c)
+        todo.extend(c.__subclasses__())
+    return found
+
+
+class Profiler(object):
+    """context manager accumulating the cost of deserializing and validating
+    each field, by field path, while it is active in the calling thread (only
+    one Profiler can be active at a time)
+
+    Parameters
+    ----------
+    memory : bool
+        whether to count the bytes allocated (net of the ones freed) with
+        tracemalloc, which slows loading down (Default value = False)
+
+    Attributes
+    ----------
+    stats : dict
+        [calls, seconds, validate seconds, bytes] keyed by field path
+    """
+
+    def __init__(self, memory=False):
+        self.memory = memory
+        self.stats = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._patched = []
+        self._started_tracemalloc = False
+        self._depth = 0
+
+    def _state(self):
+        local = self._local
+        if not hasattr(local, 'stack'):
+            local.stack = []
+            local.validating = set()
+            local.active = 0
+        return local
+
+    def _record(self, path, seconds=0.0, validate_seconds=0.0, nbytes=0,
+                calls=0):
+        with self._lock:
+            entry = self.stats.setdefault(path, [0, 0.0, 0.0, 0])
+            entry[0] += calls
+            entry[1] += seconds
+            entry[2] += validate_seconds
+            entry[3] += nbytes
+
+    def _wrap_deserialize(self, original):
+        profiler = self
+
+        def deserialize(field, value, attr=None, data=None, **kwargs):
+            state = profiler._state()
+            if not state.active:
+                return original(field, value, attr, data, **kwargs)
+            name = '*' if attr is None else str(attr)
+            state.stack.append(name)
+            path = '.'.join(state.stack)
+            before = (tracemalloc.get_traced_memory()[0]
+                      if profiler.memory else 0)
+            start = time.perf_counter()
+            try:
+                return original(field, value, attr, data, **kwargs)
+            finally:
+                seconds = time.perf_counter() - start
+                nbytes = (tracemalloc.get_traced_memory()[0] - before
+                          if profiler.memory else 0)
+                state.stack.pop()
+                profiler._record(path, seconds, nbytes=nbytes, calls=1)
+        return deserialize
+
+    def _wrap_validate(self, original):
+        profiler = self
+
+        def _validate(field, value):
+            state = profiler._state()
+            if not state.active or id(field) in state.validating:
+                # a super() call of a subclass' _validate
+                return original(field, value)
+            state.validating.add(id(field))
+            start = time.perf_counter()
+            try:
+                return original(field, value)
+            finally:
+                seconds = time.perf_counter() - start
+                state.validating.discard(id(field))
+                path = ('.'.join(state.stack) if state.stack
+                        else field.name or '*')
+                profiler._record(path, validate_seconds=seconds)
+        return _validate
+
+    def __enter__(self):
+        with _ACTIVE_LOCK:
+            if _ACTIVE:
+                if _ACTIVE[0] is not self:
+                    raise RuntimeError('another Profiler is already active')
+                # re-entered, e.g. by a load nested in a profiled load
+                self._depth += 1
+                self._state().active += 1
+                return self
+            _ACTIVE.append(self)
+        self._state().active += 1
+        for name, wrap in (('deserialize', self._wrap_deserialize),
+                           ('_validate', self._wrap_validate)):
+            for cls in _field_classes(mm.fields.Field, name):
+                original = cls.__dict__[name]
+                self._patched.append((cls, name, original))
+                setattr(cls, name, wrap(original))
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+        return self
+
+    def __exit__(self, *exc_info):
+        self._state().active -= 1
+        with _ACTIVE_LOCK:
+            if self._depth:
+                self._depth -= 1
+                return False
+        while self._patched:
+            cls, name, original = self._patched.pop()
+            setattr(cls, name, original)
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+        with _ACTIVE_LOCK:
+            _ACTIVE.remove(self)
+        return False
+
+    def report(self):
+        """get the accumulated statistics, most expensive field first
+
+        Returns
+        -------
+        list of dict
+            path, calls, seconds (cumulative, including the fields nested
+            in it), validate_seconds and bytes of every field path
+        """
+        with self._lock:
+            items = list(self.stats.items())
+        rows = [{'path': path, 'calls': calls, 'seconds': seconds,
+                 'validate_seconds': validate_seconds, 'bytes': nbytes}
+                for path, (calls, seconds, validate_seconds, nbytes) in items]
+        return sorted(rows, key=lambda row: (-row['seconds'], row['path']))
+
+    def format_table(self, limit=None):
+        """format the statistics as a text table
+
+        Parameters
+        ----------
+        limit : int or None
+            number of (most expensive) fields to include, None for all
+            (Default value = None)
+
+        Returns
+        -------
+        str
+            the table
+        """
+        rows = self.report()[:limit]
+        width = max([len('path')] + [len(row['path']) for row in rows])
+        lines = ['{:<{w}}  {:>8}  {:>10}  {:>10}  {:>12}'.format(
+            'path', 'calls', 'total (s)', 'valid. (s)', 'bytes', w=width)]
+        for row in rows:
+            lines.append('{:<{w}}  {:>8}  {:>10.6f}  {:>10.6f}  {:>12}'.format(
+                row['path'], row['calls'], row['seconds'],
+                row['validate_seconds'],
+                row['bytes'] if self.memory else '-', w=width))
+        return '\n'.join(lines) + '\n'
+
+    def to_json(self):
+        """format the statistics as a JSON report
+
+        Returns
+        -------
+        str
+            JSON list of the rows of :meth:`report`
+        """
+        return json.dumps(self.report(), indent=2)
+
+
+def active_profiler():
+    """get the active profiler
+
+    Returns
+    -------
+    Profiler or None
+        the active profiler, None if profiling is not active
+    """
+    with _ACTIVE_LOCK:
+        return _ACTIVE[0] if _ACTIVE else None
+
+
+def env_options(environ=None):
+    """parse the ARGSCHEMA_PROFILE environment variable
+
+    Parameters
+    ----------
+    environ : Mapping or None
+        environment variables, if None use os.environ (Default value = None)
+
+    Returns
+    -------
+    dict or None
+        options 'format' ('table' or 'json'), 'memory' (bool) and 'path'
+        (str or None), None if profiling is not enabled
+    """
+    environ = os.environ if environ is None else environ
+    value = environ.get(PROFILE_ENV, '').strip()
+    if value in ('', '0'):
+        return None
+    options = {'format': 'table', 'memory': False, 'path': None}
+    for option in value.split(','):
+        option = option.strip()
+        if option in ('1', 'table', 'json'):
+            options['format'] = 'json' if option == 'json' else 'table'
+        elif option == 'memory':
+            options['memory'] = True
+        elif option:
+            options['path'] = option
+    return options
+
+
+def write_report(profiler, format='table', path=None):
+    """write the report of a profiler to a file (appending) or to stderr
+
+    Parameters
+    ----------
+    profiler : Profiler
+        profiler to report on
+    format : str
+        'table' or 'json' (Default value = 'table')
+    path : str or None
+        file to append the report to, if None write to stderr
+        (Default value = None)
+    """
+    text = (profiler.to_json() + '\n' if format == 'json'
+            else profiler.format_table())
+    if path is None:
+        sys.stderr.write(text)
+    else:
+        with open(path, 'a') as fp:
+            fp.write(text)
+
+
+def main(argv=None):  # pragma: no cover
+    parser = argparse.ArgumentParser(
+        description='profile the validation of an input with a schema')
+    parser.add_argument('schema', help='module:Class of the schema (or of an '
+                                       'ArgSchemaParser subclass)')
+    parser.add_argument('input', help='input file (see argschema.formats)')
+    parser.add_argument('--format', choices=['table', 'json'], default='table')
+    parser.add_argument('--memory', action='store_true',
+                        help='count the bytes allocated with tracemalloc')
+    parser.add_argument('--limit', type=int, default=None,
+                        help='number of fields in the table')
+    opts = parser.parse_args(argv)
+    sys.path.insert(0, os.getcwd())
+    from . import formats
+    schema_class = utils.import_object(opts.schema)
+    schema_class = getattr(schema_class, 'default_schema', schema_class)
+    d = formats.read_input(opts.input)
+    profiler = Profiler(memory=opts.memory)
+    status = 0
+    with profiler:
+        try:
+            utils.load(schema_class(), d)
+        except mm.ValidationError as e:
+            sys.stderr.write('validation failed: {}\n'.format(e.messages))
+            status = 1
+    if opts.format == 'json':
+        sys.stdout.write(profiler.to_json() + '\n')
+    else:
+        sys.stdout.write(profiler.format_table(opts.limit))
+    return status
+
+
+if __name__ == '__main__':  # pragma: no cover
+    sys.exit(main())
@@ -0,0 +1,194 @@
+'''module for materializing loaded arguments as frozen, slotted record objects
+generated per schema, which use much less memory than dictionaries'''
+import keyword
+import weakref
+from collections.abc import Mapping
+import marshmallow as mm
+
+# generated record classes, keyed by schema class and then by (only, exclude)
+_RECORD_CLASSES = weakref.WeakKeyDictionary()
+
+
+class Record(Mapping):
+    """base class of the record classes generated by :func:`record_class`.
+    Records are read-only mappings whose values can also be accessed as
+    attributes, and which store their values in __slots__.
+    Nested schemas give nested records, Nested(many=True) a tuple of records.
+
+    Values of fields whose names are not valid attribute names (or clash with
+    the methods of this class) are only accessible by item access.
+    """
+    __slots__ = ('_extra',)
+    _fields = ()
+    _field_set = frozenset()
+    _schema_class = None
+    _schema_options = None
+
+    def __init__(self, values):
+        extra = None
+        for key, value in values.items():
+            if key in self._field_set:
+                object.__setattr__(self, key, value)
+            else:
+                extra = {} if extra is None else extra
+                extra[key] = value
+        object.__setattr__(self, '_extra', extra)
+
+    def __setattr__(self, name, value):
+        raise AttributeError('{} is frozen'.format(type(self).__name__))
+
+    def __delattr__(self, name):
+        raise AttributeError('{} is frozen'.format(type(self).__name__))
+
+    def __getitem__(self, key):
+        if key in self._field_set:
+            try:
+                return getattr(self, key)
+            except AttributeError:
+                raise KeyError(key)
+        if self._extra is not None and key in self._extra:
+            return self._extra[key]
+        raise KeyError(key)
+
+    def __iter__(self):
+        for name in self._fields:
+            if hasattr(self, name):
+                yield name
+        if self._extra is not None:
+            for key in self._extra:
+                yield key
+
+    def __len__(self):
+        return sum(1 for key in self)
+
+    def __eq__(self, other):
+        if not isinstance(other, Mapping):
+            return NotImplemented
+        return to_dict(self) == to_dict(other)
+
+    __hash__ = None
+
+    def __repr__(self):
+        return '{}({})'.format(type(self).__name__, ', '.join(
+            '{}={!r}'.format(k, v) for k, v in self.items()))
+
+    def __reduce__(self):
+        return (_rebuild_record, (self._schema_class, self._schema_options,
+                                  dict(self.items())))
+
+    def to_dict(self):
+        """convert this record (and nested records) back into dictionaries
+
+        Returns
+        -------
+        dict
+            dictionary of the values of this record
+        """
+        return to_dict(self)
+
+
+def _rebuild_record(schema_class, options, values):
+    cls = record_class(schema_class(**options))
+    return cls(values)
+
+
+def _slot_names(schema):
+    reserved = set(dir(Record))
+    names = []
+    for name, field in schema.fields.items():
+        if field.dump_only:
+            continue
+        key = field.attribute or name
+        if (key.isidentifier() and not keyword.iskeyword(key) and
+                not key.startswith('_') and key not in reserved):
+            names.append(key)
+    return tuple(names)
+
+
+def record_class(schema):
+    """get the record class generated for a schema
+
+    Parameters
+    ----------
+    schema : marshmallow.Schema
+        schema to get the record class of
+
+    Returns
+    -------
+    type
+        subclass of :class:`Record` with a slot for each field of the schema
+    """
+    options = {'only': tuple(sorted(schema.only)) if schema.only else None,
+               'exclude': tuple(sorted(schema.exclude))}
+    classes = _RECORD_CLASSES.setdefault(type(schema), {})
+    key = (options['only'], options['exclude'])
+    cls = classes.get(key)
+    if cls is None:
+        names = _slot_names(schema)
+        name = type(schema).__name__
+        if name.endswith('Schema') and len(name) > len('Schema'):
+            name = name[:-len('Schema')]
+        cls = type(name + 'Record', (Record,), {
+            '__slots__': names,
+            '_fields': names,
+            '_field_set': frozenset(names),
+            '_schema_class': type(schema),
+            '_schema_options': options,
+            '__module__': __name__,
+        })
+        classes[key] = cls
+    return cls
+
+
+def to_record(schema, data):
+    """convert a dictionary loaded by a schema into a record
+
+    Parameters
+    ----------
+    schema : marshmallow.Schema
+        schema that loaded the data
+    data : dict
+        loaded data
+
+    Returns
+    -------
+    Record
+        frozen record of the data
+    """
+    fields = {field.attribute or name: field
+              for name, field in schema.fields.items()}
+    values = {}
+    for key, value in data.items():
+        field = fields.get(key)
+        if isinstance(field, mm.fields.Nested):
+            if field.many and isinstance(value, (list, tuple)):
+                value = tuple(to_record(field.schema, v)
+                              if isinstance(v, dict) else v for v in value)
+            elif not field.many and isinstance(value, dict):
+                value = to_record(field.schema, value)
+        values[key] = value
+    return record_class(schema)(values)
+
+
+def to_dict(obj):
+    """convert records (possibly nested in lists and tuples) back into dictionaries
+
+    Parameters
+    ----------
+    obj : object
+        record, or other object possibly containing records
+
+    Returns
+    -------
+    object
+        obj with records replaced by dictionaries (and tuples of records by lists)
+    """
+    if isinstance(obj, Record):
+        return {k: to_dict(v) for k, v in obj.items()}
+    if isinstance(obj, tuple) and any(isinstance(v, Record) for v in obj):
+        return [to_dict(v) for v in obj]
+    if isinstance(obj, dict):
+        return {k: to_dict(v) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [to_dict(v) for v in obj]
+    return obj
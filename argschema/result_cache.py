@@ -0,0 +1,320 @@
+'''module for caching validated arguments on disk, so that running a module
+again with identical inputs can skip validation'''
+import os
+import pickle
+import logging
+import tempfile
+import marshmallow as mm
+from . import utils
+from . import fields
+from . import plans
+from . import filesystems
+from .hashing import canonical_hash
+
+logger = logging.getLogger(__name__)
+
+
+def path_state(path):
+    """get the part of the state of a path that validation depends on
+
+    Parameters
+    ----------
+    path : str
+        path to a file or directory
+
+    Returns
+    -------
+    tuple or None
+        (absolute path, inode, device, mode, size, mtime and ctime in ns),
+        or (absolute path, None) if the path cannot be stat-ed
+    """
+    path = os.path.abspath(path)
+    try:
+        st = os.stat(path)
+    except (OSError, ValueError):
+        return (path, None)
+    return (path, st.st_ino, st.st_dev, st.st_mode, st.st_size,
+            st.st_mtime_ns, st.st_ctime_ns)
+
+
+def _timed_path_state(path):
+    # path_state with the timeout of the filesystem adapter, if it has one
+    filesystem = filesystems.get_filesystem()
+    if isinstance(filesystem, filesystems.TimeoutFileSystem):
+        return filesystem.run(path_state, path)
+    return path_state(path)
+
+
+def referenced_path_states(schema, args):
+    """get the state of all the paths that the path fields of a schema
+    check during validation.  For InputFile and InputDir this is the path
+    itself, for OutputFile its directory, for OutputDir the directory itself
+    and for InputGlob (and indexed InputDir) the directories searched
+
+    Parameters
+    ----------
+    schema : marshmallow.Schema
+        schema to find path fields in
+    args : dict
+        arguments to be validated by schema
+
+    Returns
+    -------
+    list
+        list of (field path, :func:`path_state`) for every path field value
+    """
+    states = []
+    for path, field, value in utils.iter_field_values(schema, args):
+        if isinstance(field, fields.InputGlob):
+            # the matches depend on the listings of the directories searched
+            try:
+                matches, visited = field.expand(value)
+            except mm.ValidationError:
+                continue
+            states.extend((path, _timed_path_state(d))
+                          for d in sorted(visited))
+            continue
+        if not isinstance(value, str):
+            continue
+        if isinstance(field, fields.InputDir) and field.index:
+            # the index depends on all of the directories walked
+            try:
+                index = field.build_index(value)
+            except (OSError, mm.ValidationError):
+                index = None
+            if index is not None:
+                states.extend(
+                    (path, _timed_path_state(os.path.join(value, d)))
+                    for d in index.directories)
+                continue
+        if isinstance(field, fields.OutputFile):
+            value = os.path.dirname(value) or os.curdir
+        elif not isinstance(field, (fields.InputFile, fields.InputDir,
+                                    fields.OutputDir)):
+            continue
+        states.append((path, _timed_path_state(value)))
+    return states
+
+
+def recreate_output_dirs(schema, result):
+    """run the validation of the OutputDir fields of a (cached) result again,
+    which creates their directories if they no longer exist
+
+    Parameters
+    ----------
+    schema : marshmallow.Schema
+        schema the result was loaded with
+    result : dict
+        validated arguments
+
+    Raises
+    ------
+    marshmallow.ValidationError
+        if a directory cannot be created or does not have the field's mode
+    """
+    errors = {}
+    for path, field, value in utils.iter_field_values(schema, result,
+                                                      loaded=True):
+        if not isinstance(field, fields.OutputDir) or not isinstance(value, str):
+            continue
+        try:
+            field._validate(value)
+        except mm.ValidationError as e:
+            messages = e.messages
+            for key in reversed(path):
+                messages = {key: messages}
+            utils.smart_merge(errors, messages)
+    if errors:
+        raise mm.ValidationError(errors)
+
+
+class ResultCache(object):
+    """an on-disk cache of validated arguments, keyed by a canonical hash of
+    the schema definition, the merged arguments and the state (inode, size,
+    mode and modification times) of every path checked by path fields.
+
+    Any change to the arguments, the referenced files and directories or the
+    schema definition (its fields, Meta options, hooks and the code of its
+    methods, custom fields and validators, see
+    :func:`plans.schema_fingerprint`) gives a different key.  Changes to
+    other code that these call are not detected.
+    The cache holds at most max_entries results, the least recently used
+    ones are removed when it grows beyond that.  The directories of OutputDir
+    fields are created again (if needed) when a cached result is used.
+
+    Parameters
+    ----------
+    cache_dir : str or None
+        directory to store cached results in, if None use the default user
+        cache directory (Default value = None)
+    max_entries : int or None
+        maximum number of cached results, None for no limit
+        (Default value = 256)
+    """
+
+    def __init__(self, cache_dir=None, max_entries=256):
+        if cache_dir is None:
+            cache_dir = plans.default_cache_dir('results')
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+
+    def key(self, schema, args):
+        """compute the cache key of loading args with schema
+
+        Parameters
+        ----------
+        schema : marshmallow.Schema
+            schema to validate with
+        args : dict
+            arguments to validate
+
+        Returns
+        -------
+        str
+            cache key
+        """
+        return canonical_hash([plans.schema_fingerprint(schema),
+                               args,
+                               referenced_path_states(schema, args)])
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key + '.pickle')
+
+    def get(self, key):
+        """get a cached result
+
+        Parameters
+        ----------
+        key : str
+            key as returned by :meth:`key`
+
+        Returns
+        -------
+        dict or None
+            the cached result, or None if there is none
+        """
+        try:
+            with open(self._path(key), 'rb') as fp:
+                result = pickle.load(fp)
+            # mark the entry as recently used, see evict
+            os.utime(self._path(key))
+            return result
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.debug('ignoring unreadable cached result {}: {}'.format(
+                key, e))
+            return None
+
+    def put(self, key, result):
+        """store a result in the cache, failures to write are ignored
+
+        Parameters
+        ----------
+        key : str
+            key as returned by :meth:`key`
+        result : dict
+            validated arguments
+        """
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as fp:
+                    pickle.dump(result, fp, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(tmp, self._path(key))
+            except Exception:
+                os.remove(tmp)
+                raise
+        except Exception as e:
+            logger.debug('could not cache result {}: {}'.format(key, e))
+            return
+        self.evict()
+
+    def evict(self):
+        """remove the least recently used results beyond max_entries"""
+        if self.max_entries is None:
+            return
+        entries = []
+        try:
+            with os.scandir(self.cache_dir) as it:
+                for entry in it:
+                    if entry.name.endswith('.pickle'):
+                        try:
+                            entries.append((entry.stat().st_mtime_ns,
+                                            entry.path))
+                        except OSError:
+                            pass
+        except OSError:
+            return
+        entries.sort()
+        for _, path in entries[:max(len(entries) - self.max_entries, 0)]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def clear(self):
+        """remove all cached results"""
+        if not os.path.isdir(self.cache_dir):
+            return
+        for name in os.listdir(self.cache_dir):
+            if name.endswith('.pickle'):
+                os.remove(os.path.join(self.cache_dir, name))
+
+    def load(self, schema, args, loader):
+        """get the cached result of loading args with schema,
+        or load it with loader and cache the result
+
+        Parameters
+        ----------
+        schema : marshmallow.Schema
+            schema to validate with
+        args : dict
+            arguments to validate
+        loader : callable
+            function loader(schema, args) that validates args
+
+        Returns
+        -------
+        dict
+            validated arguments
+
+        Raises
+        ------
+        marshmallow.ValidationError
+            if loader does (failures are never cached), or if the directory
+            of an OutputDir field of a cached result cannot be created
+        """
+        key = self.key(schema, args)
+        result = self.get(key)
+        if result is None:
+            result = loader(schema, args)
+            self.put(key, result)
+        else:
+            logger.debug('using cached result {}'.format(key))
+            recreate_output_dirs(schema, result)
+        return result
+
+
+def as_result_cache(option):
+    """convert the result_cache option of ArgSchemaParser into a ResultCache
+
+    Parameters
+    ----------
+    option : ResultCache, str, bool or None
+        a ResultCache, a cache directory, True for the default user cache
+        directory, or None/False to disable caching
+
+    Returns
+    -------
+    ResultCache or None
+        the result cache to use, if any
+    """
+    if option is None or option is False:
+        return None
+    if isinstance(option, ResultCache):
+        return option
+    if option is True:
+        return ResultCache()
+    return ResultCache(option)
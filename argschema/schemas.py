@@ -1,3 +1,4 @@
+import copy
 import marshmallow as mm
 from .fields import LogLevel, InputFile, OutputFile
 
@@ -22,10 +23,16 @@ class DefaultSchema(mm.Schema):
             a dictionary with default values applied
 
         """
+        defaults = {}
         for name, field in self.fields.items():
             if name not in in_data:
                 if field.default is not mm.missing:
-                    in_data[name] = field.default
+                    defaults[name] = field.default
+        if defaults:
+            # copy rather than update in place, so neither the caller's input
+            # nor a mutable default (e.g. default={}) is modified
+            in_data = copy.copy(in_data)
+            in_data.update(defaults)
         return in_data
 
 
@@ -0,0 +1,307 @@
+'''resident validation server, which keeps schemas imported and their plans
+compiled in a long-lived process and validates requests sent over a unix
+domain socket, so that validating many sets of arguments from the shell
+does not pay the start up cost of python, marshmallow, numpy and the schemas
+every time.  Use :mod:`argschema.client` to send requests.
+
+command line usage::
+
+    python -m argschema.server /tmp/argschema.sock mypackage.mymodule:MySchema
+
+Only the schemas given on the command line (which are loaded before serving)
+and the ones given with --allow (loaded on their first request) are served.
+
+Requests and responses are single lines of json.  A request is
+{"schema": "module:Class", "input_data": {...}, "args": [...], "cwd": "...",
+"env": {...}} and the response is {"ok": true, "args": {...}} with the
+validated arguments, or {"ok": false, "errors": ...}, where errors is the
+argparse message (usage and error) for invalid command line arguments.
+'''
+import os
+import sys
+import json
+import logging
+import argparse
+import threading
+import contextlib
+import socketserver
+from collections.abc import Mapping
+import numpy as np
+import marshmallow as mm
+from . import lazy
+from . import plans
+from . import utils
+from .argschema_parser import ArgSchemaParser
+
+logger = logging.getLogger(__name__)
+
+
+def jsonable(obj):
+    """convert loaded arguments into json serializable types
+
+    Parameters
+    ----------
+    obj : object
+        loaded arguments
+
+    Returns
+    -------
+    object
+        obj with numpy arrays and scalars converted to lists and scalars,
+        slices to "start:stop:step" strings and mappings (including records
+        and lazily loaded arguments) to dictionaries
+
+    Raises
+    ------
+    marshmallow.ValidationError
+        if lazily loaded arguments do not pass validation
+    """
+    if isinstance(obj, lazy.LazyArgs):
+        # load the remaining subtrees, so that their errors are reported
+        obj = obj.validate_all()
+    if isinstance(obj, Mapping):
+        return {k: jsonable(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [jsonable(v) for v in obj]
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, slice):
+        return ':'.join('' if v is None else str(v)
+                        for v in (obj.start, obj.stop, obj.step))
+    if obj is None or isinstance(obj, (str, int, float, bool)):
+        return obj
+    return str(obj)
+
+
+class NotServedError(Exception):
+    """raised for requests of schemas that the server does not serve"""
+    pass
+
+
+# argparse output (usage, errors and help) of the request of each thread
+_OUTPUT = threading.local()
+
+
+def _print_message(message, file=None):
+    # replaces ArgumentParser._print_message, so that the output goes back
+    # to the client rather than to the server's stderr
+    if message:
+        _OUTPUT.messages.append(message)
+
+
+class WorkingDirectory(object):
+    """switches the (process wide) working directory between requests:
+    requests with the same working directory run concurrently, and a request
+    with another one waits until they are done"""
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._cwd = None
+        self._active = 0
+        self._waiting = 0
+
+    @contextlib.contextmanager
+    def use(self, cwd):
+        """context manager running a request in a working directory
+
+        Parameters
+        ----------
+        cwd : str
+            working directory of the request
+        """
+        with self._condition:
+            self._waiting += 1
+            while self._active and (self._cwd != cwd or self._waiting > 1):
+                self._condition.wait()
+            self._waiting -= 1
+            if not self._active and self._cwd != cwd:
+                os.chdir(cwd)
+                self._cwd = cwd
+            self._active += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._active -= 1
+                if not self._active:
+                    self._condition.notify_all()
+
+
+class ValidationServer(socketserver.ThreadingMixIn,
+                       socketserver.UnixStreamServer):
+    """server validating arguments against warm schema classes
+
+    Parameters
+    ----------
+    socket_path : str
+        path of the unix domain socket to listen on (an existing socket
+        file is replaced)
+    preload : list of str
+        "module:Class" paths of schemas (or ArgSchemaParser subclasses) to
+        import and compile before serving (Default value = ())
+    allow : list of str
+        "module:Class" paths of other schemas that requests can use, which
+        are imported on their first request.  Requests for schemas neither
+        preloaded nor allowed are rejected (Default value = ())
+    """
+    daemon_threads = True
+
+    def __init__(self, socket_path, preload=(), allow=()):
+        self.socket_path = os.path.abspath(socket_path)
+        self.allowed = set(preload) | set(allow)
+        self._classes = {}
+        self._lock = threading.Lock()
+        self._cwd = WorkingDirectory()
+        for path in preload:
+            self.parser_class(path)
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+        socketserver.UnixStreamServer.__init__(
+            self, self.socket_path, ValidationRequestHandler)
+
+    def parser_class(self, path):
+        """get the (cached) ArgSchemaParser subclass to validate with,
+        importing and compiling the schema the first time
+
+        Parameters
+        ----------
+        path : str
+            "module:Class" path of an ArgSchema or ArgSchemaParser subclass
+
+        Returns
+        -------
+        type
+            ArgSchemaParser subclass
+
+        Raises
+        ------
+        NotServedError
+            if the schema is neither preloaded nor allowed
+        """
+        cls = self._classes.get(path)
+        if cls is not None:
+            return cls
+        if path not in self.allowed:
+            raise NotServedError('schema {} is not served'.format(path))
+        with self._lock:
+            cls = self._classes.get(path)
+            if cls is None:
+                obj = utils.import_object(path)
+                if isinstance(obj, type) and issubclass(obj, ArgSchemaParser):
+                    cls = obj
+                elif isinstance(obj, type) and issubclass(obj, mm.Schema):
+                    cls = type(obj.__name__ + 'Parser', (ArgSchemaParser,),
+                               {'default_schema': obj})
+                else:
+                    raise TypeError('{} is not an ArgSchema or '
+                                    'ArgSchemaParser subclass'.format(path))
+                parser = plans.get_schema_plan(cls.default_schema()).argparser()
+                parser._print_message = _print_message
+                self._classes[path] = cls
+        return cls
+
+    def validate(self, message):
+        """validate the arguments of a request
+
+        Parameters
+        ----------
+        message : dict
+            request, see the module documentation
+
+        Returns
+        -------
+        dict
+            response, see the module documentation
+        """
+        _OUTPUT.messages = []
+        try:
+            cls = self.parser_class(message['schema'])
+            env = message.get('env')
+            if env is not None and cls.env_prefix is not None:
+                # environment parameters come from the client's environment
+                cls = type(cls.__name__, (cls,), {'environ': env})
+            cwd = message.get('cwd')
+            # paths are validated relative to the client's working directory
+            with (self._cwd.use(cwd) if cwd is not None
+                  else contextlib.nullcontext()):
+                mod = cls(input_data=message.get('input_data'),
+                          args=message.get('args') or [])
+                args = jsonable(mod.args)
+        except mm.ValidationError as e:
+            return {'ok': False, 'errors': jsonable(e.messages)}
+        except SystemExit:
+            return {'ok': False,
+                    'errors': ''.join(_OUTPUT.messages) or
+                    'invalid command line arguments {}'.format(
+                        message.get('args'))}
+        except NotServedError as e:
+            return {'ok': False, 'errors': str(e)}
+        except Exception as e:
+            logger.exception('failed to validate request')
+            return {'ok': False,
+                    'errors': '{}: {}'.format(type(e).__name__, e)}
+        return {'ok': True, 'args': args}
+
+    def server_close(self):
+        socketserver.UnixStreamServer.server_close(self)
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+
+
+class ValidationRequestHandler(socketserver.StreamRequestHandler):
+    """handles one json line request per connection"""
+
+    def handle(self):
+        line = self.rfile.readline()
+        if not line:
+            return
+        try:
+            message = json.loads(line.decode('utf-8'))
+        except ValueError as e:
+            response = {'ok': False, 'errors': 'invalid request: {}'.format(e)}
+        else:
+            response = self.server.validate(message)
+        self.wfile.write(json.dumps(response).encode('utf-8') + b'\n')
+
+
+def serve(socket_path, preload=(), allow=()):
+    """run a validation server until interrupted
+
+    Parameters
+    ----------
+    socket_path : str
+        path of the unix domain socket to listen on
+    preload : list of str
+        "module:Class" paths of schemas to import and compile before serving
+        (Default value = ())
+    allow : list of str
+        "module:Class" paths of other schemas to serve, imported on their
+        first request (Default value = ())
+    """
+    server = ValidationServer(socket_path, preload, allow)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:  # pragma: no cover
+        pass
+    finally:
+        server.server_close()
+
+
+def main(argv=None):  # pragma: no cover
+    parser = argparse.ArgumentParser(
+        description='serve argschema validation over a unix domain socket')
+    parser.add_argument('socket', help='path of the socket to listen on')
+    parser.add_argument('preload', nargs='*',
+                        help='module:Class of schemas to load before serving')
+    parser.add_argument('--allow', action='append', default=[],
+                        help='module:Class of a schema to serve, loaded on '
+                             'its first request (can be given multiple times)')
+    opts = parser.parse_args(argv)
+    sys.path.insert(0, os.getcwd())
+    serve(opts.socket, opts.preload, opts.allow)
+
+
+if __name__ == '__main__':  # pragma: no cover
+    main()
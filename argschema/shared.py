@@ -0,0 +1,222 @@
+'''module for exporting the numpy arrays of validated arguments to shared
+memory, so that worker processes attach to them rather than receiving
+pickled copies
+
+The arguments are exported with :func:`share_args` (or
+:meth:`ArgSchemaParser.share_args`), which returns a small picklable
+:class:`SharedArgs` handle to send to the workers; each worker calls its
+attach method to get the arguments back, with arrays viewing the shared
+blocks.  Requires Python 3.8+ (multiprocessing.shared_memory).
+'''
+from collections.abc import Mapping
+from multiprocessing import shared_memory
+import numpy as np
+
+# blocks created by this process (or by the parent it was forked from),
+# keyed by name, which are reused rather than re-opened when attaching
+_CREATED = {}
+# blocks opened by this process when attaching, keyed by name
+_ATTACHED = {}
+
+
+class SharedArray(object):
+    """picklable reference to a numpy array held in a shared memory block
+
+    Parameters
+    ----------
+    name : str
+        name of the shared memory block
+    shape : tuple
+        shape of the array
+    dtype : str
+        dtype of the array, as a numpy dtype string
+    """
+    __slots__ = ('name', 'shape', 'dtype')
+
+    def __init__(self, name, shape, dtype):
+        self.name = name
+        self.shape = tuple(shape)
+        self.dtype = dtype
+
+    def __getstate__(self):
+        return (self.name, self.shape, self.dtype)
+
+    def __setstate__(self, state):
+        self.name, self.shape, self.dtype = state
+
+    def __repr__(self):
+        return 'SharedArray({!r}, {!r}, {!r})'.format(
+            self.name, self.shape, self.dtype)
+
+    def attach(self, writeable=False):
+        """get the array, as a view of the shared memory block (no copy)
+
+        Parameters
+        ----------
+        writeable : bool
+            whether the returned array can be written to (writes are seen by
+            every process attached to the block) (Default value = False)
+
+        Returns
+        -------
+        numpy.ndarray
+            the shared array
+        """
+        block = _open_block(self.name)
+        array = np.ndarray(self.shape, dtype=np.dtype(self.dtype),
+                           buffer=block.buf)
+        array.flags.writeable = writeable
+        return array
+
+
+def _open_block(name):
+    block = _CREATED.get(name)
+    if block is None:
+        block = _ATTACHED.get(name)
+    if block is None:
+        try:
+            block = shared_memory.SharedMemory(name=name, track=False)
+        except TypeError:
+            # before Python 3.13 attaching registers the block with the
+            # resource tracker, which would unlink it when this process exits
+            from multiprocessing import resource_tracker
+            block = shared_memory.SharedMemory(name=name)
+            resource_tracker.unregister(block._name, 'shared_memory')
+        _ATTACHED[name] = block
+    return block
+
+
+class SharedArgs(object):
+    """picklable handle to arguments whose numpy arrays were exported to shared
+    memory by :func:`share_args`
+
+    Parameters
+    ----------
+    tree : object
+        the arguments, with the exported arrays replaced by :class:`SharedArray`
+    """
+
+    def __init__(self, tree):
+        self.tree = tree
+
+    @property
+    def arrays(self):
+        """list of SharedArray: references to the exported arrays"""
+        found = []
+
+        def walk(value):
+            if isinstance(value, SharedArray):
+                found.append(value)
+            elif isinstance(value, dict):
+                for v in value.values():
+                    walk(v)
+            elif isinstance(value, (list, tuple)):
+                for v in value:
+                    walk(v)
+        walk(self.tree)
+        return found
+
+    def attach(self, writeable=False):
+        """get the arguments back, with arrays viewing the shared memory blocks
+
+        Parameters
+        ----------
+        writeable : bool
+            whether the arrays can be written to (Default value = False)
+
+        Returns
+        -------
+        dict
+            the arguments
+        """
+        def rebuild(value):
+            if isinstance(value, SharedArray):
+                return value.attach(writeable)
+            if isinstance(value, dict):
+                return {k: rebuild(v) for k, v in value.items()}
+            if isinstance(value, list):
+                return [rebuild(v) for v in value]
+            if isinstance(value, tuple):
+                return tuple(rebuild(v) for v in value)
+            return value
+        return rebuild(self.tree)
+
+
+def _export(array, blocks):
+    block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    _CREATED[block.name] = block
+    blocks.append(block)
+    shared = np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)
+    shared[...] = array
+    return SharedArray(block.name, array.shape, array.dtype.str)
+
+
+def share_args(args, min_size=0):
+    """export the numpy arrays of (validated) arguments to shared memory blocks
+
+    Parameters
+    ----------
+    args : dict
+        arguments, e.g. ArgSchemaParser.args (records and other mappings are
+        converted to dictionaries)
+    min_size : int
+        arrays smaller than this number of bytes are pickled with the handle
+        instead (Default value = 0)
+
+    Returns
+    -------
+    tuple
+        (:class:`SharedArgs` handle, list of the created
+        multiprocessing.shared_memory.SharedMemory blocks, which the caller
+        releases with :func:`release_blocks` when the workers are done)
+    """
+    blocks = []
+
+    def convert(value):
+        if (isinstance(value, np.ndarray) and not value.dtype.hasobject and
+                value.nbytes >= min_size):
+            return _export(value, blocks)
+        if isinstance(value, Mapping):
+            return {k: convert(v) for k, v in value.items()}
+        if isinstance(value, list):
+            return [convert(v) for v in value]
+        if isinstance(value, tuple) and not hasattr(value, '_fields'):
+            return tuple(convert(v) for v in value)
+        return value
+    try:
+        return SharedArgs(convert(args)), blocks
+    except Exception:
+        release_blocks(blocks)
+        raise
+
+
+def release_blocks(blocks):
+    """close and unlink shared memory blocks created by :func:`share_args`
+    (arrays attached in this process must no longer be used)
+
+    Parameters
+    ----------
+    blocks : list
+        multiprocessing.shared_memory.SharedMemory blocks
+    """
+    for block in blocks:
+        _CREATED.pop(block.name, None)
+        try:
+            block.close()
+        except BufferError:
+            # arrays still view the block: the mapping goes away with them
+            pass
+        try:
+            block.unlink()
+        except FileNotFoundError:
+            pass
+
+
+def detach_all():
+    """close the shared memory blocks attached by this process"""
+    while _ATTACHED:
+        name, block = _ATTACHED.popitem()
+        try:
+            block.close()
+        except BufferError:
+            pass
@@ -0,0 +1,274 @@
+'''module for expanding parameter sweeps given in the input.
+A "$sweep" key at the top level of the input describes the values to
+sweep over, by dotted field path::
+
+    {
+        "a": 1,
+        "$sweep": {
+            "grid": {"lr": [0.1, 0.01], "nested.b": [1, 2, 3]},
+            "zip": {"x": [1, 2], "y": ["one", "two"]}
+        }
+    }
+
+"grid" paths are swept over all their combinations, "zip" paths are swept
+together (their lists must have the same length), and both combine as a
+product (12 points above).  A list of such specifications sweeps over the
+points of each of them in turn.  Points are generated lazily, and the
+non-varying part of the input is only validated once.
+'''
+import copy
+import itertools
+import marshmallow as mm
+from . import utils
+
+SWEEP_KEY = '$sweep'
+
+
+def split_sweep(d):
+    """split the sweep specification off an input dictionary
+
+    Parameters
+    ----------
+    d : dict
+        input dictionary
+
+    Returns
+    -------
+    tuple
+        (d without the sweep key, sweep specification or None)
+    """
+    if not isinstance(d, dict) or SWEEP_KEY not in d:
+        return d, None
+    d = dict(d)
+    spec = d.pop(SWEEP_KEY)
+    for part in _spec_parts(spec):
+        for key in part:
+            if key not in ('grid', 'zip'):
+                raise mm.ValidationError(
+                    {SWEEP_KEY: ['unknown sweep type {}'.format(key)]})
+            if not isinstance(part[key], dict):
+                raise mm.ValidationError(
+                    {SWEEP_KEY: ['{} must be a dictionary'.format(key)]})
+            for path, values in part[key].items():
+                if not isinstance(values, list):
+                    raise mm.ValidationError({SWEEP_KEY: [
+                        '{} values of {} must be a list'.format(key, path)]})
+                if not values:
+                    raise mm.ValidationError({SWEEP_KEY: [
+                        '{} values of {} are empty'.format(key, path)]})
+        lengths = set(len(values) for values in part.get('zip', {}).values())
+        if len(lengths) > 1:
+            raise mm.ValidationError(
+                {SWEEP_KEY: ['zip lists must all have the same length']})
+    if not _spec_parts(spec):
+        raise mm.ValidationError({SWEEP_KEY: ['the sweep has no points']})
+    return d, spec
+
+
+def _spec_parts(spec):
+    if isinstance(spec, dict):
+        return [spec]
+    if isinstance(spec, list) and all(isinstance(s, dict) for s in spec):
+        return spec
+    raise mm.ValidationError(
+        {SWEEP_KEY: ['must be a dictionary or a list of dictionaries']})
+
+
+def sweep_paths(spec):
+    """get the dotted field paths varied by a sweep
+
+    Parameters
+    ----------
+    spec : dict or list
+        sweep specification
+
+    Returns
+    -------
+    list
+        sorted list of dotted paths
+    """
+    paths = set()
+    for part in _spec_parts(spec):
+        for kind in ('grid', 'zip'):
+            paths.update(part.get(kind, {}).keys())
+    return sorted(paths)
+
+
+def iter_sweep_points(spec):
+    """generate the points of a sweep
+
+    Parameters
+    ----------
+    spec : dict or list
+        sweep specification
+
+    Yields
+    ------
+    dict
+        values of one point, keyed by dotted path
+    """
+    for part in _spec_parts(spec):
+        grid = part.get('grid', {})
+        zipped = part.get('zip', {})
+        grid_paths = list(grid.keys())
+        zip_paths = list(zipped.keys())
+        zip_points = (zip(*[zipped[p] for p in zip_paths]) if zip_paths
+                      else [()])
+        for zip_values, grid_values in itertools.product(
+                zip_points, itertools.product(*[grid[p] for p in grid_paths])):
+            point = dict(zip(zip_paths, zip_values))
+            point.update(zip(grid_paths, grid_values))
+            yield point
+
+
+def count_sweep_points(spec):
+    """count the points of a sweep without generating them
+
+    Parameters
+    ----------
+    spec : dict or list
+        sweep specification
+
+    Returns
+    -------
+    int
+        number of points
+    """
+    count = 0
+    for part in _spec_parts(spec):
+        n = 1
+        for values in part.get('grid', {}).values():
+            n *= len(values)
+        zipped = list(part.get('zip', {}).values())
+        if zipped:
+            n *= len(zipped[0])
+        count += n
+    return count
+
+
+def _top_level_fields(schema, spec):
+    # map the top level data keys of the sweep paths to field names
+    names = {field.data_key or name: name
+             for name, field in schema.fields.items()}
+    fields = set()
+    for path in sweep_paths(spec):
+        key = path.split('.')[0]
+        if key not in names:
+            raise mm.ValidationError(
+                {SWEEP_KEY: ['{} is not a field'.format(path)]})
+        fields.add(names[key])
+    return sorted(fields)
+
+
+def has_schema_validators(schema):
+    """check whether a schema has schema level validators or load hooks,
+    which need all of the fields at once (so the input cannot be validated
+    in parts), see :func:`utils.has_schema_hooks`
+
+    Parameters
+    ----------
+    schema : marshmallow.Schema
+        schema to check
+
+    Returns
+    -------
+    bool
+        whether the schema has @validates_schema, @pre_load or @post_load
+        methods
+    """
+    return utils.has_schema_hooks(schema)
+
+
+class Sweep(object):
+    """a sweep over an input, which validates the non-varying part of the
+    input once and each point of the sweep on demand
+
+    If the schema has schema level validators or load hooks, every point is
+    validated as a whole instead.
+
+    Parameters
+    ----------
+    schema : marshmallow.Schema
+        schema of the input
+    d : dict
+        input without the sweep key
+    spec : dict or list
+        sweep specification
+    loader : callable
+        function loader(schema, d) returning the validated dictionary
+    """
+
+    def __init__(self, schema, d, spec, loader):
+        self.schema = schema
+        self.spec = spec
+        self.loader = loader
+        self.paths = sweep_paths(spec)
+        self.shared = not has_schema_validators(schema)
+        varying = _top_level_fields(schema, spec)
+        keys = set(schema.fields[name].data_key or name for name in varying)
+        self._input = d
+        self._varying_input = {k: v for k, v in d.items() if k in keys}
+        if self.shared:
+            self.base_schema = type(schema)(exclude=varying,
+                                            unknown=schema.unknown)
+            self.point_schema = type(schema)(only=varying,
+                                             unknown=schema.unknown)
+            self.base = loader(self.base_schema, {
+                k: v for k, v in d.items() if k not in keys})
+        else:
+            self.base_schema = self.point_schema = schema
+            self.base = None
+
+    def __len__(self):
+        return count_sweep_points(self.spec)
+
+    def point_input(self, point):
+        """get the (unvalidated) input of one point of the sweep
+
+        Parameters
+        ----------
+        point : dict
+            values of the point keyed by dotted path
+
+        Returns
+        -------
+        dict
+            input of this point (only the varying fields if the non-varying
+            part is validated separately)
+        """
+        d = copy.deepcopy(self._varying_input)
+        if not self.shared:
+            d = dict(self._input, **d)
+        for path, value in point.items():
+            keys = path.split('.')
+            root = d
+            for key in keys[:-1]:
+                if not isinstance(root.get(key), dict):
+                    root[key] = {}
+                root = root[key]
+            root[keys[-1]] = value
+        return d
+
+    def load_point(self, point):
+        """validate one point of the sweep
+
+        Parameters
+        ----------
+        point : dict
+            values of the point keyed by dotted path
+
+        Returns
+        -------
+        dict
+            validated arguments of this point
+        """
+        result = self.loader(self.point_schema, self.point_input(point))
+        if self.shared:
+            merged = dict(self.base)
+            merged.update(result)
+            result = merged
+        return result
+
+    def __iter__(self):
+        for point in iter_sweep_points(self.spec):
+            yield self.load_point(point)
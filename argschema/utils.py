@@ -1,22 +1,115 @@
 '''module that contains argschema functions for converting
 marshmallow schemas to argparse and merging dictionaries from both systems
 '''
+import os
+import sys
 import logging
 import warnings
 import ast
 import argparse
+import importlib
 from operator import add
 import json
+import numpy as np
 import marshmallow as mm
 from argschema import fields
+from argschema import formats
+from argschema import schemas
 import collections
+import collections.abc
+
+# prefix of command line values read from a file, e.g. --points @points.npy
+FILE_VALUE_PREFIX = '@'
+
+
+def _read_file_value(value):
+    try:
+        return formats.read_value(value[len(FILE_VALUE_PREFIX):])
+    except (OSError, ValueError) as e:
+        # cast_args_dict reports ValueErrors as casting errors
+        raise ValueError('cannot read {}: {}'.format(value, e))
+
+
+def cast_literal(value):
+    """cast a command line value of a list or array field given as a single
+    argument: @path reads the value from a file (see
+    :func:`formats.read_value`), otherwise the value is parsed as JSON, or
+    if it is not JSON as a python literal
+
+    Parameters
+    ----------
+    value : str
+        command line value
+
+    Returns
+    -------
+    object
+        cast value (numpy.ndarray for .npy and text files)
+    """
+    if value.startswith(FILE_VALUE_PREFIX):
+        return _read_file_value(value)
+    try:
+        return json.loads(value)
+    except ValueError:
+        return ast.literal_eval(value)
+
+
+def cast_list_literal(value):
+    """cast a command line value of a list field given as a single argument,
+    as :func:`cast_literal` but returning arrays read from files as lists
+
+    Parameters
+    ----------
+    value : str
+        command line value
+
+    Returns
+    -------
+    object
+        cast value
+    """
+    value = cast_literal(value)
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    return value
+
+
+def cast_list_arguments(values):
+    """cast the command line values of a list field given as several
+    arguments (the deprecated nargs='*' style), where a single @path
+    argument reads the list from a file.  Lists of strings keep @path
+    arguments as they are (see :func:`get_type_from_field`).
+
+    Parameters
+    ----------
+    values : list of str
+        command line values
+
+    Returns
+    -------
+    list
+        cast values
+    """
+    if len(values) == 1 and values[0].startswith(FILE_VALUE_PREFIX):
+        value = _read_file_value(values[0])
+        return value.tolist() if isinstance(value, np.ndarray) else value
+    return list(values)
+
 
 # explicit type mappings for field types that need them (default str)
 FIELD_TYPE_MAP = {fields.Boolean: ast.literal_eval,
-                  fields.List: ast.literal_eval,
-                  fields.NumpyArray: ast.literal_eval
+                  fields.List: cast_list_literal,
+                  mm.fields.List: cast_list_literal,
+                  fields.NumpyArray: cast_literal
                   }
 
+# separator of nested keys in the names of environment variables
+ENV_SEPARATOR = '__'
+
+# environment variable enabling the validation profiler in load
+# (see :mod:`argschema.profiling`)
+PROFILE_ENV = 'ARGSCHEMA_PROFILE'
+
 
 def prune_dict_with_none(d):
     """function to remove all dictionaries from a nested dictionary
@@ -55,9 +148,12 @@ def get_type_from_field(field):
     callable
         Function to call to cast argument to
     """
-    if (isinstance(field, fields.List) and
+    if (isinstance(field, mm.fields.List) and
             not field.metadata.get("cli_as_single_argument", False)):
-        return list
+        # a single @path string is a valid element of a list of strings
+        if isinstance(field.inner, mm.fields.String):
+            return list
+        return cast_list_arguments
     else:
         return FIELD_TYPE_MAP.get(type(field), str)
 
@@ -88,6 +184,155 @@ def cli_error_dict(arg_path, field_type, index=0):
         return {arg_path[index]: cli_error_dict(arg_path, field_type, index + 1)}
 
 
+def get_cast_table(schema, dests):
+    """build a table describing how to cast each argparse destination
+    into its place in a nested dictionary
+
+    Parameters
+    ----------
+    schema : marshmallow.Schema
+        Optional schema which will be used to find casts via `FIELD_TYPE_MAP`
+    dests : iterable of str
+        argparse destinations, where nesting of keys is denoted with '.'
+
+    Returns
+    -------
+    dict
+        dictionary keyed by destination with values of
+        (list of nested keys, casting function, name of field type)
+    """
+    table = {}
+    for dest in dests:
+        current_schema = schema
+        field_def = None
+        parts = dest.split('.')
+        for part in parts:
+            if current_schema is not None:
+                # fields left out by only or exclude have no casts
+                field_def = current_schema.fields.get(part)
+                if isinstance(field_def, fields.Nested):
+                    current_schema = field_def.schema
+        table[dest] = (parts,
+                       get_type_from_field(field_def),
+                       field_def.__class__.__name__)
+    return table
+
+
+def cast_args_dict(argsdict, cast_table):
+    """function to cast a flat dictionary of argparse values into a nested dictionary
+
+    Parameters
+    ----------
+    argsdict : dict
+        dictionary of values keyed by argparse destination
+    cast_table : dict
+        table of casts as returned by :func:`get_cast_table`
+
+    Returns
+    -------
+    dict
+        dictionary of cast values where nesting elements uses '.' to denote nesting of keys
+
+    Raises
+    ------
+    marshmallow.ValidationError
+        if any of the values cannot be cast to their field type
+    """
+    d = {}
+    errors = {}
+    for field, value in argsdict.items():
+        parts, cast, typename = cast_table[field]
+        root = d
+        for part in parts[:-1]:
+            root = root.setdefault(part, {})
+        if value is not None:
+            try:
+                value = cast(value)
+            except ValueError:
+                errors.update(cli_error_dict(parts, typename))
+        root[parts[-1]] = value
+    if errors:
+        raise mm.ValidationError(json.dumps(errors, indent=2))
+    return prune_dict_with_none(d)
+
+
+def env_cast_table(cast_table, prefix):
+    """build a table mapping environment variable names to the casts of a
+    command line cast table.  The variable for the argument --a.b.c is
+    PREFIX__a__b__c, and lists are always given as a single literal
+
+    Parameters
+    ----------
+    cast_table : dict
+        table of casts as returned by :func:`get_cast_table`
+    prefix : str
+        prefix of the environment variables
+
+    Returns
+    -------
+    dict
+        dictionary keyed by environment variable name with values of
+        (argparse destination, casting function)
+    """
+    table = {}
+    for dest, (parts, cast, typename) in cast_table.items():
+        if cast is list or cast is cast_list_arguments:
+            cast = cast_list_literal
+        table[prefix + ENV_SEPARATOR + ENV_SEPARATOR.join(parts)] = (dest, cast)
+    return table
+
+
+def environ_to_dict(environ, prefix, env_table, cast_table,
+                    case_sensitive=None):
+    """convert the environment variables starting with a prefix into a nested
+    dictionary of cast values, warning about variables that do not match a field
+
+    Parameters
+    ----------
+    environ : Mapping
+        environment variables, e.g. os.environ
+    prefix : str
+        prefix of the environment variables
+    env_table : dict
+        table as returned by :func:`env_cast_table`
+    cast_table : dict
+        table of casts as returned by :func:`get_cast_table`
+    case_sensitive : bool or None
+        whether variable names are case sensitive, if None they are except on
+        windows, where os.environ upper-cases them (Default value = None)
+
+    Returns
+    -------
+    dict
+        nested dictionary of values
+
+    Raises
+    ------
+    marshmallow.ValidationError
+        if any of the values cannot be cast to their field type
+    """
+    if case_sensitive is None:
+        case_sensitive = sys.platform != "win32"
+    start = prefix + ENV_SEPARATOR
+    if not case_sensitive:
+        start = start.upper()
+        env_table = {k.upper(): v for k, v in env_table.items()}
+    argsdict = {}
+    table = {}
+    for name, value in environ.items():
+        key = name if case_sensitive else name.upper()
+        if not key.startswith(start):
+            continue
+        if key not in env_table:
+            logging.warning("environment variable {} does not match any "
+                            "field, ignoring it".format(name))
+            continue
+        dest, cast = env_table[key]
+        argsdict[dest] = value
+        table[dest] = (cast_table[dest][0], cast, cast_table[dest][2])
+    return cast_args_dict(argsdict, table)
+
+
 def args_to_dict(argsobj, schema=None):
     """function to convert namespace returned by argsparse into a nested dictionary
 
@@ -105,38 +350,8 @@ def args_to_dict(argsobj, schema=None):
         dictionary of namespace values where nesting elements uses '.' to denote nesting of keys
 
     """
-    d = {}
     argsdict = vars(argsobj)
-    errors = {}
-    field_def = None
-    for field in argsdict.keys():
-        current_schema = schema
-        parts = field.split('.')
-        root = d
-        for i in range(len(parts)):
-            if current_schema is not None:
-                if current_schema.only and parts[i] not in current_schema.only:
-                    field_def = None
-                else:
-                    field_def = current_schema.fields[parts[i]]
-                if isinstance(field_def, fields.Nested):
-                    current_schema = field_def.schema
-            if i == (len(parts) - 1):
-                value = argsdict.get(field)
-                if value is not None:
-                    try:
-                        value = get_type_from_field(field_def)(value)
-                    except ValueError:
-                        typename = field_def.__class__.__name__
-                        errors.update(cli_error_dict(parts, typename))
-                root[parts[i]] = value
-            else:
-                if parts[i] not in root.keys():
-                    root[parts[i]] = {}
-                root = root[parts[i]]
-    if errors:
-        raise mm.ValidationError(json.dumps(errors, indent=2))
-    return prune_dict_with_none(d)
+    return cast_args_dict(argsdict, get_cast_table(schema, argsdict.keys()))
 
 
 def merge_value(a, b, key, func=add):
@@ -170,6 +385,14 @@ def merge_value(a, b, key, func=add):
                         (key, a[key], b[key], type(a[key]), type(b[key])))
 
 
+def _leaf_equal(x, y):
+    try:
+        return bool(x == y)
+    except ValueError:
+        # e.g. numpy arrays, whose comparison is elementwise
+        return False
+
+
 def smart_merge(a, b, path=None, merge_keys=None, overwrite_with_none=False):
     """updates dictionary a with values in dictionary b
     being careful not to write things with None, and performing a merge on merge_keys
@@ -206,12 +429,13 @@ def smart_merge(a, b, path=None, merge_keys=None, overwrite_with_none=False):
         if key in a:
             if isinstance(a[key], dict) and isinstance(b[key], dict):
                 # recursively merge these leafs
-                smart_merge(a[key], b[key], path + [str(key)], merge_keys)
-            elif a[key] == b[key]:
-                pass  # same leaf value, so don't bother
+                smart_merge(a[key], b[key], path + [str(key)], merge_keys,
+                            overwrite_with_none)
             elif b[key] is None:
                 if overwrite_with_none:
                     a[key] = b[key]
+            elif _leaf_equal(a[key], b[key]):
+                pass  # same leaf value, so don't bother
             else:
                 # in this case we are potentially overwriting a's value with b's
                 # determine if we should try to merge
@@ -227,13 +451,192 @@ def smart_merge(a, b, path=None, merge_keys=None, overwrite_with_none=False):
             else:
                 if isinstance(b[key], dict):
                     a[key] = {}
-                    smart_merge(a[key], b[key], path + [str(key)], merge_keys)
+                    smart_merge(a[key], b[key], path + [str(key)],
+                                merge_keys, overwrite_with_none)
                 else:
                     # otherwise replace entire leaf with b
                     a[key] = b[key]
     return a
 
 
+def get_path(d, keys):
+    """get the value at a path of keys in a nested dictionary
+
+    Parameters
+    ----------
+    d : dict
+        nested dictionary
+    keys : list
+        keys leading to the value
+
+    Returns
+    -------
+    object
+        the value
+    """
+    for key in keys:
+        d = d[key]
+    return d
+
+
+def replace_path(d, keys, value):
+    """replace the value at a path of keys in a nested dictionary, copying
+    the dictionaries along the path so that d is not modified
+
+    Parameters
+    ----------
+    d : dict
+        nested dictionary
+    keys : list
+        keys leading to the value (non-empty)
+    value : object
+        new value
+
+    Returns
+    -------
+    dict
+        copy of d with the value replaced
+    """
+    d = dict(d)
+    if len(keys) == 1:
+        d[keys[0]] = value
+    else:
+        d[keys[0]] = replace_path(d[keys[0]], keys[1:], value)
+    return d
+
+
+def pop_errors(errors, keys):
+    """remove the errors at a path of a (nested) error dictionary, removing
+    the dictionaries left empty along the path
+
+    Parameters
+    ----------
+    errors : dict
+        error messages, as in marshmallow.ValidationError.messages
+    keys : list
+        keys leading to the errors (non-empty)
+
+    Returns
+    -------
+    dict, list or None
+        the errors removed, or None if there were none
+    """
+    if not isinstance(errors, dict) or keys[0] not in errors:
+        return None
+    if len(keys) == 1:
+        return errors.pop(keys[0])
+    popped = pop_errors(errors[keys[0]], keys[1:])
+    if errors[keys[0]] == {}:
+        errors.pop(keys[0])
+    return popped
+
+
+def set_errors(errors, keys, messages):
+    """set the errors at a path of a (nested) error dictionary, merging them
+    with the errors already there if both are dictionaries
+
+    Parameters
+    ----------
+    errors : dict
+        error messages, as in marshmallow.ValidationError.messages
+    keys : list
+        keys leading to the errors (non-empty)
+    messages : dict or list
+        errors to set
+    """
+    for key in keys[:-1]:
+        errors = errors.setdefault(key, {})
+    if isinstance(errors.get(keys[-1]), dict) and isinstance(messages, dict):
+        errors[keys[-1]].update(messages)
+    else:
+        errors[keys[-1]] = messages
+
+
+def has_schema_hooks(schema):
+    """check whether a schema has schema level hooks (@pre_load, @post_load
+    or @validates_schema methods, other than the defaults of
+    :class:`~argschema.schemas.DefaultSchema`), which need all of the fields
+    at once, so that its input cannot be loaded in parts
+
+    Parameters
+    ----------
+    schema : marshmallow.Schema
+        schema to check
+
+    Returns
+    -------
+    bool
+        whether the schema has schema level hooks
+    """
+    for tag in (mm.decorators.PRE_LOAD, mm.decorators.POST_LOAD,
+                mm.decorators.VALIDATES_SCHEMA):
+        for hook in schema._hooks.get(tag, ()):
+            # DefaultSchema.make_object only fills in the defaults of the
+            # fields of the schema, so it works field by field
+            method = getattr(type(schema), hook[0])
+            if method is not schemas.DefaultSchema.make_object:
+                return True
+    return False
+
+
+def iter_field_values(schema, d, path=None, loaded=False):
+    """generator over the values in a dictionary which correspond to fields
+    of a schema, descending into Nested schemas (including many=True)
+    and the elements of List fields
+
+    Parameters
+    ----------
+    schema : marshmallow.Schema
+        schema describing the dictionary
+    d : dict
+        dictionary of (not yet deserialized) values
+    path : list or None
+        list of keys and indices traversed so far (used for recursion) (Default value = None)
+    loaded : bool
+        whether d has already been deserialized, and so is keyed by attribute
+        rather than by data_key (Default value = False)
+
+    Yields
+    ------
+    tuple
+        (path, field, value) for every value that is not itself a dictionary
+        of a Nested schema or a List
+    """
+    path = [] if path is None else path
+    if not isinstance(d, collections.abc.Mapping):
+        return
+    for name, field in schema.fields.items():
+        if loaded:
+            key = field.attribute or name
+        else:
+            key = field.data_key or name
+        if key not in d:
+            continue
+        value = d[key]
+        for item in _iter_field_value(field, value, path + [key], loaded):
+            yield item
+
+
+def _iter_field_value(field, value, path, loaded):
+    if isinstance(field, mm.fields.Nested):
+        if field.many and isinstance(value, (list, tuple)):
+            for i, v in enumerate(value):
+                for item in iter_field_values(field.schema, v, path + [i],
+                                              loaded):
+                    yield item
+        else:
+            for item in iter_field_values(field.schema, value, path, loaded):
+                yield item
+    elif (isinstance(field, mm.fields.List) and
+            not isinstance(field, fields.NumpyArray) and
+            isinstance(value, (list, tuple))):
+        for i, v in enumerate(value):
+            for item in _iter_field_value(field.inner, v, path + [i], loaded):
+                yield item
+    else:
+        yield (path, field, value)
+
+
 def get_description_from_field(field):
     """get the description for this marshmallow field
 
@@ -383,6 +786,23 @@ def schema_argparser(schema):
     # make the root schema appeear first rather than last
     arguments = [arguments[-1]] + arguments[0:-1]
 
+    return arguments_argparser(arguments)
+
+
+def arguments_argparser(arguments):
+    """build an argparse.ArgumentParser from a list of argument groups
+
+    Parameters
+    ----------
+    arguments : list
+        List of argument group dictionaries as returned by
+        :func:`build_schema_arguments`
+
+    Returns
+    -------
+    argparse.ArgumentParser
+        parser with one argument group per entry of arguments
+    """
     parser = argparse.ArgumentParser()
 
     for arg_group in arguments:
@@ -393,7 +813,7 @@ def schema_argparser(schema):
     return parser
 
 
-def load(schema, d):
+def load(schema, d, max_errors=None, summarize=False, profiler=None):
     """ function to wrap marshmallow load to smooth
         differences from marshmallow 2 to 3
 
@@ -403,6 +823,16 @@ def load(schema, d):
         schema that you want to use to validate
     d: dict
         dictionary to validate and load
+    max_errors: int or None
+        stop validating after this many errors (1 to fail on the first
+        error), None to collect all of them (see :mod:`argschema.errors`)
+    summarize: bool
+        report errors summarized by field path, with counts
+        (see :func:`argschema.errors.summarize_errors`)
+    profiler: argschema.profiling.Profiler or None
+        profiler accumulating the cost of each field, if None profile (and
+        report) only if the ARGSCHEMA_PROFILE environment variable is set
+        (see :mod:`argschema.profiling`)
 
     Returns
     -------
@@ -414,10 +844,38 @@ def load(schema, d):
     marshmallow.ValidationError
         if the dictionary does not conform to the schema
     """
-
-    results = schema.load(d)
-
-    return results
+    if profiler is None and os.environ.get(PROFILE_ENV, '0') not in ('', '0'):
+        from . import profiling
+        if profiling.active_profiler() is not None:
+            # nested in a load that is already profiled
+            return _load(schema, d, max_errors, summarize)
+        options = profiling.env_options()
+        profiler = profiling.Profiler(memory=options['memory'])
+        try:
+            with profiler:
+                return _load(schema, d, max_errors, summarize)
+        finally:
+            profiling.write_report(profiler, options['format'],
+                                   options['path'])
+    if profiler is not None:
+        with profiler:
+            return _load(schema, d, max_errors, summarize)
+    return _load(schema, d, max_errors, summarize)
+
+
+def _load(schema, d, max_errors, summarize):
+    if max_errors is None and not summarize:
+        return schema.load(d)
+
+    from . import errors
+    try:
+        if max_errors is None:
+            return schema.load(d)
+        return errors.budgeted_load(schema, d, max_errors)
+    except mm.ValidationError as e:
+        if not summarize:
+            raise
+        raise mm.ValidationError(errors.summarize_errors(e.messages))
 
 
 def dump(schema, d):
@@ -445,3 +903,26 @@ def dump(schema, d):
         raise mm.ValidationError(errors)
 
     return schema.dump(d)
+
+
+def import_object(path):
+    """import an object given its "module:name" (or "module.name") path
+
+    Parameters
+    ----------
+    path : str
+        path to the object
+
+    Returns
+    -------
+    object
+        the imported object
+    """
+    if ':' in path:
+        module_name, name = path.split(':', 1)
+    else:
+        module_name, name = path.rsplit('.', 1)
+    obj = importlib.import_module(module_name)
+    for part in name.split('.'):
+        obj = getattr(obj, part)
+    return obj
@@ -0,0 +1,84 @@
+import json
+import pytest
+import numpy as np
+import marshmallow as mm
+from argschema import ArgSchemaParser, ArgSchema
+from argschema.fields import ColumnarNested, Int, Float, Str, Boolean, List
+from argschema.schemas import DefaultSchema
+
+
+class PointSchema(DefaultSchema):
+    x = Float(required=True)
+    y = Float(required=True)
+    label = Str(default='none')
+    count = Int(default=0)
+    valid = Boolean(default=True)
+    tags = List(Str, default=[])
+
+
+class ColumnarSchema(ArgSchema):
+    points = ColumnarNested(PointSchema, required=True, chunksize=3)
+    records = ColumnarNested(PointSchema, structured=True, chunksize=3)
+
+
+class ColumnarOutputSchema(DefaultSchema):
+    points = ColumnarNested(PointSchema, required=True)
+
+
+def make_points(n):
+    return [{'x': i, 'y': 2.0 * i, 'label': 'p{}'.format(i)}
+            for i in range(n)]
+
+
+def test_columnar_load():
+    mod = ArgSchemaParser(input_data={'points': make_points(7),
+                                      'records': make_points(5)},
+                          schema_type=ColumnarSchema, args=[])
+    points = mod.args['points']
+    assert set(points.keys()) == {'x', 'y', 'label', 'count', 'valid', 'tags'}
+    assert points['x'].dtype == np.float64
+    assert points['count'].dtype == np.int64
+    assert points['valid'].dtype == np.bool_
+    assert points['label'].dtype.kind == 'U'
+    assert points['tags'].dtype == object
+    assert points['y'].tolist() == [2.0 * i for i in range(7)]
+    assert points['label'][6] == 'p6'
+
+    records = mod.args['records']
+    assert records.shape == (5,)
+    assert records['x'].tolist() == [0.0, 1.0, 2.0, 3.0, 4.0]
+    assert records[4]['label'] == 'p4'
+
+
+def test_columnar_empty():
+    mod = ArgSchemaParser(input_data={'points': []},
+                          schema_type=ColumnarSchema, args=[])
+    assert len(mod.args['points']['x']) == 0
+    assert mod.args['points']['x'].dtype == np.float64
+
+
+def test_columnar_errors():
+    points = make_points(8)
+    points[1]['x'] = 'bad'
+    points[7]['count'] = 'bad'
+    with pytest.raises(mm.ValidationError) as e:
+        ArgSchemaParser(input_data={'points': points},
+                        schema_type=ColumnarSchema, args=[])
+    assert sorted(e.value.messages['points'].keys()) == [1, 7]
+
+
+def test_columnar_output(tmpdir):
+    file_out = str(tmpdir.join('output.json'))
+    mod = ArgSchemaParser(input_data={'points': make_points(4),
+                                      'records': make_points(4),
+                                      'output_json': file_out},
+                          schema_type=ColumnarSchema,
+                          output_schema_type=ColumnarOutputSchema, args=[])
+    mod.output({'points': mod.args['points']})
+    with open(file_out) as fp:
+        output = json.load(fp)
+    assert output['points'][3] == {'x': 3.0, 'y': 6.0, 'label': 'p3',
+                                   'count': 0, 'valid': True, 'tags': []}
+    mod.output({'points': mod.args['records']})
+    with open(file_out) as fp:
+        assert json.load(fp) == output
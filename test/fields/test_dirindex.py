@@ -0,0 +1,88 @@
+import os
+import pickle
+import pytest
+import marshmallow as mm
+from argschema import ArgSchemaParser, ArgSchema, fields, filesystems
+from argschema.fields import dirindex
+
+
+@pytest.fixture
+def tree(tmpdir):
+    dirindex.clear_index_cache()
+    for path in ['a.tif', 'b.TXT', 'sub/c.tif', 'sub/deeper/d.png', 'other/e.tif']:
+        f = tmpdir.join(path)
+        f.dirpath().ensure(dir=True)
+        f.write('x' * len(path))
+    return tmpdir
+
+
+def test_walk_directory(tree):
+    index = dirindex.walk_directory(str(tree), max_workers=3)
+    assert list(index.files) == sorted([
+        'a.tif', 'b.TXT', os.path.join('sub', 'c.tif'),
+        os.path.join('sub', 'deeper', 'd.png'), os.path.join('other', 'e.tif')])
+    assert index.files['a.tif'].size == len('a.tif')
+    assert set(index.directories) == {
+        '', 'sub', 'other', os.path.join('sub', 'deeper')}
+    index = dirindex.walk_directory(str(tree), extensions=['tif', '.TXT'],
+                                    recursive=False)
+    assert list(index.files) == ['a.tif', 'b.TXT']
+    assert index.paths() == [str(tree.join('a.tif')), str(tree.join('b.TXT'))]
+
+
+def test_directory_index_cache(tree, monkeypatch):
+    calls = []
+    walk = dirindex.walk_directory
+
+    def counting(*args):
+        calls.append(args)
+        return walk(*args)
+    monkeypatch.setattr(dirindex, 'walk_directory', counting)
+    first = dirindex.directory_index(str(tree))
+    assert dirindex.directory_index(str(tree)).files is first.files
+    assert len(calls) == 1
+    tree.join('sub', 'deeper', 'new.png').write('x')
+    os.utime(str(tree.join('sub', 'deeper')), ns=(0, 10 ** 9))
+    assert os.path.join('sub', 'deeper', 'new.png') in dirindex.directory_index(
+        str(tree)).files
+    assert len(calls) == 2
+
+
+def test_directory_index_pickle(tree):
+    index = dirindex.directory_index(str(tree))
+    loaded = pickle.loads(pickle.dumps(index))
+    assert loaded == str(tree)
+    assert loaded.files == index.files
+
+
+class IndexSchema(ArgSchema):
+    plain = fields.InputDir(required=False)
+    indexed = fields.InputDir(index=True, extensions=['.tif'])
+
+
+def test_inputdir_index(tree):
+    mod = ArgSchemaParser(schema_type=IndexSchema, args=[], input_data={
+        'plain': str(tree), 'indexed': str(tree)})
+    assert type(mod.args['plain']) is str
+    assert isinstance(mod.args['indexed'], dirindex.DirectoryIndex)
+    assert mod.args['indexed'] == str(tree)
+    assert len(mod.args['indexed'].files) == 3
+    with pytest.raises(mm.ValidationError):
+        ArgSchemaParser(schema_type=IndexSchema, args=[], input_data={
+            'indexed': str(tree.join('nope'))})
+
+
+def test_index_through_filesystem_adapter():
+    dirindex.clear_index_cache()
+    fs = filesystems.MemoryFileSystem(
+        files=['/data/a.tif', '/data/sub/b.tif', '/data/sub/deeper/c.png'])
+    with filesystems.use_filesystem(fs):
+        # the pool threads list with the adapter of the calling thread
+        index = dirindex.directory_index('/data', max_workers=2)
+        assert sorted(index.files) == [
+            'a.tif', os.path.join('sub', 'b.tif'),
+            os.path.join('sub', 'deeper', 'c.png')]
+        fs.files.add('/data/sub/new.tif')
+        # without modification times the index is never reused
+        assert os.path.join('sub', 'new.tif') in dirindex.directory_index(
+            '/data', max_workers=2).files
@@ -0,0 +1,103 @@
+import os
+import glob
+import pytest
+import marshmallow as mm
+from argschema import ArgSchemaParser, ArgSchema, fields, filesystems
+from argschema.fields import globs
+
+
+@pytest.fixture
+def tree(tmpdir):
+    globs.clear_listing_cache()
+    for path in ['a/1.tif', 'a/2.tif', 'a/notes.txt', 'a/.hidden.tif',
+                 'b/3.tif', 'b/sub/4.tif', 'c.tif']:
+        f = tmpdir.join(path)
+        f.dirpath().ensure(dir=True)
+        f.write('x')
+    return tmpdir
+
+
+@pytest.mark.parametrize('pattern', [
+    '*/*.tif', '**/*.tif', 'a/*', 'a/[12].tif', '*.tif', 'b/**', 'a/?.tif',
+    'nope/*.tif', 'a/1.tif'])
+def test_glob_files_matches_glob(tree, pattern):
+    pattern = os.path.join(str(tree), pattern)
+    expected = sorted(p for p in glob.glob(pattern, recursive=True)
+                      if os.path.isfile(p))
+    assert globs.glob_files(pattern)[0] == expected
+
+
+def test_glob_relative(tree):
+    with tree.as_cwd():
+        assert globs.glob_files('a/*.tif')[0] == [
+            os.path.join('a', '1.tif'), os.path.join('a', '2.tif')]
+        assert globs.glob_files('*.tif')[0] == ['c.tif']
+
+
+def test_listing_cache(tree, monkeypatch):
+    calls = []
+    scandir = os.scandir
+
+    def counting(path):
+        calls.append(path)
+        return scandir(path)
+    monkeypatch.setattr(os, 'scandir', counting)
+    pattern = os.path.join(str(tree), 'a', '*.tif')
+    globs.glob_files(pattern)
+    globs.glob_files(pattern)
+    assert len(calls) == 1
+    tree.join('a', '5.tif').write('x')
+    os.utime(str(tree.join('a')), ns=(0, 10 ** 9))
+    assert len(globs.glob_files(pattern)[0]) == 3
+    assert len(calls) == 2
+
+
+class GlobSchema(ArgSchema):
+    images = fields.InputGlob(max_matches=3)
+    tifs = fields.InputGlob(pattern='*.tif', min_matches=2, required=False)
+
+
+def test_input_glob_field(tree):
+    a = str(tree.join('a'))
+    mod = ArgSchemaParser(schema_type=GlobSchema, args=[], input_data={
+        'images': os.path.join(a, '*.tif'), 'tifs': [a, str(tree.join('b'))]})
+    assert mod.args['images'] == [os.path.join(a, '1.tif'),
+                                  os.path.join(a, '2.tif')]
+    assert len(mod.args['tifs']) == 3
+
+    with pytest.raises(mm.ValidationError):
+        ArgSchemaParser(schema_type=GlobSchema, args=[], input_data={
+            'images': os.path.join(str(tree), 'nope', '*')})
+    with pytest.raises(mm.ValidationError):
+        ArgSchemaParser(schema_type=GlobSchema, args=[], input_data={
+            'images': os.path.join(str(tree), '**', '*')})
+    with pytest.raises(mm.ValidationError):
+        ArgSchemaParser(schema_type=GlobSchema, args=[], input_data={
+            'images': os.path.join(a, '*'), 'tifs': str(tree.join('b', 'sub'))})
+    with pytest.raises(mm.ValidationError):
+        ArgSchemaParser(schema_type=GlobSchema, args=[], input_data={
+            'images': 5})
+
+
+def test_input_glob_command_line(tree):
+    a = str(tree.join('a'))
+    mod = ArgSchemaParser(schema_type=GlobSchema, args=[
+        '--images', os.path.join(a, '*.txt')])
+    assert mod.args['images'] == [os.path.join(a, 'notes.txt')]
+
+
+def test_glob_through_filesystem_adapter():
+    fs = filesystems.MemoryFileSystem(
+        files=['/data/a/1.tif', '/data/a/2.tif', '/data/b/3.tif'],
+        unreadable=['/data/a/2.tif'])
+    with filesystems.use_filesystem(fs):
+        assert globs.glob_files('/data/*/*.tif')[0] == [
+            '/data/a/1.tif', '/data/a/2.tif', '/data/b/3.tif']
+        assert globs.unreadable_files(['/data/a/1.tif', '/data/a/2.tif']) == [
+            '/data/a/2.tif']
+        with pytest.raises(mm.ValidationError):
+            ArgSchemaParser(schema_type=GlobSchema, args=[], input_data={
+                'images': '/data/a/*.tif'})
+        mod = ArgSchemaParser(schema_type=GlobSchema, args=[], input_data={
+            'images': '/data/b/*.tif'})
+    assert mod.args['images'] == ['/data/b/3.tif']
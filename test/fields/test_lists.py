@@ -0,0 +1,80 @@
+import pytest
+import numpy as np
+import marshmallow as mm
+from argschema import ArgSchemaParser, ArgSchema, utils
+from argschema.fields import List, Float, Int, Str
+
+
+class ListSchema(ArgSchema):
+    floats = List(Float(validate=mm.validate.Range(min=0, max=1)))
+    ints = List(Int(validate=mm.validate.Range(min=0, min_inclusive=False)),
+                as_array=True)
+    strs = List(Str())
+
+
+def expected_errors(field, value):
+    # the errors of marshmallow's element by element loading
+    with pytest.raises(mm.ValidationError) as e:
+        mm.fields.List(field.inner).deserialize(value)
+    return e.value.messages
+
+
+def test_vectorized_list(monkeypatch):
+    floats = [i / 1000.0 for i in range(1000)]
+    ints = list(range(1, 1001))
+
+    def fail(*args, **kwargs):
+        raise AssertionError('loaded element by element')
+    monkeypatch.setattr(mm.fields.List, '_deserialize', fail)
+    mod = ArgSchemaParser(schema_type=ListSchema, args=[], input_data={
+        'floats': floats, 'ints': ints})
+    assert mod.args['floats'] == floats
+    assert type(mod.args['floats']) is list
+    assert type(mod.args['floats'][0]) is float
+    assert isinstance(mod.args['ints'], np.ndarray)
+    assert mod.args['ints'].dtype == np.int64
+    np.testing.assert_array_equal(mod.args['ints'], ints)
+    monkeypatch.undo()
+    assert utils.dump(ListSchema(), mod.args)['ints'] == ints
+
+
+@pytest.mark.parametrize('floats', [
+    [0.5] * 100 + [1.5],
+    [0.5] * 100 + ['0.25'],
+    [0.5] * 100 + [True],
+    [0.5] * 100 + [float('nan')],
+    [1] * 100,
+])
+def test_fallback(floats):
+    schema = ListSchema()
+    field = schema.fields['floats']
+    try:
+        expected = mm.fields.List(field.inner).deserialize(floats)
+    except mm.ValidationError:
+        with pytest.raises(mm.ValidationError) as e:
+            utils.load(schema, {'floats': floats})
+        assert e.value.messages == {'floats': expected_errors(field, floats)}
+    else:
+        assert utils.load(schema, {'floats': floats})['floats'] == expected
+
+
+def test_fallback_ints():
+    schema = ListSchema()
+    result = utils.load(schema, {'ints': [1.0, 2] + [3] * 100})
+    assert result['ints'].tolist() == [1, 2] + [3] * 100
+    with pytest.raises(mm.ValidationError) as e:
+        utils.load(schema, {'ints': [0] + [2 ** 70] * 100})
+    assert e.value.messages == {'ints': {0: [
+        'Must be greater than 0.']}}
+    assert not schema.fields['strs'].vectorizable
+
+
+def test_budgeted_vectorized_list():
+    class Budgeted(ArgSchemaParser):
+        default_schema = ListSchema
+        max_validation_errors = 1
+    mod = Budgeted(args=[], input_data={'ints': list(range(1, 2001))})
+    assert isinstance(mod.args['ints'], np.ndarray)
+    with pytest.raises(mm.ValidationError) as e:
+        Budgeted(args=[], input_data={'ints': [0] * 2000})
+    assert e.value.messages == {'ints': {0: ['Must be greater than 0.']}}
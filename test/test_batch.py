@@ -0,0 +1,113 @@
+import json
+import pytest
+import marshmallow as mm
+from argschema import fields, ArgSchema, ArgSchemaParser, batch
+from argschema.schemas import DefaultSchema
+
+
+class BatchSchema(ArgSchema):
+    a = fields.Int(required=True)
+    output_json = fields.OutputFile(required=False)
+
+
+class BatchOutputSchema(DefaultSchema):
+    doubled = fields.Int(required=True)
+
+
+class BatchParser(ArgSchemaParser):
+    default_schema = BatchSchema
+    default_output_schema = BatchOutputSchema
+
+
+def double(args):
+    if args['a'] < 0:
+        raise ValueError('negative')
+    return {'doubled': 2 * args['a']}
+
+
+@pytest.fixture
+def params(tmpdir):
+    path = tmpdir.join('params.jsonl')
+    path.write('\n'.join(json.dumps(p) for p in [
+        {'a': 1}, {'a': 'x'}, {'a': -1}, {'a': 4}]) + '\n\n')
+    return str(path)
+
+
+@pytest.mark.parametrize('max_workers', [0, 2])
+def test_run_batch_combined(params, tmpdir, max_workers):
+    output = str(tmpdir.join('out.jsonl'))
+    counts = batch.run_batch(BatchParser, __name__ + ':double', params,
+                             output_path=output, max_workers=max_workers,
+                             max_in_flight=2)
+    assert counts == {'succeeded': 2, 'failed': 2}
+    with open(output) as fp:
+        lines = [json.loads(line) for line in fp]
+    assert [line['index'] for line in lines] == [0, 1, 2, 3]
+    assert lines[0]['output'] == {'doubled': 2}
+    assert 'a' in lines[1]['errors']
+    assert 'negative' in lines[2]['errors']
+    assert lines[3]['output'] == {'doubled': 8}
+
+
+def test_run_batch_per_item(params, tmpdir):
+    pattern = str(tmpdir.join('out_{index}_{args[a]}.json'))
+    counts = batch.run_batch(BatchParser, double, params,
+                             output_pattern=pattern, max_workers=0)
+    assert counts == {'succeeded': 2, 'failed': 2}
+    with open(pattern.format(index=3, args={'a': 4})) as fp:
+        assert json.load(fp) == {'doubled': 8}
+
+
+def test_run_batch_output_json(tmpdir):
+    path = tmpdir.join('params.jsonl')
+    out = str(tmpdir.join('item.json'))
+    path.write(json.dumps({'a': 3, 'output_json': out}))
+    batch.run_batch(BatchParser, double, str(path), max_workers=0)
+    with open(out) as fp:
+        assert json.load(fp) == {'doubled': 6}
+
+
+class RawOutputSchema(DefaultSchema):
+    value = fields.Raw(required=True)
+
+
+class RawOutputParser(ArgSchemaParser):
+    default_schema = BatchSchema
+    default_output_schema = RawOutputSchema
+
+
+def unserializable(args):
+    return {'value': {1, 2} if args['a'] == 4 else args['a']}
+
+
+def test_run_batch_unserializable_output(params, tmpdir):
+    output = str(tmpdir.join('out.jsonl'))
+    counts = batch.run_batch(RawOutputParser, unserializable, params,
+                             output_path=output, max_workers=0)
+    assert counts == {'succeeded': 2, 'failed': 2}
+    with open(output) as fp:
+        lines = [json.loads(line) for line in fp]
+    assert [line['index'] for line in lines] == [0, 1, 2, 3]
+    assert 'not JSON serializable' in lines[3]['errors']
+
+
+class IndexSchema(ArgSchema):
+    index = fields.Int(required=True)
+
+
+class IndexParser(ArgSchemaParser):
+    default_schema = IndexSchema
+
+
+def double_index(args):
+    return {'doubled': 2 * args['index']}
+
+
+def test_run_batch_pattern_with_index_argument(tmpdir):
+    params = tmpdir.join('params.jsonl')
+    params.write(json.dumps({'index': 7}) + '\n')
+    pattern = str(tmpdir.join('out_{index}_{args[index]}.json'))
+    counts = batch.run_batch(IndexParser, double_index, str(params),
+                             output_pattern=pattern, max_workers=0)
+    assert counts == {'succeeded': 1, 'failed': 0}
+    assert tmpdir.join('out_0_7.json').check()
@@ -0,0 +1,110 @@
+import os
+import hashlib
+import pytest
+import marshmallow as mm
+from argschema import fields, ArgSchema, ArgSchemaParser, checksums
+from argschema.schemas import DefaultSchema
+
+
+@pytest.fixture
+def data_files(tmpdir):
+    checksums.clear_checksum_cache()
+    paths = []
+    for i, content in enumerate([b'', b'hello', os.urandom(3 * 1024 + 7)]):
+        path = tmpdir.join('data{}.bin'.format(i))
+        path.write_binary(content)
+        paths.append((str(path), content))
+    return paths
+
+
+def test_file_checksum(data_files):
+    for path, content in data_files:
+        for algorithm in ('md5', 'sha256'):
+            expected = hashlib.new(algorithm, content).hexdigest()
+            assert checksums.file_checksum(path, algorithm) == expected
+            assert checksums.file_checksum(
+                path, algorithm, chunk_size=1000) == expected
+
+
+def test_xxhash(data_files):
+    xxhash = pytest.importorskip('xxhash')
+    path, content = data_files[1]
+    assert (checksums.file_checksum(path, 'xxhash') ==
+            xxhash.xxh64(content).hexdigest())
+
+
+def test_cached_file_checksum(data_files, monkeypatch, tmpdir):
+    path, content = data_files[1]
+    calls = []
+    original = checksums.file_checksum
+
+    def counting(*args, **kwargs):
+        calls.append(args)
+        return original(*args, **kwargs)
+    monkeypatch.setattr(checksums, 'file_checksum', counting)
+    monkeypatch.setenv(checksums.CHECKSUM_CACHE_ENV, str(tmpdir.join('cache')))
+    digest = checksums.cached_file_checksum(path)
+    assert checksums.cached_file_checksum(path) == digest
+    assert len(calls) == 1
+    # the on-disk cache survives clearing the in-process cache
+    checksums.clear_checksum_cache()
+    assert checksums.cached_file_checksum(path) == digest
+    assert len(calls) == 1
+    # changing the file invalidates both
+    with open(path, 'ab') as fp:
+        fp.write(b'!')
+    assert checksums.cached_file_checksum(path) != digest
+    assert len(calls) == 2
+
+
+def test_file_checksums(data_files):
+    files = [(path, 'sha256') for path, content in data_files]
+    result = checksums.file_checksums(files + [('/not/a/file', 'sha256')])
+    assert len(result) == 3
+    for path, content in data_files:
+        assert result[(path, 'sha256')] == hashlib.sha256(content).hexdigest()
+
+
+class ChecksumItemSchema(DefaultSchema):
+    data = fields.InputFile(checksum_sidecar=True)
+
+
+class ChecksumSchema(ArgSchema):
+    declared = fields.InputFile(
+        checksum_algorithm='md5', checksum=hashlib.md5(b'hello').hexdigest())
+    items = fields.Nested(ChecksumItemSchema, many=True)
+
+
+def test_inputfile_checksum(data_files):
+    (empty, _), (hello, _), (random, content) = data_files
+    with open(random + '.sha256', 'w') as fp:
+        fp.write('{}  data2.bin\n'.format(hashlib.sha256(content).hexdigest()))
+    with open(empty + '.sha256', 'w') as fp:
+        fp.write(hashlib.sha256(b'').hexdigest().upper())
+    mod = ArgSchemaParser(schema_type=ChecksumSchema, args=[], input_data={
+        'declared': hello, 'items': [{'data': random}, {'data': empty}]})
+    assert mod.args['declared'] == hello
+
+    with pytest.raises(mm.ValidationError) as e:
+        ArgSchemaParser(schema_type=ChecksumSchema, args=[], input_data={
+            'declared': random})
+    assert 'expected' in str(e.value)
+    with pytest.raises(mm.ValidationError) as e:
+        ArgSchemaParser(schema_type=ChecksumSchema, args=[], input_data={
+            'items': [{'data': hello}]})
+    assert 'checksum file' in str(e.value)
+
+
+def test_prefetch_checksums(data_files, monkeypatch):
+    checksums.clear_checksum_cache()
+    seen = []
+    monkeypatch.setattr(checksums, 'file_checksums',
+                        lambda files, max_workers=None: seen.extend(files))
+    (empty, _), (hello, _), (random, _) = data_files
+    checksums.prefetch_checksums(ChecksumSchema(), {
+        'declared': hello, 'items': [{'data': random}, {'data': empty}]})
+    assert sorted(seen) == sorted([(hello, 'md5'), (random, 'sha256'),
+                                   (empty, 'sha256')])
+    del seen[:]
+    checksums.prefetch_checksums(ArgSchema(), {'log_level': 'INFO'})
+    assert seen == []
@@ -253,6 +253,44 @@ def test_override_list_deprecated(deprecated_data):
             )
 
 
+def test_override_list_from_file(test_data, deprecated_data, tmpdir):
+    json_file = tmpdir.join("list.json")
+    json_file.write("[1, 2, 3]")
+    npy_file = str(tmpdir.join("list.npy"))
+    np.save(npy_file, np.arange(4))
+    csv_file = tmpdir.join("list.csv")
+    csv_file.write("5,6\n")
+    for path, expected in [(json_file, [1, 2, 3]), (npy_file, [0, 1, 2, 3]),
+                           (csv_file, [5, 6])]:
+        mod = ArgSchemaParser(
+            test_data, schema_type=MySchema, args=["--list", "@{}".format(path)]
+        )
+        assert mod.args["list"] == expected
+    with pytest.warns(FutureWarning):
+        mod = ArgSchemaParser(
+            deprecated_data,
+            schema_type=MyDeprecatedSchema,
+            args=["--list_deprecated", "@{}".format(json_file)],
+        )
+    assert mod.args["list_deprecated"] == [1, 2, 3]
+    with pytest.raises(mm.ValidationError):
+        ArgSchemaParser(
+            test_data, schema_type=MySchema,
+            args=["--list", "@{}".format(tmpdir.join("missing.json"))]
+        )
+
+
+class StringListSchema(ArgSchema):
+    names = fields.List(fields.Str, required=True)
+
+
+def test_deprecated_string_list_keeps_at_values():
+    with pytest.warns(FutureWarning):
+        mod = ArgSchemaParser(schema_type=StringListSchema,
+                              args=["--names", "@alice"])
+    assert mod.args["names"] == ["@alice"]
+
+
 # def test_override_localdatetime(test_data):
 #     mod = ArgSchemaParser(test_data, schema_type=MySchema,
 #                           args=["--localdatetime", "1977-05-04T00:00:00"])
@@ -314,6 +352,20 @@ def test_override_numpyarray(test_data):
         )
 
 
+def test_override_numpyarray_from_file(test_data, tmpdir):
+    npy_file = str(tmpdir.join("array.npy"))
+    np.save(npy_file, np.array([[4, 3], [2, 1]]))
+    txt_file = tmpdir.join("array.txt")
+    txt_file.write("4 3\n2 1\n")
+    for path in [npy_file, txt_file]:
+        mod = ArgSchemaParser(
+            test_data, schema_type=MySchema,
+            args=["--numpyarray", "@{}".format(path)]
+        )
+        assert mod.args["numpyarray"].dtype == np.uint8
+        assert np.all(mod.args["numpyarray"] == np.array([[4, 3], [2, 1]]))
+
+
 def test_override_outputdir(test_data, tmpdir_factory):
     output2 = tmpdir_factory.mktemp("output2")
     mod = ArgSchemaParser(
@@ -0,0 +1,115 @@
+import os
+import sys
+import json
+import subprocess
+import pytest
+import marshmallow as mm
+import argschema
+from argschema import fields, cli_spec, plans
+from argschema.schemas import DefaultSchema
+
+
+class SpecNestedSchema(DefaultSchema):
+    c = fields.Float(default=1.0, description='a float')
+
+
+class SpecSchema(argschema.ArgSchema):
+    a = fields.Int(required=True, description='an int')
+    mode = fields.Str(default='fast', validate=mm.validate.OneOf(['fast', 'slow']))
+    values = fields.List(fields.Int, cli_as_single_argument=True, default=[])
+    nest = fields.Nested(SpecNestedSchema, default={})
+
+
+@pytest.fixture
+def spec_path(tmpdir):
+    path = str(tmpdir.join('spec.json'))
+    cli_spec.export_cli_spec(SpecSchema(), path)
+    return path
+
+
+def test_export_cli_spec(spec_path):
+    spec = cli_spec.load_cli_spec(spec_path)
+    args = {arg['name']: arg for group in spec['groups']
+            for arg in group['args']}
+    assert args['--a']['required']
+    assert args['--a']['type'] == 'Integer'
+    assert args['--mode']['choices'] == ['fast', 'slow']
+    assert args['--nest.c']['type'] == 'Float'
+    assert args['--input_json']['action'] == 'append'
+    assert spec['fingerprint'] == plans.schema_fingerprint(SpecSchema())
+
+
+def test_spec_help_matches_parser(spec_path):
+    parser = plans.get_schema_plan(SpecSchema()).argparser()
+    spec_parser = cli_spec.spec_argparser(cli_spec.load_cli_spec(spec_path))
+    assert spec_parser.format_help() == parser.format_help()
+
+
+def test_complete(spec_path):
+    spec = cli_spec.load_cli_spec(spec_path)
+    assert cli_spec.complete(spec, ['--mo']) == ['--mode']
+    assert cli_spec.complete(spec, ['--mode', '']) == ['fast', 'slow']
+    assert cli_spec.complete(spec, ['--mode', 's']) == ['slow']
+    assert cli_spec.complete(spec, ['--a', '']) == []
+    assert '--a' not in cli_spec.complete(spec, ['--a', '1', '--'])
+    assert '--nest.c' in cli_spec.complete(spec, ['--a', '1', '--'])
+
+
+def test_maybe_serve_help(spec_path, capsys):
+    cli_spec.maybe_serve_help(spec_path, argv=['--a', '1'])
+    cli_spec.maybe_serve_help(spec_path + '.missing', argv=['--help'])
+    with pytest.raises(SystemExit):
+        cli_spec.maybe_serve_help(spec_path, argv=['--help'])
+    assert 'an int' in capsys.readouterr().out
+
+
+def test_bad_spec_format(tmpdir):
+    path = tmpdir.join('bad.json')
+    path.write(json.dumps({'format': -1, 'groups': []}))
+    with pytest.raises(ValueError):
+        cli_spec.load_cli_spec(str(path))
+
+
+def test_cli_spec_main(spec_path, capsys):
+    assert cli_spec.main(['complete', spec_path, '--', '--mode', 'f']) == 0
+    assert capsys.readouterr().out == 'fast\n'
+    assert cli_spec.main(['bash', spec_path, 'my_module.py']) == 0
+    assert 'complete -o default -F' in capsys.readouterr().out
+
+
+def test_help_is_light(spec_path):
+    code = ('import sys; from argschema.cli_spec import maybe_serve_help\n'
+            'try:\n'
+            '    maybe_serve_help(sys.argv[1], ["--help"])\n'
+            'finally:\n'
+            '    sys.stderr.write(str("marshmallow" in sys.modules or '
+            '"numpy" in sys.modules))\n')
+    proc = subprocess.run([sys.executable, '-c', code, spec_path],
+                          stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    assert proc.returncode == 0
+    assert b'an int' in proc.stdout
+    assert proc.stderr == b'False'
+
+
+def test_stale_spec(tmpdir, monkeypatch, capsys):
+    module = tmpdir.join('spec_module.py')
+    module.write('import argschema\n'
+                 'class StaleSchema(argschema.ArgSchema):\n'
+                 '    a = argschema.fields.Int(description="an int")\n')
+    monkeypatch.syspath_prepend(str(tmpdir))
+    from spec_module import StaleSchema
+    path = str(tmpdir.join('stale.json'))
+    cli_spec.export_cli_spec(StaleSchema(), path)
+    assert 'spec_module' in [module for module, source, mtime, size in
+                             cli_spec.load_cli_spec(path)['sources']]
+    cli_spec.load_cli_spec(path, StaleSchema())
+    with pytest.raises(cli_spec.StaleSpecError):
+        cli_spec.load_cli_spec(path, SpecSchema())
+
+    stat = os.stat(str(module))
+    os.utime(str(module), ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    with pytest.raises(cli_spec.StaleSpecError):
+        cli_spec.load_cli_spec(path)
+    cli_spec.maybe_serve_help(path, argv=['--help'])
+    assert cli_spec.main(['complete', path, '--', '--']) == 1
+    assert capsys.readouterr().out == ''
@@ -0,0 +1,94 @@
+import json
+import logging
+import pytest
+import numpy as np
+import marshmallow as mm
+from argschema import fields, ArgSchema, ArgSchemaParser, utils, plans
+from argschema.schemas import DefaultSchema
+
+
+class EnvNestedSchema(DefaultSchema):
+    c = fields.Float(default=1.0)
+    flag = fields.Boolean(default=False)
+
+
+class EnvSchema(ArgSchema):
+    a = fields.Int(default=1)
+    b = fields.Str(default='b')
+    old_list = fields.List(fields.Int, default=[])
+    new_list = fields.List(fields.Int, cli_as_single_argument=True, default=[])
+    array = fields.NumpyArray(dtype=np.float64)
+    nest = fields.Nested(EnvNestedSchema, default={})
+
+
+class EnvParser(ArgSchemaParser):
+    default_schema = EnvSchema
+    env_prefix = 'ENVTEST'
+
+
+@pytest.mark.filterwarnings('ignore::FutureWarning')
+def test_env_input(monkeypatch):
+    monkeypatch.setenv('ENVTEST__a', '5')
+    monkeypatch.setenv('ENVTEST__old_list', '[1, 2]')
+    monkeypatch.setenv('ENVTEST__new_list', '[3]')
+    monkeypatch.setenv('ENVTEST__array', '[1.5, 2]')
+    monkeypatch.setenv('ENVTEST__nest__c', '2.5')
+    monkeypatch.setenv('ENVTEST__nest__flag', 'True')
+    monkeypatch.setenv('OTHER__a', '7')
+    mod = EnvParser(input_data={'b': 'json', 'a': 2}, args=[])
+    assert mod.args['a'] == 5
+    assert mod.args['b'] == 'json'
+    assert mod.args['old_list'] == [1, 2]
+    assert mod.args['new_list'] == [3]
+    assert np.array_equal(mod.args['array'], [1.5, 2])
+    assert mod.args['nest'] == {'c': 2.5, 'flag': True}
+
+
+@pytest.mark.filterwarnings('ignore::FutureWarning')
+def test_env_input_precedence(monkeypatch, tmpdir):
+    input_json = tmpdir.join('input.json')
+    input_json.write(json.dumps({'a': 2, 'b': 'json'}))
+    monkeypatch.setenv('ENVTEST__a', '5')
+    monkeypatch.setenv('ENVTEST__b', 'env')
+    mod = EnvParser(args=['--input_json', str(input_json), '--a', '9'])
+    assert mod.args['a'] == 9
+    assert mod.args['b'] == 'env'
+
+
+@pytest.mark.filterwarnings('ignore::FutureWarning')
+def test_env_input_disabled(monkeypatch):
+    monkeypatch.setenv('ENVTEST__a', '5')
+    mod = ArgSchemaParser(schema_type=EnvSchema, args=[])
+    assert mod.args['a'] == 1
+
+
+@pytest.mark.filterwarnings('ignore::FutureWarning')
+def test_env_input_errors(monkeypatch, caplog):
+    monkeypatch.setenv('ENVTEST__nope', '5')
+    with caplog.at_level(logging.WARNING):
+        EnvParser(args=[])
+    assert 'ENVTEST__nope' in caplog.text
+    monkeypatch.setenv('ENVTEST__new_list', '[1,foo]')
+    with pytest.raises(mm.ValidationError):
+        EnvParser(args=[])
+    monkeypatch.setenv('ENVTEST__new_list', '[1]')
+    monkeypatch.setenv('ENVTEST__a', 'x')
+    with pytest.raises(mm.ValidationError):
+        EnvParser(args=[])
+
+
+@pytest.mark.filterwarnings('ignore::FutureWarning')
+def test_env_cast_table():
+    plan = plans.get_schema_plan(EnvSchema())
+    table = utils.env_cast_table(plan.cast_table, 'P')
+    assert table['P__nest__c'][0] == 'nest.c'
+    assert table['P__old_list'][1] is not list
+
+
+def test_environ_to_dict_case_insensitive(monkeypatch):
+    plan = plans.get_schema_plan(EnvSchema())
+    environ = {'ENVTEST__A': '5', 'ENVTEST__NEST__C': '2.5'}
+    assert plan.env_to_dict(environ, 'ENVTEST') == {}
+    monkeypatch.setattr('sys.platform', 'win32')
+    assert plan.env_to_dict(environ, 'ENVTEST') == {'a': '5',
+                                                    'nest': {'c': '2.5'}}
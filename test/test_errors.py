@@ -0,0 +1,114 @@
+import time
+import pytest
+import marshmallow as mm
+from argschema import fields, ArgSchema, ArgSchemaParser, errors, utils
+from argschema.schemas import DefaultSchema
+
+
+class ErrorItemSchema(DefaultSchema):
+    x = fields.Int(required=True)
+    y = fields.Str(default='y')
+
+
+class ErrorSchema(ArgSchema):
+    a = fields.Int(required=True)
+    items = fields.Nested(ErrorItemSchema, many=True,
+                          validate=mm.validate.Length(min=1))
+    numbers = fields.List(fields.Float, cli_as_single_argument=True)
+
+
+def make_input(n, bad=()):
+    items = [{'x': i} for i in range(n)]
+    for i in bad:
+        items[i] = {'x': 'bad'}
+    return {'a': 1, 'items': items, 'numbers': [float(i) for i in range(n)]}
+
+
+def test_budgeted_load_matches_load():
+    d = make_input(3000)
+    assert errors.budgeted_load(ErrorSchema(), d, max_errors=1) == \
+        utils.load(ErrorSchema(), d)
+
+
+def test_budgeted_load_stops_early(monkeypatch):
+    loaded = []
+    original = errors._load_elements
+
+    def counting(field, chunk, schema):
+        loaded.append(len(chunk))
+        return original(field, chunk, schema)
+    monkeypatch.setattr(errors, '_load_elements', counting)
+    d = make_input(100000, bad=range(0, 100000, 2))
+    with pytest.raises(mm.ValidationError) as e:
+        errors.budgeted_load(ErrorSchema(), d, max_errors=1)
+    assert e.value.messages == {'items': {0: {'x': ['Not a valid integer.']}}}
+    assert sum(loaded) == errors.FIRST_CHUNK
+
+    with pytest.raises(mm.ValidationError) as e:
+        errors.budgeted_load(ErrorSchema(), d, max_errors=50)
+    assert errors.count_errors(e.value.messages) == 50
+
+
+def test_budgeted_load_collects_other_errors():
+    d = make_input(2000, bad=[5])
+    d['a'] = 'x'
+    d['numbers'][7] = 'x'
+    with pytest.raises(mm.ValidationError) as e:
+        errors.budgeted_load(ErrorSchema(), d, max_errors=10)
+    assert set(e.value.messages) == {'a', 'items', 'numbers'}
+    assert list(e.value.messages['numbers']) == [7]
+    d = make_input(2000)
+    d['items'] = []
+    with pytest.raises(mm.ValidationError) as e:
+        errors.budgeted_load(ErrorSchema(), d, max_errors=10, min_length=0)
+    assert 'items' in e.value.messages
+
+
+def test_summarize_errors():
+    messages = {'a': ['Not a valid integer.'],
+                'items': {i: {'x': ['Not a valid integer.']} for i in range(5)}}
+    messages['items'][9] = {'y': ['Not a valid string.']}
+    assert errors.summarize_errors(messages) == {
+        'a': ['Not a valid integer.'],
+        'items.*.x': ['Not a valid integer. (5 times)'],
+        'items.*.y': ['Not a valid string.']}
+
+
+def test_truncate_errors():
+    messages = {'a': ['one', 'two'], 'b': {0: ['three'], 1: ['four']}}
+    assert errors.truncate_errors(messages, 3) == {
+        'a': ['one', 'two'], 'b': {0: ['three']}}
+
+
+class BudgetParser(ArgSchemaParser):
+    default_schema = ErrorSchema
+    max_validation_errors = 3
+    summarize_validation_errors = True
+
+
+def test_parser_error_budget():
+    with pytest.raises(mm.ValidationError) as e:
+        BudgetParser(input_data=make_input(5000, bad=range(100)), args=[])
+    assert e.value.messages == {'items.*.x': ['Not a valid integer. (3 times)']}
+    mod = BudgetParser(input_data=make_input(5000), args=[])
+    assert len(mod.args['items']) == 5000
+
+
+class CountedSchema(ArgSchema):
+    n = fields.Int(required=True)
+    values = fields.List(fields.Int, required=True)
+
+    @mm.validates_schema
+    def check_count(self, data, **kwargs):
+        if len(data['values']) != data['n']:
+            raise mm.ValidationError('expected {} values'.format(data['n']))
+
+
+def test_budgeted_load_schema_hooks_see_full_lists():
+    schema = CountedSchema()
+    d = {'n': 2000, 'values': list(range(2000))}
+    assert errors.find_large_lists(schema, d, 1000) == []
+    assert errors.budgeted_load(schema, d, max_errors=1)['values'] == list(
+        range(2000))
+    with pytest.raises(mm.ValidationError):
+        errors.budgeted_load(schema, dict(d, n=3), max_errors=1)
@@ -0,0 +1,237 @@
+import pytest
+import marshmallow as mm
+from argschema import fields, ArgSchema, ArgSchemaParser, filesystems
+from argschema.schemas import DefaultSchema
+
+
+class ItemSchema(DefaultSchema):
+    data = fields.InputFile(required=True)
+
+
+class PathSchema(ArgSchema):
+    input_dir = fields.InputDir(required=True)
+    items = fields.Nested(ItemSchema, many=True)
+    output_file = fields.OutputFile()
+    output_dir = fields.OutputDir()
+
+
+class CountingFileSystem(filesystems.MemoryFileSystem):
+    def __init__(self, *args, **kwargs):
+        super(CountingFileSystem, self).__init__(*args, **kwargs)
+        self.calls = []
+
+    def stat(self, path):
+        self.calls.append(('stat', path))
+        return super(CountingFileSystem, self).stat(path)
+
+    def stat_many(self, paths):
+        paths = list(paths)
+        self.calls.append(('stat_many', sorted(paths)))
+        return {path: filesystems.MemoryFileSystem.stat(self, path)
+                for path in paths}
+
+
+@pytest.fixture
+def memory_fs():
+    fs = CountingFileSystem(
+        files=['/data/a.bin', '/data/b.bin', '/data/secret.bin'],
+        directories=['/out', '/readonly'],
+        unreadable=['/data/secret.bin'], unwritable=['/readonly'])
+    with filesystems.use_filesystem(fs):
+        yield fs
+
+
+def test_memory_filesystem(memory_fs):
+    mod = ArgSchemaParser(schema_type=PathSchema, args=[], input_data={
+        'input_dir': '/data', 'items': [{'data': '/data/a.bin'},
+                                        {'data': '/data/b.bin'}],
+        'output_file': '/out/result.json', 'output_dir': '/out/new/dir'})
+    assert mod.args['items'][1]['data'] == '/data/b.bin'
+    assert memory_fs.stat('/out/new/dir').is_dir
+    # the paths were checked in one batch
+    assert memory_fs.calls[0] == ('stat_many', [
+        '/data', '/data/a.bin', '/data/b.bin', '/out', '/out/new/dir'])
+    assert [c for c in memory_fs.calls[1:] if c[0] == 'stat_many'] == []
+    assert ('stat', '/data/a.bin') not in memory_fs.calls
+
+
+@pytest.mark.parametrize('data,message', [
+    ({'input_dir': '/nowhere'}, 'is not a directory'),
+    ({'input_dir': '/data', 'items': [{'data': '/data/c.bin'}]},
+     'is not a file'),
+    ({'input_dir': '/data', 'items': [{'data': '/data/secret.bin'}]},
+     'is not readable'),
+    ({'input_dir': '/data', 'output_file': '/nowhere/out.json'},
+     'is not in a directory that exists'),
+    ({'input_dir': '/data', 'output_file': '/readonly/out.json'},
+     'does not appear you can write'),
+    ({'input_dir': '/data', 'output_dir': '/readonly/new'},
+     'you cannot create it'),
+])
+def test_memory_filesystem_errors(memory_fs, data, message):
+    with pytest.raises(mm.ValidationError) as e:
+        ArgSchemaParser(schema_type=PathSchema, args=[], input_data=data)
+    assert message in str(e.value)
+
+
+def test_local_stat_many(tmpdir):
+    a = tmpdir.join('a.txt')
+    a.write('a')
+    fs = filesystems.LocalFileSystem(max_workers=4)
+    infos = fs.stat_many([str(a), str(tmpdir), str(tmpdir.join('missing'))])
+    assert infos[str(a)].is_file and infos[str(a)].readable
+    assert infos[str(tmpdir)].is_dir
+    assert infos[str(tmpdir.join('missing'))] == filesystems.MISSING
+
+
+def test_batch_checks_nesting(memory_fs):
+    with filesystems.batch_checks(['/data/a.bin']):
+        with filesystems.batch_checks(['/data/a.bin', '/data/b.bin']):
+            assert filesystems.path_info('/data/b.bin').is_file
+        assert memory_fs.calls == [('stat_many', ['/data/a.bin']),
+                                   ('stat_many', ['/data/b.bin'])]
+    assert filesystems.path_info('/data/a.bin').is_file
+    assert memory_fs.calls[-1] == ('stat', '/data/a.bin')
+
+
+class HangingFileSystem(filesystems.MemoryFileSystem):
+    def __init__(self, release, *args, **kwargs):
+        super(HangingFileSystem, self).__init__(*args, **kwargs)
+        self.release = release
+        self.hung = []
+
+    def stat(self, path):
+        if path.startswith('/nfs'):
+            self.hung.append(path)
+            self.release.wait()
+        return super(HangingFileSystem, self).stat(path)
+
+
+@pytest.fixture
+def mounts(tmpdir, monkeypatch):
+    mounts_file = tmpdir.join('mounts')
+    mounts_file.write('rootfs / ext4 rw 0 0\n'
+                      'server:/export /nfs nfs rw 0 0\n'
+                      'server:/my\\040disk /my\\040disk nfs rw 0 0\n')
+    monkeypatch.setattr(filesystems, 'MOUNTS_FILE', str(mounts_file))
+    monkeypatch.setattr(filesystems, '_MOUNTS', [])
+    yield
+    filesystems.BREAKER.reset()
+
+
+def test_mount_point(mounts):
+    assert filesystems.mount_point('/nfs/a/b') == '/nfs'
+    assert filesystems.mount_point('/nfs') == '/nfs'
+    assert filesystems.mount_point('/nfsx/a') == '/'
+    assert filesystems.mount_point('/my disk/a') == '/my disk'
+
+
+def test_timeout_filesystem(mounts):
+    import threading
+    release = threading.Event()
+    fs = HangingFileSystem(release, files=['/nfs/a.bin', '/nfs/b.bin',
+                                           '/local/c.bin'])
+
+    class TimeoutParser(ArgSchemaParser):
+        default_schema = PathSchema
+        filesystem_timeout = 0.05
+
+    try:
+        with filesystems.use_filesystem(fs):
+            with pytest.raises(mm.ValidationError) as e:
+                TimeoutParser(args=[], input_data={
+                    'input_dir': '/local',
+                    'items': [{'data': '/nfs/a.bin'}, {'data': '/local/c.bin'}]})
+            assert 'mounted at /nfs is not responding' in str(e.value)
+            hung = len(fs.hung)
+            # the mount is known to be unresponsive, so this fails fast
+            with pytest.raises(mm.ValidationError) as e:
+                TimeoutParser(args=[], input_data={
+                    'input_dir': '/local', 'items': [{'data': '/nfs/b.bin'}]})
+            assert 'not responding' in str(e.value)
+            assert len(fs.hung) == hung
+            # other mounts are not affected
+            mod = TimeoutParser(args=[], input_data={
+                'input_dir': '/local', 'items': [{'data': '/local/c.bin'}]})
+            assert mod.args['items'][0]['data'] == '/local/c.bin'
+    finally:
+        release.set()
+
+
+def test_circuit_breaker_reset(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(filesystems.time, 'monotonic', lambda: now[0])
+    breaker = filesystems.CircuitBreaker(failure_threshold=2, reset_after=10)
+    breaker.record('/nfs', False)
+    assert breaker.allow('/nfs')
+    breaker.record('/nfs', False)
+    assert not breaker.allow('/nfs')
+    now[0] += 10
+    assert breaker.allow('/nfs')
+    assert not breaker.allow('/nfs')
+    breaker.record('/nfs', True)
+    assert breaker.allow('/nfs')
+
+
+def test_timeout_lazy_load(mounts):
+    import threading
+    release = threading.Event()
+    fs = HangingFileSystem(release, files=['/nfs/a.bin', '/local/c.bin'])
+
+    class LazyTimeoutParser(ArgSchemaParser):
+        default_schema = PathSchema
+        filesystem_timeout = 0.05
+        lazy_load = True
+
+    try:
+        with filesystems.use_filesystem(fs):
+            mod = LazyTimeoutParser(args=[], input_data={
+                'input_dir': '/local', 'items': [{'data': '/nfs/a.bin'}]})
+            assert not mod.args.is_loaded('items')
+            # the subtree loaded on access is checked with the timeout too
+            with pytest.raises(mm.ValidationError) as e:
+                mod.args['items']
+            assert 'not responding' in str(e.value)
+    finally:
+        release.set()
+
+
+def test_timeout_checks_reuse_threads(mounts):
+    import threading
+
+    def count():
+        return sum(t.name == 'argschema-filesystem-check'
+                   for t in threading.enumerate())
+    fs = filesystems.TimeoutFileSystem(
+        filesystems.MemoryFileSystem(files=['/local/a.bin']), timeout=1.0)
+    fs.stat('/local/a.bin')
+    before = count()
+    for i in range(10):
+        assert fs.stat('/local/a.bin').is_file
+    assert count() == before
+    with filesystems.timeout_checks(None) as unchanged:
+        assert unchanged is filesystems.get_filesystem()
+    with filesystems.use_filesystem(fs):
+        with filesystems.timeout_checks(5.0) as timed:
+            assert timed is fs
+
+
+class SlowFileSystem(filesystems.MemoryFileSystem):
+    def stat(self, path):
+        import time
+        time.sleep(0.002)
+        return super(SlowFileSystem, self).stat(path)
+
+
+@pytest.mark.parametrize('batch_size', [32, 1000])
+def test_timeout_stat_many_slow_but_healthy(mounts, batch_size):
+    paths = ['/local/f{}.bin'.format(i) for i in range(601)]
+    breaker = filesystems.CircuitBreaker()
+    fs = filesystems.TimeoutFileSystem(SlowFileSystem(files=paths),
+                                       timeout=0.5, breaker=breaker,
+                                       batch_size=batch_size)
+    infos = fs.stat_many(paths)
+    assert len(infos) == 601 and all(info.is_file for info in infos.values())
+    # a slow batch does not open the circuit of the mount
+    assert breaker.allow('/')
+    assert fs.stat(paths[0]).is_file
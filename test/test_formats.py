@@ -0,0 +1,84 @@
+import gzip
+import json
+import numpy as np
+import pytest
+import argschema
+from argschema import fields, ArgSchemaParser, formats
+from argschema.schemas import DefaultSchema
+
+
+class FormatSchema(argschema.ArgSchema):
+    a = fields.Int(required=True)
+    array = fields.NumpyArray(dtype=np.float32)
+
+
+class FormatOutputSchema(DefaultSchema):
+    a = fields.Int(required=True)
+    array = fields.NumpyArray(dtype=np.float32)
+
+
+@pytest.mark.parametrize("path,expected", [
+    ('in.json', ('json', None)),
+    ('in.JSON.GZ', ('json', 'gzip')),
+    ('in.json.zst', ('json', 'zstd')),
+    ('in.msgpack', ('msgpack', None)),
+    ('in.mpk.gz', ('msgpack', 'gzip')),
+    ('in.txt', ('json', None)),
+])
+def test_detect_format(path, expected):
+    assert formats.detect_format(path) == expected
+
+
+def test_gzip_input(tmpdir):
+    path = str(tmpdir.join('input.json.gz'))
+    with gzip.open(path, 'wt') as fp:
+        json.dump({'a': 5, 'array': [1, 2, 3]}, fp)
+    mod = ArgSchemaParser(schema_type=FormatSchema,
+                          args=['--input_json', path])
+    assert mod.args['a'] == 5
+    assert mod.args['array'].dtype == np.float32
+
+
+def test_compressed_json_detected_from_contents(tmpdir):
+    path = str(tmpdir.join('input.json'))
+    with open(path, 'wb') as fp:
+        fp.write(gzip.compress(b'{"a": 3}'))
+    assert formats.read_input(path) == {'a': 3}
+
+
+def test_gzip_output(tmpdir):
+    path = str(tmpdir.join('output.json.gz'))
+    mod = ArgSchemaParser(input_data={'a': 1}, schema_type=FormatSchema,
+                          output_schema_type=FormatOutputSchema, args=[])
+    mod.output({'a': 2, 'array': np.arange(3)}, path, indent=2)
+    with gzip.open(path, 'rt') as fp:
+        assert json.load(fp) == {'a': 2, 'array': [0.0, 1.0, 2.0]}
+    assert formats.read_input(path) == {'a': 2, 'array': [0.0, 1.0, 2.0]}
+
+
+@pytest.mark.parametrize("name", ['data.msgpack', 'data.msgpack.gz',
+                                  'data.json.zst', 'data.msgpack.zst'])
+def test_roundtrip(tmpdir, name):
+    pytest.importorskip('msgpack')
+    if name.endswith('.zst'):
+        pytest.importorskip('zstandard')
+    path = str(tmpdir.join(name))
+    data = {'a': 1, 'nested': {'b': [1.5, 'x', None]}}
+    formats.write_output(data, path)
+    assert formats.read_input(path) == data
+
+
+def test_msgpack_numpy(tmpdir):
+    pytest.importorskip('msgpack')
+    path = str(tmpdir.join('input.msgpack'))
+    array = np.arange(12, dtype=np.float32).reshape(3, 4)
+    formats.write_output({'a': 4, 'array': array, 'n': np.int64(3)}, path)
+    data = formats.read_input(path)
+    assert data['n'] == 3
+    assert data['array'].dtype == np.float32
+    assert np.array_equal(data['array'], array)
+
+    formats.write_output({'a': 4, 'array': array}, path)
+    mod = ArgSchemaParser(schema_type=FormatSchema,
+                          args=['--input_json', path])
+    assert np.array_equal(mod.args['array'], array)
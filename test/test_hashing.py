@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+from argschema import ArgSchema, ArgSchemaParser, fields
+from argschema.hashing import canonical_hash
+
+
+def test_canonical_hash_key_order():
+    a = {'a': 1, 'b': {'c': [1, 2.5, None], 'd': 'x'}}
+    b = {'b': {'d': 'x', 'c': [1, 2.5, None]}, 'a': 1}
+    assert canonical_hash(a) == canonical_hash(b)
+
+
+def test_canonical_hash_types():
+    assert canonical_hash({'a': 1}) != canonical_hash({'a': '1'})
+    assert canonical_hash({'a': 1}) != canonical_hash({'a': 1.0})
+    assert canonical_hash({'a': True}) != canonical_hash({'a': 1})
+    assert canonical_hash([1, 2]) == canonical_hash((1, 2))
+    assert canonical_hash(['ab', 'c']) != canonical_hash(['a', 'bc'])
+
+
+def test_canonical_hash_numpy():
+    a = np.arange(12, dtype=np.int64).reshape(3, 4)
+    assert canonical_hash({'a': a}) == canonical_hash({'a': a.copy()})
+    assert canonical_hash(a) == canonical_hash(np.asfortranarray(a))
+    assert canonical_hash(a) != canonical_hash(a.reshape(4, 3))
+    assert canonical_hash(a) != canonical_hash(a.astype(np.int32))
+    assert canonical_hash(slice(1, 5)) != canonical_hash(slice(1, 6))
+    assert canonical_hash({1, 2}) == canonical_hash({2, 1})
+
+
+class FingerprintSchema(ArgSchema):
+    infile = fields.InputFile(required=True)
+    array = fields.NumpyArray(dtype=np.float64)
+    sl = fields.Slice()
+
+
+def test_args_fingerprint(tmpdir):
+    path = tmpdir.join('input.txt')
+    path.write('data')
+    input_data = {'infile': str(path), 'array': [1, 2], 'sl': '1:3'}
+    mod = ArgSchemaParser(input_data=dict(input_data),
+                          schema_type=FingerprintSchema, args=[])
+    mod2 = ArgSchemaParser(input_data=dict(input_data),
+                           schema_type=FingerprintSchema,
+                           args=['--log_level', 'INFO'])
+    assert mod.fingerprint() == mod2.fingerprint()
+    assert mod.fingerprint('content') == mod2.fingerprint('content')
+    before = mod.fingerprint('content')
+    mtime = mod.fingerprint('mtime')
+    path.write('other data')
+    assert mod.fingerprint() == mod2.fingerprint()
+    assert mod.fingerprint('content') != before
+    assert mod.fingerprint('mtime') != mtime
+    with pytest.raises(ValueError):
+        mod.fingerprint('inode')
@@ -0,0 +1,126 @@
+import json
+import pytest
+import marshmallow as mm
+import argschema
+from argschema import fields, ArgSchemaParser, layers
+from argschema.schemas import DefaultSchema
+
+
+class LayerNestedSchema(DefaultSchema):
+    x = fields.Int(default=1)
+    y = fields.Int(default=2)
+
+
+class LayerSchema(argschema.ArgSchema):
+    a = fields.Int(required=True)
+    b = fields.Str(allow_none=True)
+    values = fields.List(fields.Float, cli_as_single_argument=True)
+    nest = fields.Nested(LayerNestedSchema, default={})
+
+
+def write_json(tmpdir, name, d):
+    path = tmpdir.join(name)
+    path.write(json.dumps(d))
+    return str(path)
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    layers.clear_layer_cache()
+    yield
+    layers.clear_layer_cache()
+
+
+def test_multiple_input_json(tmpdir):
+    base = write_json(tmpdir, 'base.json',
+                      {'a': 1, 'values': [1.0, 2.0], 'nest': {'x': 5}})
+    job = write_json(tmpdir, 'job.json', {'a': 2, 'nest': {'y': 6}})
+    mod = ArgSchemaParser(schema_type=LayerSchema,
+                          args=['--input_json', base, '--input_json', job])
+    assert mod.args['a'] == 2
+    assert mod.args['values'] == [1.0, 2.0]
+    assert mod.args['nest'] == {'x': 5, 'y': 6}
+    assert mod.args['input_json'] == job
+
+
+def test_include(tmpdir):
+    tmpdir.mkdir('shared')
+    write_json(tmpdir, 'shared/base.json',
+               {'a': 1, 'b': 'base', 'nest': {'x': 5, 'y': 7}})
+    job = write_json(tmpdir, 'job.json',
+                     {'$include': 'shared/base.json', 'b': None,
+                      'nest': {'y': 6}})
+    mod = ArgSchemaParser(schema_type=LayerSchema,
+                          args=['--input_json', job, '--a', '3'])
+    assert mod.args['a'] == 3
+    assert mod.args['b'] is None
+    assert mod.args['nest'] == {'x': 5, 'y': 6}
+
+
+def test_include_cycle(tmpdir):
+    write_json(tmpdir, 'a.json', {'$include': 'b.json'})
+    b = write_json(tmpdir, 'b.json', {'$include': ['a.json']})
+    with pytest.raises(mm.ValidationError):
+        layers.resolve_layer(b)
+
+
+def test_layer_cache_shared_and_unmodified(tmpdir):
+    base = write_json(tmpdir, 'base.json', {'a': 1, 'nest': {'x': 5}})
+    job = write_json(tmpdir, 'job.json', {'$include': 'base.json'})
+    cached = layers.read_layer(base)
+    for a in range(3):
+        mod = ArgSchemaParser(schema_type=LayerSchema,
+                              args=['--input_json', job, '--a', str(a)])
+        assert mod.args['a'] == a
+        assert mod.args['nest'] == {'x': 5, 'y': 2}
+    assert layers.read_layer(base) is cached
+    assert cached == {'a': 1, 'nest': {'x': 5}}
+
+
+class AppendingLayerSchema(LayerSchema):
+    @mm.pre_load
+    def append_value(self, data, **kwargs):
+        data.setdefault('values', []).append(0.0)
+        data.setdefault('steps', []).append({'x': 0})
+        return data
+
+    steps = fields.Nested(LayerNestedSchema, many=True)
+
+
+def test_layer_cache_not_modified_by_hooks(tmpdir):
+    base = write_json(tmpdir, 'base.json',
+                      {'a': 1, 'values': [1.0], 'steps': [{'x': 3}]})
+    for _ in range(3):
+        mod = ArgSchemaParser(schema_type=AppendingLayerSchema,
+                              args=['--input_json', base])
+        assert mod.args['values'] == [1.0, 0.0]
+        assert mod.args['steps'] == [{'x': 3, 'y': 2}, {'x': 0, 'y': 2}]
+    assert layers.read_layer(base) == {'a': 1, 'values': [1.0],
+                                       'steps': [{'x': 3}]}
+
+
+def test_layer_cache_invalidated(tmpdir):
+    base = write_json(tmpdir, 'base.json', {'a': 1})
+    assert layers.read_layer(base) == {'a': 1}
+    write_json(tmpdir, 'base.json', {'a': 12})
+    assert layers.read_layer(base) == {'a': 12}
+
+
+def test_layer_cache_bounded(tmpdir, monkeypatch):
+    monkeypatch.setattr(layers, 'LAYER_CACHE_SIZE', 2)
+    paths = [write_json(tmpdir, '{}.json'.format(i), {'a': i})
+             for i in range(3)]
+    first = layers.read_layer(paths[0])
+    layers.read_layer(paths[1])
+    assert layers.read_layer(paths[0]) is first
+    layers.read_layer(paths[2])
+    assert len(layers._LAYER_CACHE) == 2
+    assert layers.read_layer(paths[0]) is first
+    assert str(tmpdir.join('1.json')) not in layers._LAYER_CACHE
+
+
+def test_include_checked(tmpdir):
+    job = write_json(tmpdir, 'job.json', {'$include': 'missing.json'})
+    with pytest.raises(mm.ValidationError) as e:
+        ArgSchemaParser(schema_type=LayerSchema, args=['--input_json', job])
+    assert 'missing.json is not a file' in str(e.value)
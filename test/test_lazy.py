@@ -0,0 +1,108 @@
+import pickle
+import pytest
+import marshmallow as mm
+from argschema import fields, ArgSchema, ArgSchemaParser, lazy
+from argschema.schemas import DefaultSchema
+
+
+class Inner(DefaultSchema):
+    x = fields.Int(required=True, validate=mm.validate.Range(min=0))
+
+
+class Stage(DefaultSchema):
+    name = fields.Str(default='stage')
+    inner = fields.Nested(Inner, default={'x': 1})
+    items = fields.Nested(Inner, many=True, default=[])
+
+
+class PipelineSchema(ArgSchema):
+    a = fields.Int(required=True)
+    first = fields.Nested(Stage, required=True)
+    second = fields.Nested(Stage, default={})
+
+
+class LazyParser(ArgSchemaParser):
+    default_schema = PipelineSchema
+    lazy_load = True
+
+
+def test_lazy_args_access():
+    mod = LazyParser(args=[], input_data={
+        'a': 1, 'first': {'inner': {'x': 2}}, 'second': {'inner': {'x': -1}}})
+    assert isinstance(mod.args, lazy.LazyArgs)
+    assert mod.args['a'] == 1
+    assert mod.args['log_level'] == 'ERROR'
+    assert not mod.args.is_loaded('first')
+    assert mod.args['first']['inner']['x'] == 2
+    assert mod.args['first']['name'] == 'stage'
+    assert mod.args.is_loaded('first')
+    assert mod.args['first'] is mod.args['first']
+    with pytest.raises(mm.ValidationError) as e:
+        mod.args['second']['inner']
+    assert e.value.messages == {'second': {'inner': {'x': [
+        'Must be greater than or equal to 0.']}}}
+    with pytest.raises(mm.ValidationError) as e:
+        mod.args.validate_all()
+    assert list(e.value.messages) == ['second']
+
+
+def test_lazy_args_matches_eager_load():
+    data = {'a': 1, 'first': {'items': [{'x': 3}]}}
+    mod = LazyParser(args=[], input_data=data)
+    eager = ArgSchemaParser(schema_type=PipelineSchema, args=[], input_data=data)
+    assert mod.args.validate_all().to_dict() == eager.args
+    assert mod.args == eager.args
+    assert pickle.loads(pickle.dumps(mod.args)) == eager.args
+    assert sorted(mod.args) == sorted(eager.args)
+
+
+def test_lazy_args_top_level_errors():
+    with pytest.raises(mm.ValidationError) as e:
+        lazy.LazyArgs(PipelineSchema(), {'a': 'one', 'second': 3})
+    assert set(e.value.messages) == {'a', 'first', 'second'}
+    with pytest.raises(mm.ValidationError) as e:
+        LazyParser(args=[], input_data={'a': 1, 'first': {}, 'extra': 2})
+    assert list(e.value.messages) == ['extra']
+
+
+def test_lazy_load_schema_hooks():
+    class Checked(PipelineSchema):
+        @mm.validates_schema
+        def check(self, data, **kwargs):
+            pass
+    mod = LazyParser(schema_type=Checked, args=[], input_data={
+        'a': 1, 'first': {}})
+    assert isinstance(mod.args, dict)
+
+
+def test_lazy_args_pickle_stays_lazy():
+    mod = LazyParser(args=[], input_data={
+        'a': 1, 'first': {'inner': {'x': 2}}, 'second': {'inner': {'x': -1}}})
+    mod.args['first']
+    copy = pickle.loads(pickle.dumps(mod.args))
+    assert isinstance(copy, lazy.LazyArgs)
+    assert copy.is_loaded('first') and not copy.is_loaded('second')
+    assert copy['first']['inner']['x'] == 2
+    with pytest.raises(mm.ValidationError):
+        copy['second']['inner']
+
+
+def test_lazy_args_nested_loader():
+    calls = []
+
+    def loader(schema, d):
+        calls.append(type(schema).__name__)
+        return lazy.utils.load(schema, d)
+    args = lazy.LazyArgs(PipelineSchema(), {'a': 1, 'first': {}}, loader)
+    args['first']['name']
+    assert calls == ['PipelineSchema', 'Stage']
+
+
+def test_lazy_load_pre_load_hook():
+    class Prepared(PipelineSchema):
+        @mm.pre_load
+        def prepare(self, data, **kwargs):
+            return data
+    mod = LazyParser(schema_type=Prepared, args=[], input_data={
+        'a': 1, 'first': {}})
+    assert isinstance(mod.args, dict)
@@ -0,0 +1,55 @@
+import json
+import argschema
+from argschema import fields, ArgSchemaParser
+from argschema.memoize import memoized_run, read_fingerprint
+
+runs = []
+
+
+class MemoSchema(argschema.ArgSchema):
+    a = fields.Int(required=True)
+    infile = fields.InputFile(required=True)
+
+
+class MemoModule(ArgSchemaParser):
+    default_schema = MemoSchema
+
+    @memoized_run
+    def run(self):
+        runs.append(self.args['a'])
+        self.output({'b': self.args['a'] * 2}, indent=2)
+        return 'ran'
+
+
+def make_module(tmpdir, a):
+    infile = tmpdir.join('input.txt')
+    if not infile.check():
+        infile.write('data')
+    return MemoModule(input_data={'a': a, 'infile': str(infile),
+                                  'output_json': str(tmpdir.join('out.json'))},
+                      args=[])
+
+
+def test_memoized_run(tmpdir):
+    del runs[:]
+    assert make_module(tmpdir, 1).run() == 'ran'
+    assert make_module(tmpdir, 1).run() is None
+    assert runs == [1]
+    with open(str(tmpdir.join('out.json'))) as fp:
+        assert json.load(fp) == {'b': 2}
+
+    assert make_module(tmpdir, 2).run() == 'ran'
+    assert runs == [1, 2]
+
+    tmpdir.join('input.txt').write('new data')
+    make_module(tmpdir, 2).run()
+    assert runs == [1, 2, 2]
+
+
+def test_memoized_run_missing_output(tmpdir):
+    del runs[:]
+    make_module(tmpdir, 1).run()
+    tmpdir.join('out.json').remove()
+    make_module(tmpdir, 1).run()
+    assert runs == [1, 1]
+    assert read_fingerprint(str(tmpdir.join('out.json'))) is not None
@@ -0,0 +1,120 @@
+import pytest
+import marshmallow as mm
+import argschema
+from argschema import fields, ArgSchemaParser, parallel
+from argschema.schemas import DefaultSchema
+
+
+class ItemSchema(DefaultSchema):
+    x = fields.Int(required=True)
+    y = fields.Float(default=1.5)
+
+
+class GroupSchema(DefaultSchema):
+    items = fields.Nested(ItemSchema, many=True,
+                          validate=mm.validate.Length(max=40))
+
+
+class ParallelSchema(argschema.ArgSchema):
+    a = fields.Int(required=True)
+    items = fields.Nested(ItemSchema, many=True, required=True)
+    group = fields.Nested(GroupSchema)
+
+
+class ParallelParser(ArgSchemaParser):
+    default_schema = ParallelSchema
+    parallel_load = {'min_length': 10, 'chunksize': 7, 'max_workers': 2}
+
+
+def make_input(n, bad=()):
+    items = [{'x': i} for i in range(n)]
+    for i in bad:
+        items[i] = {'x': 'not an int'}
+    return {'a': 1, 'items': items,
+            'group': {'items': [{'x': i, 'y': 2.0} for i in range(n)]}}
+
+
+def test_find_large_many_fields():
+    found = parallel.find_large_many_fields(ParallelSchema(), make_input(12), 10)
+    assert [path for path, field in found] == [
+        [('items', 'items')], [('group', 'group'), ('items', 'items')]]
+    assert parallel.find_large_many_fields(
+        ParallelSchema(), make_input(9), 10) == []
+
+
+def test_parallel_load_matches_serial():
+    input_data = make_input(30)
+    mod = ParallelParser(input_data=input_data, args=[])
+    serial = ArgSchemaParser(input_data=input_data,
+                             schema_type=ParallelSchema, args=[])
+    assert mod.args == serial.args
+    assert mod.args['items'][29] == {'x': 29, 'y': 1.5}
+    assert input_data['items'][0] == {'x': 0}
+
+
+def test_parallel_load_errors():
+    with pytest.raises(mm.ValidationError) as e:
+        ParallelParser(input_data=make_input(30, bad=(3, 22)), args=[])
+    assert sorted(e.value.messages['items'].keys()) == [3, 22]
+    assert 'x' in e.value.messages['items'][22]
+
+
+def test_parallel_load_list_validators():
+    input_data = make_input(41)
+    input_data['a'] = 'bad'
+    with pytest.raises(mm.ValidationError) as e:
+        ParallelParser(input_data=input_data, args=[])
+    assert set(e.value.messages.keys()) == {'a', 'group'}
+    assert e.value.messages['group']['items'] == ['Longer than maximum length 40.']
+
+
+def test_placeholder_schema_leaves_fields_alone():
+    schema = ParallelSchema()
+    large = parallel.find_large_many_fields(schema, make_input(50), 10)
+    group_items = schema.fields['group'].schema.fields['items']
+    copied = parallel.placeholder_schema(schema, large)
+    assert group_items.validators
+    assert schema.fields['group'].schema.fields['items'] is group_items
+    assert copied.fields['group'].schema.fields['items'].validators == []
+    assert copied.fields['items'].validators == []
+    assert copied.fields['a'] is schema.fields['a']
+    assert argschema.utils.load(copied, argschema.utils.replace_path(
+        make_input(50), ['group', 'items'], []))['group']['items'] == []
+
+
+class ContextItemSchema(DefaultSchema):
+    x = fields.Int(required=True)
+
+    @mm.post_load
+    def scale(self, data, **kwargs):
+        data['x'] *= self.context.get('scale', 1)
+        return data
+
+
+def test_load_chunk_context():
+    loaded, errors = parallel.load_chunk(
+        ContextItemSchema, {'context': {'scale': 10}}, [{'x': 1}, {'x': 2}], 0,
+        timeout=5)
+    assert errors == {}
+    assert loaded == [{'x': 10}, {'x': 20}]
+
+
+class CountedItemsSchema(argschema.ArgSchema):
+    n = fields.Int(required=True)
+    items = fields.Nested(ItemSchema, many=True, required=True)
+
+    @mm.validates_schema
+    def check_count(self, data, **kwargs):
+        if len(data['items']) != data['n']:
+            raise mm.ValidationError('n must equal len(items), got {} '
+                                     'items'.format(len(data['items'])))
+
+
+def test_parallel_load_schema_hooks_see_full_lists():
+    d = {'n': 20, 'items': [{'x': i} for i in range(20)]}
+    assert parallel.find_large_many_fields(CountedItemsSchema(), d, 10) == []
+
+    class CountedParser(ParallelParser):
+        default_schema = CountedItemsSchema
+    mod = CountedParser(args=[], input_data=d)
+    assert len(mod.args['items']) == 20
@@ -0,0 +1,170 @@
+import os
+import sys
+import pickle
+import subprocess
+import pytest
+import argschema
+from argschema import plans, fields, ArgSchemaParser
+from argschema.schemas import DefaultSchema
+
+
+class PlanNestedSchema(DefaultSchema):
+    c = fields.Int(default=3, description="nested integer")
+
+
+class PlanSchema(argschema.ArgSchema):
+    a = fields.Int(required=True, description="parameter a")
+    b = fields.List(fields.Int, cli_as_single_argument=True,
+                    description="a list")
+    nest = fields.Nested(PlanNestedSchema, default={})
+
+
+class OtherPlanSchema(argschema.ArgSchema):
+    a = fields.Str(required=True, description="parameter a")
+
+
+def positive(value):
+    return value > 0
+
+
+class ValidatedPlanSchema(argschema.ArgSchema):
+    a = fields.Int(validate=positive, default=1, description="parameter a")
+    b = fields.Int(validate=lambda v: v < 10, default=2,
+                   description="parameter b")
+    c = fields.Dict(default=dict, description="parameter c")
+
+
+class DeprecatedListSchema(argschema.ArgSchema):
+    old = fields.List(fields.Int, description="old style list")
+
+
+@pytest.fixture
+def plan_cache(tmpdir, monkeypatch):
+    cache_dir = str(tmpdir.join('plans'))
+    monkeypatch.setenv(plans.PLAN_CACHE_ENV, cache_dir)
+    plans.clear_plan_cache()
+    yield cache_dir
+    plans.clear_plan_cache()
+
+
+def test_plan_in_process_cache():
+    schema = PlanSchema()
+    plan = plans.get_schema_plan(schema)
+    assert plans.get_schema_plan(PlanSchema()) is plan
+    assert plan.argparser() is plan.argparser()
+    assert plans.get_schema_plan(PlanSchema(only=['a'])) is not plan
+
+
+def test_plan_args_to_dict():
+    plan = plans.get_schema_plan(PlanSchema())
+    argsobj = plan.argparser().parse_args(
+        ['--a', '5', '--b', '[1,2]', '--nest.c', '4'])
+    argsdict = plan.args_to_dict(argsobj)
+    assert argsdict['a'] == '5'
+    assert argsdict['b'] == [1, 2]
+    assert argsdict['nest'] == {'c': '4'}
+
+
+def test_plan_disabled_by_default(monkeypatch):
+    monkeypatch.delenv(plans.PLAN_CACHE_ENV, raising=False)
+    assert plans.plan_cache_dir() is None
+    monkeypatch.setenv(plans.PLAN_CACHE_ENV, '1')
+    assert plans.plan_cache_dir() == plans.default_cache_dir('plans')
+
+
+def test_plan_disk_cache(plan_cache):
+    mod = ArgSchemaParser(schema_type=PlanSchema, args=['--a', '5'])
+    assert mod.args['nest']['c'] == 3
+    files = os.listdir(plan_cache)
+    assert files == [plans.plan_cache_key(PlanSchema()) + '.pickle']
+
+    plans.clear_plan_cache()
+    with open(os.path.join(plan_cache, files[0]), 'rb') as fp:
+        cached = pickle.load(fp)
+    cached.arguments[0]['description'] = 'from the cache'
+    with open(os.path.join(plan_cache, files[0]), 'wb') as fp:
+        pickle.dump(cached, fp)
+    plan = plans.get_schema_plan(PlanSchema())
+    assert plan.arguments[0]['description'] == 'from the cache'
+    mod = ArgSchemaParser(schema_type=PlanSchema, args=['--a', '6'])
+    assert mod.args['a'] == 6
+
+
+def test_plan_disk_cache_corrupt(plan_cache):
+    path = os.path.join(plan_cache,
+                        plans.plan_cache_key(PlanSchema()) + '.pickle')
+    os.makedirs(plan_cache)
+    with open(path, 'wb') as fp:
+        fp.write(b'not a pickle')
+    plan = plans.get_schema_plan(PlanSchema())
+    assert plan.arguments[0]['title'] == 'PlanSchema'
+
+
+def test_schema_fingerprint():
+    assert (plans.schema_fingerprint(PlanSchema()) ==
+            plans.schema_fingerprint(PlanSchema()))
+    assert (plans.schema_fingerprint(PlanSchema()) !=
+            plans.schema_fingerprint(OtherPlanSchema()))
+
+
+def test_plan_reraises_warnings():
+    plans.get_schema_plan(DeprecatedListSchema())
+    with pytest.warns(FutureWarning):
+        ArgSchemaParser(schema_type=DeprecatedListSchema, args=[])
+
+
+def test_schema_fingerprint_stable_across_processes():
+    code = ('from test_plans import ValidatedPlanSchema; '
+            'from argschema import plans; '
+            'print(plans.schema_fingerprint(ValidatedPlanSchema())); '
+            'print(plans.plan_cache_key(ValidatedPlanSchema()))')
+    here = os.path.dirname(os.path.abspath(__file__))
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(
+        [os.path.dirname(os.path.dirname(argschema.__file__))] + sys.path))
+    outputs = [subprocess.check_output([sys.executable, '-c', code], cwd=here,
+                                       env=env)
+               for _ in range(2)]
+    assert outputs[0] == outputs[1]
+    plans.clear_plan_cache()
+    assert outputs[0].decode().split() == [
+        plans.schema_fingerprint(ValidatedPlanSchema()),
+        plans.plan_cache_key(ValidatedPlanSchema())]
+
+
+def test_plan_cache_key_follows_sources(tmpdir, monkeypatch):
+    module = tmpdir.join('plan_key_module.py')
+    module.write('import argschema\n'
+                 'class KeySchema(argschema.ArgSchema):\n'
+                 '    a = argschema.fields.Int(default=1)\n')
+    monkeypatch.syspath_prepend(str(tmpdir))
+    from plan_key_module import KeySchema
+    key = plans.plan_cache_key(KeySchema())
+    assert plans.plan_cache_key(KeySchema()) == key
+    assert plans.plan_cache_key(KeySchema(only=['a'])) != key
+    stat = os.stat(str(module))
+    os.utime(str(module), ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert plans.plan_cache_key(KeySchema()) != key
+
+
+def test_plan_argparser_prog(monkeypatch):
+    plan = plans.get_schema_plan(PlanSchema())
+    monkeypatch.setattr(sys, 'argv', ['/some/where/first.py'])
+    assert plan.argparser().prog == 'first.py'
+    monkeypatch.setattr(sys, 'argv', ['/some/where/second.py'])
+    assert plan.argparser().prog == 'second.py'
+
+
+def test_plan_cache_key_factory_schemas(plan_cache):
+    def make(kind):
+        class FactorySchema(argschema.ArgSchema):
+            a = (argschema.fields.Str() if kind == 'str' else
+                 argschema.fields.List(argschema.fields.Int,
+                                       cli_as_single_argument=True))
+        return FactorySchema
+    first, second = make('str'), make('list')
+    # same class names and source file, different definitions
+    assert plans.plan_cache_key(first()) != plans.plan_cache_key(second())
+    assert ArgSchemaParser(schema_type=first, args=['--a', 'x']).args['a'] == 'x'
+    plans.clear_plan_cache()
+    mod = ArgSchemaParser(schema_type=second, args=['--a', '[3, 4]'])
+    assert mod.args['a'] == [3, 4]
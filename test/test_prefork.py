@@ -0,0 +1,44 @@
+import gc
+import argschema
+from argschema import fields, ArgSchema, ArgSchemaParser, plans, records
+from argschema.schemas import DefaultSchema
+
+
+class WarmInner(DefaultSchema):
+    x = fields.Int(default=1)
+
+
+class WarmSchema(ArgSchema):
+    a = fields.Int(default=2)
+    inner = fields.Nested(WarmInner, default={})
+
+
+class WarmParser(ArgSchemaParser):
+    default_schema = WarmSchema
+    env_prefix = 'WARM'
+    args_as_records = True
+
+
+def test_warmup(monkeypatch):
+    plans.clear_plan_cache()
+    frozen = []
+    monkeypatch.setattr(gc, 'freeze', lambda: frozen.append(True),
+                        raising=False)
+    warmed = argschema.warmup([WarmParser, ArgSchema])
+    assert frozen == [True]
+    plan = warmed[WarmParser]
+    assert plan is plans.get_schema_plan(WarmSchema())
+    assert plan._argparser is not None
+    assert 'WARM' in plan._env_tables
+    assert WarmSchema in records._RECORD_CLASSES
+    assert WarmInner in records._RECORD_CLASSES
+
+    mod = WarmParser(args=['--inner.x', '3'])
+    assert mod.args.inner.x == 3
+    assert plans.get_schema_plan(mod.schema) is plan
+
+
+def test_warmup_no_freeze(monkeypatch):
+    monkeypatch.setattr(gc, 'freeze', lambda: 1 / 0, raising=False)
+    warmed = argschema.warmup(WarmSchema, freeze=False)
+    assert list(warmed) == [WarmSchema]
@@ -0,0 +1,79 @@
+import json
+import threading
+import pytest
+import marshmallow as mm
+from argschema import fields, ArgSchema, ArgSchemaParser, profiling, utils
+from argschema.schemas import DefaultSchema
+
+
+class ImageSchema(DefaultSchema):
+    path = fields.Str(required=True)
+    size = fields.Int(validate=mm.validate.Range(min=0))
+
+
+class ProfiledSchema(ArgSchema):
+    images = fields.Nested(ImageSchema, many=True)
+    values = fields.List(fields.Float())
+    output_dir = fields.OutputDir()
+
+
+def test_profiler(tmpdir):
+    original = mm.fields.Field.deserialize
+    profiler = profiling.Profiler(memory=True)
+    with profiler:
+        utils.load(ProfiledSchema(), {
+            'images': [{'path': 'a', 'size': 1}, {'path': 'b', 'size': 2}],
+            'values': [1, 2, 3], 'output_dir': str(tmpdir.join('out'))})
+    # the methods are restored
+    assert 'deserialize' not in mm.fields.Integer.__dict__
+    assert mm.fields.Field.deserialize is original
+    rows = {row['path']: row for row in profiler.report()}
+    assert rows['images']['calls'] == 1
+    assert rows['images.size']['calls'] == 2
+    assert rows['values.*']['calls'] == 3
+    assert rows['output_dir']['validate_seconds'] > 0
+    assert rows['images']['seconds'] >= rows['images.size']['seconds']
+    table = profiler.format_table(limit=2)
+    assert len(table.splitlines()) == 3
+    assert json.loads(profiler.to_json())[0]['path'] in rows
+
+    with pytest.raises(RuntimeError):
+        with profiler:
+            with profiling.Profiler():
+                pass
+
+
+def test_profiler_ignores_other_threads(tmpdir):
+    profiler = profiling.Profiler()
+    with profiler:
+        thread = threading.Thread(target=utils.load, args=(ProfiledSchema(), {
+            'values': [1, 2], 'output_dir': str(tmpdir.join('out'))}))
+        thread.start()
+        thread.join()
+        assert profiler.report() == []
+        utils.load(ProfiledSchema(), {'values': [1, 2, 3],
+                                      'output_dir': str(tmpdir.join('out'))})
+    rows = {row['path']: row for row in profiler.report()}
+    assert rows['values.*']['calls'] == 3
+
+
+def test_env_options():
+    assert profiling.env_options({}) is None
+    assert profiling.env_options({profiling.PROFILE_ENV: '0'}) is None
+    assert profiling.env_options({profiling.PROFILE_ENV: '1'}) == {
+        'format': 'table', 'memory': False, 'path': None}
+    assert profiling.env_options(
+        {profiling.PROFILE_ENV: 'json, memory,/tmp/p.json'}) == {
+        'format': 'json', 'memory': True, 'path': '/tmp/p.json'}
+
+
+def test_profile_env(monkeypatch, tmpdir):
+    report = str(tmpdir.join('report.json'))
+    monkeypatch.setenv(profiling.PROFILE_ENV, 'json,' + report)
+    mod = ArgSchemaParser(schema_type=ProfiledSchema, args=[], input_data={
+        'images': [{'path': 'a'}]})
+    assert mod.args['images'][0]['path'] == 'a'
+    with open(report) as fp:
+        rows = json.load(fp)
+    assert 'images.path' in [row['path'] for row in rows]
+    assert profiling.active_profiler() is None
@@ -0,0 +1,90 @@
+import json
+import pickle
+import pytest
+import numpy as np
+import argschema
+from argschema import fields, ArgSchemaParser, records
+from argschema.schemas import DefaultSchema
+
+
+class RecordItemSchema(DefaultSchema):
+    x = fields.Int(required=True)
+
+
+class RecordNestedSchema(DefaultSchema):
+    one = fields.Int(default=1)
+    entries = fields.Nested(RecordItemSchema, many=True, default=[])
+
+
+class RecordSchema(argschema.ArgSchema):
+    a = fields.Int(required=True)
+    keys = fields.Str(default='clashes with Mapping.keys')
+    array = fields.NumpyArray(dtype=np.float64)
+    nest = fields.Nested(RecordNestedSchema, default={})
+
+
+class RecordParser(ArgSchemaParser):
+    default_schema = RecordSchema
+    args_as_records = True
+
+
+def make_module(**kwargs):
+    input_data = {'a': 5, 'nest': {'entries': [{'x': 1}, {'x': 2}]}}
+    return RecordParser(input_data=input_data, args=[], **kwargs)
+
+
+def test_records():
+    mod = make_module()
+    args = mod.args
+    assert isinstance(args, records.Record)
+    assert type(args).__name__ == 'RecordRecord'
+    assert not hasattr(args, '__dict__')
+    assert args.a == 5
+    assert args['a'] == 5
+    assert args.get('array') is None
+    assert 'array' not in args
+    assert args['keys'] == 'clashes with Mapping.keys'
+    assert args.nest.one == 1
+    assert args.nest.entries[1].x == 2
+    assert isinstance(args.nest.entries, tuple)
+    assert args.log_level == 'ERROR'
+
+
+def test_records_frozen():
+    args = make_module().args
+    with pytest.raises(AttributeError):
+        args.a = 6
+    with pytest.raises(AttributeError):
+        args.new_attribute = 6
+    with pytest.raises(TypeError):
+        args['a'] = 6
+
+
+def test_records_to_dict():
+    args = make_module().args
+    plain = ArgSchemaParser(input_data={'a': 5, 'nest': {
+        'entries': [{'x': 1}, {'x': 2}]}}, schema_type=RecordSchema, args=[])
+    assert args == plain.args
+    assert args.to_dict() == plain.args
+    assert type(args.to_dict()['nest']['entries']) is list
+
+
+def test_records_pickle():
+    args = make_module().args
+    copy = pickle.loads(pickle.dumps(args))
+    assert copy == args
+    assert copy.nest.entries[0].x == 1
+
+
+def test_records_output(tmpdir):
+    out = str(tmpdir.join('output.json'))
+    mod = make_module()
+    mod.output(mod.args.nest, out)
+    with open(out) as fp:
+        assert json.load(fp) == {'one': 1, 'entries': [{'x': 1}, {'x': 2}]}
+
+
+def test_records_fingerprint():
+    plain = ArgSchemaParser(input_data={'a': 5, 'nest': {
+        'entries': [{'x': 1}, {'x': 2}]}}, schema_type=RecordSchema, args=[])
+    assert make_module().fingerprint() == plain.fingerprint()
@@ -0,0 +1,169 @@
+import os
+import pytest
+import marshmallow as mm
+import argschema
+from argschema import fields, ArgSchemaParser
+from argschema.result_cache import ResultCache, referenced_path_states
+
+validated = []
+
+
+def count_validation(value):
+    validated.append(value)
+
+
+class CachedSchema(argschema.ArgSchema):
+    a = fields.Int(required=True, validate=count_validation)
+    infile = fields.InputFile(required=True)
+    files = fields.List(fields.InputFile, cli_as_single_argument=True)
+
+
+@pytest.fixture
+def cached_parser(tmpdir):
+    class CachedParser(ArgSchemaParser):
+        default_schema = CachedSchema
+        result_cache = str(tmpdir.join('cache'))
+    del validated[:]
+    return CachedParser
+
+
+@pytest.fixture
+def infile(tmpdir):
+    path = tmpdir.join('input.txt')
+    path.write('data')
+    return str(path)
+
+
+def test_result_cache_hit(cached_parser, infile):
+    mod = cached_parser(input_data={'a': 5, 'infile': infile}, args=[])
+    assert validated == [5]
+    mod2 = cached_parser(input_data={'infile': infile, 'a': 5}, args=[])
+    assert validated == [5]
+    assert mod2.args == mod.args
+
+
+def test_result_cache_miss_on_args(cached_parser, infile):
+    cached_parser(input_data={'a': 5, 'infile': infile}, args=[])
+    cached_parser(input_data={'a': 5, 'infile': infile}, args=['--a', '6'])
+    assert validated == [5, 6]
+
+
+def test_result_cache_invalidated_by_file(cached_parser, infile):
+    cached_parser(input_data={'a': 5, 'infile': infile}, args=[])
+    st = os.stat(infile)
+    os.utime(infile, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    cached_parser(input_data={'a': 5, 'infile': infile}, args=[])
+    assert validated == [5, 5]
+    os.remove(infile)
+    with pytest.raises(mm.ValidationError):
+        cached_parser(input_data={'a': 5, 'infile': infile}, args=[])
+
+
+def test_result_cache_failures_not_cached(cached_parser, tmpdir):
+    missing = str(tmpdir.join('missing.txt'))
+    for i in range(2):
+        with pytest.raises(mm.ValidationError):
+            cached_parser(input_data={'a': 5, 'infile': missing}, args=[])
+    assert validated == [5, 5]
+    assert not os.path.exists(cached_parser.result_cache)
+
+
+def test_result_cache_clear(tmpdir, infile):
+    cache = ResultCache(str(tmpdir.join('cache')))
+    schema = CachedSchema()
+    args = {'a': 1, 'infile': infile}
+    cache.load(schema, args, argschema.utils.load)
+    assert cache.get(cache.key(schema, args)) is not None
+    cache.clear()
+    assert cache.get(cache.key(schema, args)) is None
+
+
+def test_result_cache_evicts_least_recently_used(tmpdir, infile):
+    cache = ResultCache(str(tmpdir.join('cache')), max_entries=2)
+    schema = CachedSchema()
+    keys = []
+    for a in range(3):
+        args = {'a': a, 'infile': infile}
+        cache.load(schema, args, argschema.utils.load)
+        keys.append(cache.key(schema, args))
+        path = cache._path(keys[-1])
+        os.utime(path, ns=(a * 10 ** 9, a * 10 ** 9))
+    assert len(os.listdir(cache.cache_dir)) == 2
+    assert cache.get(keys[0]) is None
+    assert cache.get(keys[2]) is not None
+
+
+class OutputDirCachedSchema(argschema.ArgSchema):
+    outdir = fields.OutputDir(required=True)
+
+
+def test_result_cache_recreates_output_dir(tmpdir):
+    class OutputDirParser(ArgSchemaParser):
+        default_schema = OutputDirCachedSchema
+        result_cache = str(tmpdir.join('cache'))
+    outdir = str(tmpdir.join('out'))
+    for i in range(3):
+        OutputDirParser(input_data={'outdir': outdir}, args=[])
+    os.rmdir(outdir)
+    OutputDirParser(input_data={'outdir': outdir}, args=[])
+    assert os.path.isdir(outdir)
+
+
+def test_referenced_path_states(infile):
+    states = referenced_path_states(
+        CachedSchema(), {'a': 1, 'infile': infile, 'files': [infile],
+                         'output_json': 'out.json'})
+    assert [path for path, state in states] == [
+        ['output_json'], ['infile'], ['files', 0]]
+    assert states[1][1][0] == infile
+
+
+class GlobCachedSchema(argschema.ArgSchema):
+    images = fields.InputGlob()
+
+
+def test_referenced_path_states_glob(tmpdir):
+    tmpdir.join('sub').ensure(dir=True).join('x.txt').write('x')
+    states = referenced_path_states(
+        GlobCachedSchema(), {'images': str(tmpdir.join('*', '*.txt'))})
+    assert [state[0] for path, state in states] == [
+        str(tmpdir), str(tmpdir.join('sub'))]
+
+
+HOOK_SCHEMA = '''
+import marshmallow as mm
+import argschema
+
+
+class HookSchema(argschema.ArgSchema):
+    a = argschema.fields.Int(required=True)
+
+    @mm.validates_schema
+    def check(self, data, **kwargs):
+        if data['a'] > {limit}:
+            raise mm.ValidationError('a is too large')
+'''
+
+
+def test_result_cache_hook_edit(tmpdir, monkeypatch):
+    import sys
+    import importlib
+    monkeypatch.syspath_prepend(str(tmpdir))
+    monkeypatch.setattr(sys, 'dont_write_bytecode', True)
+    cache = ResultCache(str(tmpdir.join('cache')))
+    module_file = tmpdir.join('hook_schema_module.py')
+
+    def load_with(limit):
+        module_file.write(HOOK_SCHEMA.format(limit=limit))
+        sys.modules.pop('hook_schema_module', None)
+        importlib.invalidate_caches()
+        schema = importlib.import_module('hook_schema_module').HookSchema()
+        return cache.load(schema, {'a': 5}, lambda s, d: s.load(d))
+
+    try:
+        assert load_with(10)['a'] == 5
+        # the edited hook gives a different key, so it is not skipped
+        with pytest.raises(mm.ValidationError):
+            load_with(1)
+    finally:
+        sys.modules.pop('hook_schema_module', None)
@@ -0,0 +1,181 @@
+import os
+import sys
+import json
+import socket
+import subprocess
+import threading
+import pytest
+import argschema
+from argschema import fields, client
+import numpy as np
+
+pytestmark = pytest.mark.skipif(not hasattr(socket, 'AF_UNIX'),
+                                reason='requires unix domain sockets')
+if hasattr(socket, 'AF_UNIX'):
+    # socketserver.UnixStreamServer does not exist on windows
+    from argschema.server import ValidationServer, WorkingDirectory, jsonable
+
+
+class ServerSchema(argschema.ArgSchema):
+    a = fields.Int(required=True)
+    b = fields.Str(default='b')
+    array = fields.NumpyArray(dtype=np.float64)
+    infile = fields.InputFile()
+
+
+class ServerParser(argschema.ArgSchemaParser):
+    default_schema = ServerSchema
+
+
+class EnvServerParser(argschema.ArgSchemaParser):
+    default_schema = ServerSchema
+    env_prefix = 'SERVERTEST'
+
+
+class ServerStageSchema(argschema.schemas.DefaultSchema):
+    x = fields.Int(required=True, validate=lambda x: x >= 0)
+    array = fields.NumpyArray(dtype=np.float64)
+
+
+class LazyServerSchema(argschema.ArgSchema):
+    a = fields.Int(required=True)
+    stage = fields.Nested(ServerStageSchema, required=True)
+
+
+class LazyServerParser(argschema.ArgSchemaParser):
+    default_schema = LazyServerSchema
+    lazy_load = True
+
+
+@pytest.fixture
+def server(tmpdir):
+    socket_path = str(tmpdir.join('argschema.sock'))
+    server = ValidationServer(socket_path, preload=[__name__ + ':ServerSchema'],
+                              allow=[__name__ + ':ServerParser',
+                                     __name__ + ':EnvServerParser',
+                                     __name__ + ':LazyServerParser',
+                                     __name__ + ':NotThere'])
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    yield socket_path
+    server.shutdown()
+    server.server_close()
+    thread.join()
+
+
+def test_server_validate(server, tmpdir):
+    result = client.validate(server, __name__ + ':ServerSchema',
+                             input_data={'a': 1, 'array': [1, 2]})
+    assert result['a'] == 1
+    assert result['b'] == 'b'
+    assert result['array'] == [1.0, 2.0]
+
+
+def test_server_parser_class_and_args(server, tmpdir):
+    input_json = tmpdir.join('input.json')
+    input_json.write(json.dumps({'a': 2}))
+    tmpdir.join('in.txt').write('x')
+    cwd = os.getcwd()
+    tmpdir.chdir()
+    try:
+        result = client.validate(server, __name__ + ':ServerParser',
+                                 args=['--input_json', 'input.json',
+                                       '--infile', 'in.txt', '--b', 'c'])
+    finally:
+        os.chdir(cwd)
+    assert result['a'] == 2
+    assert result['b'] == 'c'
+    assert result['infile'] == 'in.txt'
+
+
+def test_server_validation_error(server):
+    with pytest.raises(client.ServerValidationError) as e:
+        client.validate(server, __name__ + ':ServerSchema',
+                        input_data={'a': 'not an int'})
+    assert 'a' in e.value.args[0]
+
+
+def test_server_bad_args(server, capsys):
+    with pytest.raises(client.ServerValidationError) as e:
+        client.validate(server, __name__ + ':ServerSchema', args=['--nope'])
+    assert 'unrecognized arguments: --nope' in e.value.args[0]
+    assert 'usage:' in e.value.args[0]
+    assert capsys.readouterr().err == ''
+    with pytest.raises(client.ServerValidationError):
+        client.validate(server, __name__ + ':NotThere', input_data={'a': 1})
+
+
+def test_server_lazy_parser(server):
+    result = client.validate(server, __name__ + ':LazyServerParser',
+                             input_data={'a': 1,
+                                         'stage': {'x': 2, 'array': [1, 2]}})
+    assert result['a'] == 1
+    assert result['stage'] == {'x': 2, 'array': [1.0, 2.0]}
+    # errors of the subtrees are reported, although nothing accessed them
+    with pytest.raises(client.ServerValidationError) as e:
+        client.validate(server, __name__ + ':LazyServerParser',
+                        input_data={'a': 1, 'stage': {'x': -1}})
+    assert e.value.args[0] == {'stage': {'x': ['Invalid value.']}}
+
+
+def test_server_only_serves_allowed(server):
+    with pytest.raises(client.ServerValidationError) as e:
+        client.validate(server, 'argschema.schemas:ArgSchema')
+    assert e.value.args[0] == 'schema argschema.schemas:ArgSchema is not served'
+
+
+def test_server_client_environment(server, monkeypatch):
+    monkeypatch.setenv('SERVERTEST__b', 'from the server')
+    response = client.request(server, {
+        'schema': __name__ + ':EnvServerParser', 'input_data': {'a': 1},
+        'env': {'SERVERTEST__b': 'from the client'}})
+    assert response['args']['b'] == 'from the client'
+
+
+def test_working_directory_concurrent(tmpdir):
+    cwd = os.getcwd()
+    gate = WorkingDirectory()
+    inside = threading.Barrier(2, timeout=5)
+    errors = []
+
+    def request():
+        try:
+            with gate.use(str(tmpdir)):
+                # both requests are in the same directory at once
+                inside.wait()
+                assert os.getcwd() == str(tmpdir)
+        except Exception as e:  # pragma: no cover
+            errors.append(e)
+    try:
+        threads = [threading.Thread(target=request) for i in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        with gate.use(cwd):
+            assert os.getcwd() == cwd
+    finally:
+        os.chdir(cwd)
+    assert errors == []
+
+
+def test_client_main(server, capsys):
+    assert client.main(['--socket', server, '--schema',
+                        __name__ + ':ServerSchema', '--', '--a', '3']) == 0
+    assert json.loads(capsys.readouterr().out)['a'] == 3
+    assert client.main(['--socket', server, '--schema',
+                        __name__ + ':ServerSchema', '--', '--b', 'x']) == 1
+
+
+def test_jsonable():
+    assert jsonable({'a': np.arange(2), 'b': np.float32(1.5),
+                     'c': slice(1, None), 'd': (1, 2)}) == {
+        'a': [0, 1], 'b': 1.5, 'c': '1::', 'd': [1, 2]}
+
+
+def test_client_is_light():
+    code = ('import sys, argschema.client; '
+            'print("marshmallow" in sys.modules or "numpy" in sys.modules)')
+    out = subprocess.check_output([sys.executable, '-c', code])
+    assert out.strip() == b'False'
@@ -0,0 +1,53 @@
+import gc
+import pickle
+import multiprocessing
+import numpy as np
+import pytest
+from argschema import fields, ArgSchema, ArgSchemaParser
+from argschema.schemas import DefaultSchema
+
+shared = pytest.importorskip('argschema.shared')
+
+
+class ImageSchema(DefaultSchema):
+    pixels = fields.NumpyArray(dtype='float32', required=True)
+
+
+class SharedSchema(ArgSchema):
+    image = fields.Nested(ImageSchema, required=True)
+    weights = fields.NumpyArray(dtype='int64', required=True)
+    small = fields.NumpyArray(dtype='uint8', default=[1, 2])
+
+
+def _sum_pixels(handle):
+    args = handle.attach()
+    return float(args['image']['pixels'].sum()), args['weights'].tolist()
+
+
+def test_share_args():
+    pixels = np.arange(12, dtype='float32').reshape(3, 4).tolist()
+    mod = ArgSchemaParser(schema_type=SharedSchema, args=[], input_data={
+        'image': {'pixels': pixels}, 'weights': [1, 2, 3]})
+    handle = mod.share_args(min_size=8)
+    handle = pickle.loads(pickle.dumps(handle))
+    assert len(handle.arrays) == 2
+    args = handle.attach()
+    np.testing.assert_array_equal(args['image']['pixels'],
+                                  mod.args['image']['pixels'])
+    assert args['image']['pixels'].dtype == np.float32
+    assert not args['weights'].flags.writeable
+    assert isinstance(args['small'], np.ndarray)
+    assert args['log_level'] == 'ERROR'
+
+    ctx = multiprocessing.get_context('spawn')
+    with ctx.Pool(1) as pool:
+        assert pool.apply(_sum_pixels, (handle,)) == (66.0, [1, 2, 3])
+
+    names = [a.name for a in handle.arrays]
+    del args
+    shared.detach_all()
+    del mod
+    gc.collect()
+    for name in names:
+        with pytest.raises(FileNotFoundError):
+            shared.shared_memory.SharedMemory(name=name)
@@ -0,0 +1,137 @@
+import json
+import pytest
+import marshmallow as mm
+from argschema import fields, ArgSchema, ArgSchemaParser, sweeps
+from argschema.schemas import DefaultSchema
+
+
+class SweepNestedSchema(DefaultSchema):
+    b = fields.Int(default=0)
+    c = fields.Str(default='c')
+
+
+class SweepSchema(ArgSchema):
+    a = fields.Int(required=True)
+    lr = fields.Float(required=True, validate=mm.validate.Range(min=0))
+    nested = fields.Nested(SweepNestedSchema, default={})
+
+
+class ValidatedSweepSchema(SweepSchema):
+    @mm.validates_schema
+    def check(self, data, **kwargs):
+        if data['lr'] > data['a']:
+            raise mm.ValidationError('lr must not exceed a')
+
+
+def test_iter_sweep_points():
+    spec = {'grid': {'x': [1, 2], 'y': [3, 4, 5]}, 'zip': {'u': [1, 2], 'v': [3, 4]}}
+    points = list(sweeps.iter_sweep_points(spec))
+    assert len(points) == 12 == sweeps.count_sweep_points(spec)
+    assert points[0] == {'u': 1, 'v': 3, 'x': 1, 'y': 3}
+    assert all(p['v'] == p['u'] + 2 for p in points)
+    spec = [{'grid': {'x': [1, 2]}}, {'zip': {'x': [5]}}]
+    assert [p['x'] for p in sweeps.iter_sweep_points(spec)] == [1, 2, 5]
+    assert sweeps.sweep_paths(spec) == ['x']
+
+
+def test_split_sweep_errors():
+    with pytest.raises(mm.ValidationError):
+        sweeps.split_sweep({'$sweep': {'zip': {'x': [1], 'y': [1, 2]}}})
+    with pytest.raises(mm.ValidationError):
+        sweeps.split_sweep({'$sweep': {'random': {'x': [1]}}})
+    with pytest.raises(mm.ValidationError):
+        sweeps.split_sweep({'$sweep': 5})
+    for spec in ({'grid': {'lr': []}}, {'zip': {'x': [], 'y': []}},
+                 {'zip': {'x': 5}}, {'grid': [1]}, []):
+        with pytest.raises(mm.ValidationError):
+            sweeps.split_sweep({'$sweep': spec})
+    d = {'a': 1}
+    assert sweeps.split_sweep(d) == (d, None)
+
+
+def test_parser_sweep(tmpdir):
+    input_json = tmpdir.join('input.json')
+    input_json.write(json.dumps({
+        'a': 1, 'nested': {'c': 'kept'},
+        '$sweep': {'grid': {'lr': [0.1, 0.2], 'nested.b': [1, 2, 3]}}}))
+    mod = ArgSchemaParser(schema_type=SweepSchema,
+                          args=['--input_json', str(input_json)])
+    assert mod.args['lr'] == 0.1
+    assert len(mod.sweep) == 6
+    points = list(mod.iter_sweep())
+    assert len(points) == 6
+    assert [(p['lr'], p['nested']['b']) for p in points][:3] == [
+        (0.1, 1), (0.1, 2), (0.1, 3)]
+    assert all(p['a'] == 1 and p['nested']['c'] == 'kept' for p in points)
+    assert all(p['log_level'] == 'ERROR' for p in points)
+
+
+def test_parser_sweep_shared_validation():
+    mod = ArgSchemaParser(schema_type=SweepSchema, args=[],
+                          input_data={'a': 1, '$sweep': {'grid': {'lr': [0.1]}}})
+    assert mod.sweep.shared
+    calls = []
+
+    def loader(schema, d):
+        calls.append(set(schema.fields))
+        return mod.load_schema_with_defaults(schema, d)
+    sweep = sweeps.Sweep(SweepSchema(), {'a': 1}, {'grid': {'lr': [1, 2, 3]}},
+                         loader)
+    list(sweep)
+    assert len(calls) == 4
+    assert 'lr' not in calls[0] and 'a' in calls[0]
+    assert all(c == {'lr'} for c in calls[1:])
+
+
+def test_parser_sweep_errors():
+    with pytest.raises(mm.ValidationError):
+        ArgSchemaParser(schema_type=SweepSchema, args=[], input_data={
+            'a': 'x', '$sweep': {'grid': {'lr': [0.1]}}})
+    with pytest.raises(mm.ValidationError):
+        ArgSchemaParser(schema_type=SweepSchema, args=[], input_data={
+            'a': 1, '$sweep': {'grid': {'nope': [0.1]}}})
+    mod = ArgSchemaParser(schema_type=SweepSchema, args=[], input_data={
+        'a': 1, '$sweep': {'grid': {'lr': [0.1, -1]}}})
+    points = mod.iter_sweep()
+    next(points)
+    with pytest.raises(mm.ValidationError):
+        next(points)
+
+
+def test_parser_sweep_schema_validators():
+    mod = ArgSchemaParser(schema_type=ValidatedSweepSchema, args=[], input_data={
+        'a': 1, '$sweep': {'zip': {'lr': [0.5, 2]}}})
+    assert not mod.sweep.shared
+    points = mod.iter_sweep()
+    assert next(points)['lr'] == 0.5
+    with pytest.raises(mm.ValidationError):
+        next(points)
+
+
+class PostLoadSweepSchema(SweepSchema):
+    @mm.post_load
+    def scale(self, data, **kwargs):
+        data['scaled'] = data['lr'] * data['a']
+        return data
+
+
+def test_parser_sweep_load_hooks():
+    mod = ArgSchemaParser(schema_type=PostLoadSweepSchema, args=[], input_data={
+        'a': 2, '$sweep': {'grid': {'lr': [0.5, 1.5]}}})
+    assert not mod.sweep.shared
+    assert [p['scaled'] for p in mod.iter_sweep()] == [1.0, 3.0]
+    assert sweeps.Sweep(SweepSchema(), {'a': 1}, {'grid': {'lr': [1]}},
+                        lambda s, d: s.load(d)).shared
+
+
+def test_parser_empty_sweep():
+    with pytest.raises(mm.ValidationError):
+        ArgSchemaParser(schema_type=SweepSchema, args=[], input_data={
+            'a': 1, '$sweep': {'grid': {'lr': []}}})
+
+
+def test_parser_no_sweep():
+    mod = ArgSchemaParser(schema_type=SweepSchema, args=[],
+                          input_data={'a': 1, 'lr': 0.1})
+    assert mod.sweep is None
+    assert list(mod.iter_sweep()) == [mod.args]
@@ -143,3 +143,15 @@ def test_schema_argparser_with_baseball():
     assert(
         '--ballsBALLSnumberofballs(0-4)(default=0)(validoptionsare[0,1,2,3])' in help)
     assert("--pitcher.numberPITCHER.NUMBERplayer'snumber(mustbe>0)(REQUIRED)" in help)
+
+
+def test_cast_literal(tmpdir):
+    assert utils.cast_literal('[1, 2.5, null]') == [1, 2.5, None]
+    assert utils.cast_literal('(1, 2)') == (1, 2)
+    assert utils.cast_literal("['a', True]") == ['a', True]
+    with pytest.raises(ValueError):
+        utils.cast_literal('@' + str(tmpdir.join('missing.npy')))
+    bad = tmpdir.join('bad.txt')
+    bad.write('1 a\n')
+    with pytest.raises(ValueError):
+        utils.cast_list_literal('@' + str(bad))